@@ -0,0 +1,116 @@
+// Compares the board client's old per-move bookkeeping, which walked the
+// whole history and rebuilt the move list, with the incremental record.
+//
+// Run from the repository root:
+//
+//     node benchmarks/board_client.js [plies] [runs]
+
+const { performance } = require('perf_hooks')
+const { Chess } = require('../chesscorpy/static/js/chess.js')
+const record_js = require('../chesscorpy/static/js/game_record.js')
+
+const PLIES = parseInt(process.argv[2] || '240')
+const RUNS = parseInt(process.argv[3] || '5')
+
+// A small seeded generator so every run plays the same games.
+function random(seed) {
+    return function () {
+        seed = (seed * 1103515245 + 12345) % 2147483648
+        return seed / 2147483648
+    }
+}
+
+function playRandomGame(plies) {
+    for (let seed = 1; ; seed++) {
+        const next = random(seed)
+        const game = new Chess()
+        const moves = []
+
+        while (moves.length < plies && !game.game_over()) {
+            const legal = game.moves()
+            const san = legal[Math.floor(next() * legal.length)]
+            game.move(san)
+            moves.push(san)
+        }
+
+        if (moves.length === plies) {
+            return moves
+        }
+    }
+}
+
+// What onPieceMove used to do after every move.
+function oldGetCapturedPieces(game, color) {
+    const captured = {'Q': 0, 'R': 0, 'B': 0, 'N': 0, 'P': 0}
+
+    for (const move of game.history({ verbose: true })) {
+        if (move.hasOwnProperty('captured') && move.color !== color[0]) {
+            captured[move.captured.toUpperCase()]++
+        }
+    }
+
+    return captured
+}
+
+function countPieces(captured) {
+    return Object.values(captured).reduce((total, count) => total + count, 0)
+}
+
+function runOld(moves) {
+    const game = new Chess()
+    const times = []
+    let nodes = 0
+
+    for (const san of moves) {
+        game.move(san)
+
+        const start = performance.now()
+        const white = oldGetCapturedPieces(game, 'white')
+        const black = oldGetCapturedPieces(game, 'black')
+        game.pgn({ newline_char: '<br>', show_headers: false })
+        times.push(performance.now() - start)
+
+        // Every captured piece image plus the move list was rebuilt.
+        nodes += countPieces(white) + countPieces(black) + 1
+    }
+
+    return { times, nodes }
+}
+
+function runNew(moves) {
+    const game = new Chess()
+    const record = record_js.newRecord()
+    const times = []
+    let nodes = 0
+
+    for (const san of moves) {
+        const move = game.move(san)
+
+        const start = performance.now()
+        record_js.recordMove(record, move)
+        times.push(performance.now() - start)
+
+        // One move list entry, plus an image if a piece was captured.
+        nodes += move.captured ? 2 : 1
+    }
+
+    return { times, nodes }
+}
+
+function summarize(name, results) {
+    const per_move = results.map(result => result.times).flat()
+    const total = per_move.reduce((sum, time) => sum + time, 0) / RUNS
+    const last = results.map(result => result.times.slice(-20)).flat()
+    const last_avg = last.reduce((sum, time) => sum + time, 0) / last.length
+
+    console.log(name.padEnd(12) + total.toFixed(2).padStart(10) + ' ms'
+                + last_avg.toFixed(4).padStart(12) + ' ms'
+                + String(results[0].nodes).padStart(12))
+}
+
+const moves = playRandomGame(PLIES)
+
+console.log(`${PLIES} ply game, ${RUNS} runs`)
+console.log('            whole game   last 20 avg   DOM nodes')
+summarize('old', Array.from({ length: RUNS }, () => runOld(moves)))
+summarize('incremental', Array.from({ length: RUNS }, () => runNew(moves)))
@@ -0,0 +1,93 @@
+"""Measures chat table size and chat load latency before and after upkeep.
+
+Fills a copy of the database with synthetic games and chats, then times
+chat.get_chats and chat.maintain. Run from the repository root:
+
+    python benchmarks/chats.py [--games N] [--messages N] [--finished F]
+
+--finished is the fraction of games that ended long enough ago to be
+compacted.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.getcwd())
+
+from chesscorpy import database, chat, games  # noqa: E402
+
+
+def populate(db, game_count, messages, finished):
+    database.sql_exec_batch(db, [
+        ('INSERT INTO users (id, username, password, email, rating, '
+         'notifications) VALUES(?, ?, ?, ?, ?, 0)',
+         [[1, 'white', '', 'w@example.com', 1200],
+          [2, 'black', '', 'b@example.com', 1200]]),
+        ('INSERT INTO games (id, player_white_id, player_black_id, to_move, '
+         'move_start_time, status, timestamp) VALUES(?, 1, 2, 1, ?, ?, ?)',
+         [[game_id,
+           0 if game_id <= game_count * finished else int(time.time()),
+           games.Status.CHECKMATE if game_id <= game_count * finished
+           else games.Status.IN_PROGRESS,
+           0]
+          for game_id in range(1, game_count + 1)]),
+        ('INSERT INTO chats (game_id, user_id, contents) VALUES(?, ?, ?)',
+         [[game_id, random.choice((1, 2)), 'x' * random.randint(5, 100)]
+          for game_id in range(1, game_count + 1)
+          for _ in range(random.randint(1, messages))])
+    ])
+
+
+def report(label, game_count):
+    game_ids = random.sample(range(1, game_count + 1), min(200, game_count))
+    times = []
+    for game_id in game_ids:
+        start = time.perf_counter()
+        chat.get_chats(game_id)
+        times.append(time.perf_counter() - start)
+
+    times.sort()
+    rows = database.sql_exec(database.DATABASE_FILE,
+                             'SELECT COUNT(*) AS count FROM chats', (),
+                             False)['count']
+    size = os.path.getsize(database.DATABASE_FILE)
+
+    print(f'{label}: {rows} live messages, {size / 1024 / 1024:.1f} MiB, '
+          f'get_chats median {statistics.median(times) * 1000:.2f} ms, '
+          f'p99 {times[int(len(times) * 0.99) - 1] * 1000:.2f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=2000)
+    parser.add_argument('--messages', type=int, default=400)
+    parser.add_argument('--finished', type=float, default=0.8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database.DEFAULT_FILES.update(
+            DATABASE_FILE=os.path.join(workdir, 'chesscorpy.db'),
+            ARCHIVE_FILE=os.path.join(workdir, 'archive.db'))
+        shutil.copy('chesscorpy.db', database.DATABASE_FILE)
+
+        populate(database.DATABASE_FILE, args.games, args.messages,
+                 args.finished)
+        report('before', args.games)
+
+        start = time.perf_counter()
+        result = chat.maintain()
+        print(f'maintain: {time.perf_counter() - start:.2f} s, {result}')
+
+        # Deleted rows leave free pages behind until the file is vacuumed.
+        database.sql_exec(database.DATABASE_FILE, 'VACUUM')
+        report('after', args.games)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Measures leaderboard page and rank lookups over many users.
+
+Fills a copy of the database with users, snapshots the leaderboard,
+then times random page and rank lookups against counting higher rated
+users directly. Run from the repository root:
+
+    python benchmarks/leaderboard.py [--users N] [--lookups N]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.getcwd())
+
+from chesscorpy import database, leaderboard  # noqa: E402
+
+
+def populate(db, users):
+    database.sql_exec_batch(db, [
+        ('INSERT INTO users (id, username, password, email, rating, '
+         'notifications) VALUES(?, ?, \'\', \'\', ?, 0)',
+         [[user_id, f'player{user_id}', int(random.gauss(1500, 300))]
+          for user_id in range(1, users + 1)])
+    ])
+
+
+def timed(label, fn, args_list):
+    times = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+
+    times.sort()
+    print(f'{label}: median {statistics.median(times) * 1000:.2f} ms, '
+          f'p99 {times[int(len(times) * 0.99) - 1] * 1000:.2f} ms')
+
+
+def count_higher(user_id):
+    return database.sql_exec(database.DATABASE_FILE,
+                             'SELECT COUNT(*) + 1 AS rank FROM users WHERE '
+                             'rating > (SELECT rating FROM users WHERE id = '
+                             '?)', [user_id], False)['rank']
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database.DEFAULT_FILES.update(
+            DATABASE_FILE=os.path.join(workdir, 'chesscorpy.db'),
+            ARCHIVE_FILE=os.path.join(workdir, 'archive.db'),
+            LEADERBOARD_FILE=os.path.join(workdir, 'leaderboard.db'))
+        shutil.copy('chesscorpy.db', database.DATABASE_FILE)
+
+        populate(database.DATABASE_FILE, args.users)
+        print(f'refresh: {leaderboard.refresh()}')
+
+        pages = args.users // leaderboard.PAGE_SIZE
+        user_ids = [[random.randint(1, args.users)]
+                    for _ in range(args.lookups)]
+
+        timed('get_page', leaderboard.get_page,
+              [[random.randint(1, pages)] for _ in range(args.lookups)])
+        timed('get_rank', leaderboard.get_rank, user_ids)
+        timed('COUNT(*) rank', count_higher, user_ids)
+
+        # Users who joined since the snapshot are placed by rating.
+        populate_id = args.users + 1
+        database.sql_exec(database.DATABASE_FILE,
+                          'INSERT INTO users (id, username, password, email, '
+                          "rating, notifications) VALUES(?, 'new', '', '', "
+                          '1500, 0)', [populate_id])
+        timed('get_rank unranked', leaderboard.get_rank,
+              [[populate_id]] * args.lookups)
+
+
+if __name__ == '__main__':
+    main()
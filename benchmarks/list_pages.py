@@ -0,0 +1,84 @@
+"""Measures time to first byte and peak memory of the game history page.
+
+Fills an in-memory copy of the database with finished games, then
+requests /history streamed and, for comparison, rendered all at once.
+Run from the repository root:
+
+    python benchmarks/list_pages.py [--games N]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.getcwd())
+
+from flask import render_template  # noqa: E402
+
+from chesscorpy import create_app, database, games, storage  # noqa: E402
+
+
+def populate(game_count):
+    database.sql_exec_batch(database.DATABASE_FILE, [
+        ('INSERT INTO users (id, username, password, email, rating, '
+         'notifications) VALUES(?, ?, \'\', \'\', 1200, 0)',
+         [[1, 'white'], [2, 'black']]),
+        ('INSERT INTO games (player_white_id, player_black_id, to_move, '
+         'move_start_time, status, winner, timestamp) '
+         'VALUES(1, 2, 1, ?, ?, ?, ?)',
+         [[game_id, games.Status.CHECKMATE, 1 + game_id % 2, game_id]
+          for game_id in range(game_count)])
+    ])
+
+
+def rendered_history():
+    """The history route as it was, building the whole page first."""
+
+    games_ = games.get_game_history_if_authed(1, 1)
+
+    return render_template('history.html',
+                           games=list(games.format_game_history(games_)),
+                           username='white')
+
+
+def measure(label, client):
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    response = client.get('/history?id=1')
+    chunks = iter(response.response)
+    first = next(chunks)
+    first_byte = time.perf_counter() - start
+    size = len(first) + sum(len(chunk) for chunk in chunks)
+    total = time.perf_counter() - start
+
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print(f'{label}: first byte {first_byte * 1000:.1f} ms, total '
+          f'{total * 1000:.1f} ms, peak {peak / 1024 / 1024:.1f} MiB, '
+          f'{size / 1024 / 1024:.1f} MiB page')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=20000)
+    args = parser.parse_args()
+
+    flask_app = create_app({'RUN_JOBS': False, 'STORAGE': storage.MEMORY})
+    populate(args.games)
+
+    client = flask_app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+
+    measure('streamed', client)
+
+    flask_app.view_functions['views.history'] = rendered_history
+    measure('rendered', client)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Measures how much maintenance slows down requests running alongside.
+
+Fills a copy of the database with chats, then runs readers and a writer
+while nothing else happens, and while a backup, integrity check and
+size report run flat out and throttled. Run from the repository root:
+
+    python benchmarks/maintenance.py [--chats N] [--duty F]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.getcwd())
+
+from chesscorpy import database, maintenance  # noqa: E402
+
+
+def populate(chat_count):
+    database.sql_exec_batch(database.DATABASE_FILE, [
+        ('INSERT INTO chats (game_id, user_id, contents) VALUES(?, 1, ?)',
+         [[chat_id % 1000 + 1, f'message {chat_id} ' + 'x' * 200]
+          for chat_id in range(chat_count)])
+    ])
+
+
+def read_chats():
+    database.sql_exec(database.DATABASE_FILE,
+                      'SELECT * FROM chats WHERE game_id = ? ORDER BY id '
+                      'DESC LIMIT 20', [random.randint(1, 1000)])
+
+
+def write_chat():
+    database.sql_exec(database.DATABASE_FILE,
+                      'INSERT INTO chats (game_id, user_id, contents) '
+                      'VALUES(?, 1, \'hello\')', [random.randint(1, 1000)])
+
+
+def repeat(operation, stopped, latencies, errors):
+    while not stopped.is_set():
+        start = time.perf_counter()
+        try:
+            operation()
+        except sqlite3.OperationalError:
+            errors.append(1)
+            continue
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.002)
+
+
+def p99(latencies):
+    latencies.sort()
+    return latencies[int(len(latencies) * 0.99) - 1] if latencies else 0
+
+
+def run(label, work, readers, workdir):
+    stopped = threading.Event()
+    read_latencies, write_latencies, errors = [], [], []
+    workers = [threading.Thread(target=repeat,
+                                args=(read_chats, stopped, read_latencies,
+                                      errors))
+               for _ in range(readers)]
+    workers.append(threading.Thread(target=repeat,
+                                    args=(write_chat, stopped,
+                                          write_latencies, errors)))
+
+    for worker in workers:
+        worker.start()
+
+    start = time.perf_counter()
+    work(workdir)
+    elapsed = time.perf_counter() - start
+
+    stopped.set()
+    for worker in workers:
+        worker.join()
+
+    print(f'{label}: {elapsed:.1f} s, read p99 '
+          f'{p99(read_latencies) * 1000:.1f} ms, write p99 '
+          f'{p99(write_latencies) * 1000:.1f} ms, {len(errors)} failed')
+
+
+def maintain(duty):
+    def work(workdir):
+        maintenance.backup(database.DATABASE_FILE,
+                           os.path.join(workdir, 'backup.db'), duty=duty)
+        maintenance.check(database.DATABASE_FILE, duty)
+        maintenance.sizes(database.DATABASE_FILE, duty)
+
+    return work
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--chats', type=int, default=500000)
+    parser.add_argument('--duty', type=float, default=maintenance.DUTY)
+    parser.add_argument('--readers', type=int, default=4)
+    args = parser.parse_args()
+
+    database.PROFILE = database.TUNED_PROFILE
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database.DEFAULT_FILES.update(
+            DATABASE_FILE=os.path.join(workdir, 'chesscorpy.db'))
+        shutil.copy('chesscorpy.db', database.DATABASE_FILE)
+        database.check_profile(database.DATABASE_FILE)
+        populate(args.chats)
+
+        run('idle', lambda workdir: time.sleep(3), args.readers, workdir)
+        run('flat out', maintain(1), args.readers, workdir)
+        run(f'duty {args.duty}', maintain(args.duty), args.readers, workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Compares SQLite's default settings with the tuned profile.
+
+Fills a copy of the database with games and chats, then measures reads
+and writes one at a time, and readers running alongside a writer, once
+with the default rollback journal and once with database.TUNED_PROFILE.
+Every query opens its own connection, as the app's do. Run from the
+repository root:
+
+    python benchmarks/sqlite_profile.py [--games N] [--seconds N]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.getcwd())
+
+from chesscorpy import database  # noqa: E402
+
+PGN = ' '.join(f'{move}. e4 e5' for move in range(1, 41))
+
+
+def populate(game_count):
+    database.sql_exec_batch(database.DATABASE_FILE, [
+        ('INSERT INTO users (id, username, password, email, rating, '
+         'notifications) VALUES(?, ?, \'\', \'\', 1200, 0)',
+         [[user_id, f'user{user_id}'] for user_id in range(1, 1001)]),
+        ('INSERT INTO games (player_white_id, player_black_id, to_move, '
+         'status, pgn) VALUES(?, ?, ?, \'in_progress\', ?)',
+         [[game_id % 1000 + 1, (game_id + 1) % 1000 + 1,
+           game_id % 1000 + 1, PGN] for game_id in range(game_count)]),
+        ('INSERT INTO chats (game_id, user_id, contents) VALUES(?, 1, ?)',
+         [[game_id % game_count + 1, f'message {game_id}']
+          for game_id in range(game_count * 2)])
+    ])
+
+
+def read_game(game_count):
+    database.sql_exec(database.DATABASE_FILE,
+                      'SELECT games.*, users.username FROM games JOIN users '
+                      'ON users.id = games.player_white_id WHERE games.id = ?',
+                      [random.randint(1, game_count)], False)
+
+
+def write_chat(game_count):
+    database.sql_exec(database.DATABASE_FILE,
+                      'INSERT INTO chats (game_id, user_id, contents) '
+                      'VALUES(?, 1, \'hello\')',
+                      [random.randint(1, game_count)])
+
+
+def throughput(operation, game_count, seconds):
+    count = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        operation(game_count)
+        count += 1
+
+    return count / seconds
+
+
+def repeat(operation, game_count, seconds, latencies, errors):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        try:
+            operation(game_count)
+        except sqlite3.OperationalError:
+            errors.append(1)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def concurrent(game_count, seconds, readers):
+    read_latencies, write_latencies, errors = [], [], []
+    workers = [threading.Thread(target=repeat,
+                                args=(read_game, game_count, seconds,
+                                      read_latencies, errors))
+               for _ in range(readers)]
+    workers.append(threading.Thread(target=repeat,
+                                    args=(write_chat, game_count, seconds,
+                                          write_latencies, errors)))
+
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    read_latencies.sort()
+    p99 = (read_latencies[int(len(read_latencies) * 0.99) - 1]
+           if read_latencies else 0)
+
+    return (len(read_latencies) / seconds, len(write_latencies) / seconds,
+            p99, len(errors))
+
+
+def run(label, profile, workdir, game_count, seconds, readers):
+    database.DEFAULT_FILES.update(
+        DATABASE_FILE=os.path.join(workdir, f'{label}.db'))
+    shutil.copy('chesscorpy.db', database.DATABASE_FILE)
+    database.PROFILE = profile
+    database.check_profile(database.DATABASE_FILE)
+    populate(game_count)
+
+    reads = throughput(read_game, game_count, seconds)
+    writes = throughput(write_chat, game_count, seconds)
+    both = concurrent(game_count, seconds, readers)
+
+    print(f'{label}: {reads:.0f} reads/s, {writes:.0f} writes/s alone; '
+          f'{both[0]:.0f} reads/s (p99 {both[2] * 1000:.1f} ms) and '
+          f'{both[1]:.0f} writes/s together, {both[3]} failed')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=50000)
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--readers', type=int, default=4)
+    args = parser.parse_args()
+
+    database.GROUP_COMMIT = False
+
+    with tempfile.TemporaryDirectory() as workdir:
+        run('default', {'journal_mode': 'delete'}, workdir, args.games,
+            args.seconds, args.readers)
+        run('tuned', database.TUNED_PROFILE, workdir, args.games,
+            args.seconds, args.readers)
+
+
+if __name__ == '__main__':
+    main()
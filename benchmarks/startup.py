@@ -0,0 +1,68 @@
+"""Measures how long the app takes to import, create and serve a request.
+
+Each measurement runs in a fresh interpreter. Run from the repository root:
+
+    python benchmarks/startup.py [--runs N] [--path CHECKOUT]
+
+--path points at another checkout, e.g. an older commit, to compare.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+
+# Older checkouts build the app on import rather than through create_app.
+SCRIPT = '''
+import json, sys, time
+sys.path.insert(0, {path!r})
+start = time.perf_counter()
+import chesscorpy
+imported = time.perf_counter()
+if hasattr(chesscorpy, 'create_app'):
+    app = chesscorpy.create_app({{'RUN_JOBS': False}})
+else:
+    app = chesscorpy.app
+created = time.perf_counter()
+app.test_client().get('/login')
+served = time.perf_counter()
+print(json.dumps({{'import': imported - start, 'create_app': created - imported,
+                  'first_request': served - created, 'total': served - start}}))
+sys.stdout.flush()
+import os
+os._exit(0)
+'''
+
+
+def measure(path, runs, workdir):
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', SCRIPT.format(path=path)],
+                             cwd=workdir, capture_output=True, text=True,
+                             check=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+
+    return {key: statistics.median(r[key] for r in results) * 1000
+            for key in results[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--path', default=os.getcwd())
+    args = parser.parse_args()
+
+    # Run somewhere disposable since sessions are written to the cwd.
+    with tempfile.TemporaryDirectory() as workdir:
+        results = measure(os.path.abspath(args.path), args.runs, workdir)
+
+    for key, ms in results.items():
+        print(f'{key:>14}: {ms:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Measures how long it takes to pair and create a tournament round.
+
+Fills a copy of the database with players, starts a Swiss tournament,
+then finishes every game of each round with random results and times
+pairing the next one. Run from the repository root:
+
+    python benchmarks/tournament.py [--players N] [--rounds N] [--storage S]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.getcwd())
+
+from chesscorpy import database, games, storage, tournaments  # noqa: E402
+from chesscorpy import user  # noqa: E402
+
+
+def populate(db, players):
+    database.sql_exec_batch(db, [
+        ('INSERT INTO users (id, username, password, email, rating, '
+         'notifications) VALUES(?, ?, ?, ?, ?, 0)',
+         [[user_id, f'player{user_id}', '', f'p{user_id}@example.com',
+           random.randint(800, 2400)]
+          for user_id in range(1, players + 1)])
+    ])
+
+
+def finish_round(tournament_id):
+    rows = database.sql_exec(database.DATABASE_FILE,
+                             'SELECT games.id, player_white_id, '
+                             'player_black_id FROM tournament_games JOIN '
+                             'games ON games.id = tournament_games.game_id '
+                             'WHERE tournament_id = ? AND round = (SELECT '
+                             'current_round FROM tournaments WHERE id = ?)',
+                             [tournament_id, tournament_id])
+
+    database.sql_exec_batch(database.DATABASE_FILE, [
+        ('UPDATE games SET status = ?, winner = ? WHERE id = ?',
+         [[games.Status.CHECKMATE, random.choice(
+             (row['player_white_id'], row['player_black_id'],
+              user.DRAW_USER_ID)), row['id']] for row in rows])
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--storage', choices=(storage.SQLITE, storage.MEMORY),
+                        default=storage.SQLITE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database.DEFAULT_FILES.update(
+            DATABASE_FILE=os.path.join(workdir, 'chesscorpy.db'),
+            ARCHIVE_FILE=os.path.join(workdir, 'archive.db'))
+        shutil.copy('chesscorpy.db', database.DATABASE_FILE)
+        storage.create(args.storage).open()
+
+        populate(database.DATABASE_FILE, args.players)
+        tournament_id = tournaments.create('Benchmark', tournaments.SWISS, 1,
+                                           1, args.rounds)
+        database.sql_exec_batch(database.DATABASE_FILE, [
+            ('INSERT OR IGNORE INTO tournament_players (tournament_id, '
+             'user_id) VALUES(?, ?)',
+             [[tournament_id, user_id]
+              for user_id in range(1, args.players + 1)])
+        ])
+
+        start = time.perf_counter()
+        tournaments.start(tournament_id, 1)
+        print(f'round 1: {(time.perf_counter() - start) * 1000:.1f} ms')
+
+        for round_number in range(2, args.rounds + 1):
+            finish_round(tournament_id)
+
+            start = time.perf_counter()
+            tournaments.advance(tournament_id)
+            print(f'round {round_number}: '
+                  f'{(time.perf_counter() - start) * 1000:.1f} ms')
+
+        standings = tournaments.get_standings(tournament_id)
+        print(f'leader: {standings[0]["username"]} with '
+              f'{standings[0]["points"]} points')
+
+
+if __name__ == '__main__':
+    main()
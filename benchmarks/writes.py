@@ -0,0 +1,82 @@
+"""Compares write throughput and latency with and without group commit.
+
+Many threads each post chat messages through database.sql_exec_batch,
+first with a connection and commit per write, then through the writer
+thread. Run from the repository root:
+
+    python benchmarks/writes.py [--threads N] [--writes N] [--storage S]
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.getcwd())
+
+from chesscorpy import database, storage  # noqa: E402
+
+
+def post_chats(writes, latencies, errors):
+    for i in range(writes):
+        start = time.perf_counter()
+        try:
+            database.sql_exec_batch(database.DATABASE_FILE, [
+                ('INSERT INTO chats (game_id, user_id, contents) '
+                 'VALUES(1, 1, ?)', [[f'message {i}']]),
+                ('INSERT INTO user_counters (user_id, unread_chats) '
+                 'VALUES(2, 1) ON CONFLICT(user_id) DO UPDATE SET '
+                 'unread_chats = unread_chats + 1', [()])
+            ])
+        except sqlite3.OperationalError:
+            errors.append(1)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def run(label, threads, writes):
+    latencies, errors = [], []
+    workers = [threading.Thread(target=post_chats,
+                                args=(writes, latencies, errors))
+               for _ in range(threads)]
+
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0
+    print(f'{label}: {len(latencies) / elapsed:.0f} writes/s, '
+          f'p99 {p99 * 1000:.1f} ms, {len(errors)} failed')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--writes', type=int, default=200)
+    parser.add_argument('--storage', choices=(storage.SQLITE, storage.MEMORY),
+                        default=storage.SQLITE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database.DEFAULT_FILES.update(
+            DATABASE_FILE=os.path.join(workdir, 'chesscorpy.db'))
+        shutil.copy('chesscorpy.db', database.DATABASE_FILE)
+        storage.create(args.storage).open()
+
+        database.GROUP_COMMIT = False
+        run('commit per write', args.threads, args.writes)
+
+        database.GROUP_COMMIT = True
+        run('group commit', args.threads, args.writes)
+
+
+if __name__ == '__main__':
+    main()
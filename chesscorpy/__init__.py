@@ -1 +1 @@
-from .app import app
\ No newline at end of file
+from .app import create_app
\ No newline at end of file
@@ -0,0 +1,322 @@
+import io
+import math
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from . import database, archive
+
+
+# The bundled engine, for running the pipeline without Stockfish.
+STUB_ENGINE = [sys.executable,
+               os.path.join(os.path.dirname(__file__), 'stub_engine.py')]
+
+MAX_WORKERS = 2
+SECONDS_PER_POSITION = 0.1
+PLIES_PER_RUN = 100
+MAX_ATTEMPTS = 3
+STALE_SECONDS = 15 * 60
+MATE_SCORE = 10000
+
+
+class State:
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+
+BLUNDER = 'blunder'
+
+# The worker processes, kept between runs since spawning them is slow,
+# and the (workers, profile) they were started with.
+_pool = None
+_pool_config = None
+_pool_lock = threading.Lock()
+
+# Drops in the mover's winning chances, in percent, that mark a bad move.
+CLASSIFICATIONS = ((BLUNDER, 30), ('mistake', 20), ('inaccuracy', 10))
+
+
+def enqueue(game_id):
+    """Queues a finished game for analysis."""
+
+    query = ('INSERT OR IGNORE INTO game_analysis (game_id, state, updated) '
+             'VALUES(?, ?, ?)')
+    query_args = [game_id, State.QUEUED, time.time()]
+
+    database.sql_exec(database.DATABASE_FILE, query, query_args)
+
+
+def win_percent(cp):
+    """Converts a centipawn score into winning chances from 0 to 100."""
+
+    return 50 + 50 * (2 / (1 + math.exp(-0.00368208 * cp)) - 1)
+
+
+def move_accuracy(win_before, win_after):
+    """Scores a move from 0 to 100 by how much winning chance it gave up.
+
+    Both chances are from the point of view of the player who moved.
+    """
+
+    drop = win_before - win_after
+    accuracy = 103.1668 * math.exp(-0.04354 * drop) - 3.1669
+    return max(0.0, min(100.0, accuracy))
+
+
+def classify(win_before, win_after):
+    """Returns the name of a bad move's classification, or None."""
+
+    drop = win_before - win_after
+    for name, threshold in CLASSIFICATIONS:
+        if drop >= threshold:
+            return name
+
+    return None
+
+
+def _pgn_moves(pgn):
+    import chess.pgn
+
+    game = chess.pgn.read_game(io.StringIO(pgn.replace('\\n', '\n')))
+    return list(game.mainline_moves()) if game else []
+
+
+def _evaluate(engine, board, seconds):
+    import chess.engine
+
+    info = engine.analyse(board, chess.engine.Limit(time=seconds))
+    return info['score'].white().score(mate_score=MATE_SCORE)
+
+
+def _last_eval(db, game_id, ply):
+    row = database.sql_exec(db, 'SELECT eval FROM move_analysis WHERE '
+                                'game_id = ? AND ply = ?', [game_id, ply],
+                            False)
+    return row['eval'] if row else None
+
+
+def _finish(db, game_id):
+    """Totals up per-move results and marks the game as analysed."""
+
+    moves = database.sql_exec(db, 'SELECT ply, accuracy, classification FROM '
+                                  'move_analysis WHERE game_id = ?',
+                              [game_id])
+
+    totals = {}
+    for color in (1, 0):
+        mine = [move for move in moves if move['ply'] % 2 == color]
+        totals[color] = (
+            sum(move['accuracy'] for move in mine) / len(mine) if mine
+            else None,
+            sum(move['classification'] == BLUNDER for move in mine)
+        )
+
+    query = ('UPDATE game_analysis SET state = ?, white_accuracy = ?, '
+             'black_accuracy = ?, white_blunders = ?, black_blunders = ?, '
+             'updated = ? WHERE game_id = ?')
+    query_args = [State.DONE, totals[1][0], totals[0][0], totals[1][1],
+                  totals[0][1], time.time(), game_id]
+
+    database.sql_exec(db, query, query_args)
+
+
+def analyse_game(db, archive_db, game_id, engine_command, seconds,
+                 max_plies):
+    """Analyses up to max_plies moves of a game, resuming where it left off.
+
+    Runs in a worker process. Each move is saved as soon as it is
+    analysed so an interrupted game loses no work. Returns True once
+    the whole game is analysed.
+    """
+
+    import chess
+    import chess.engine
+
+    # The game may have been archived while it waited in the queue.
+    game = database.sql_exec(db, 'SELECT pgn FROM main.games WHERE id = ? '
+                                 'UNION ALL SELECT pgn FROM '
+                                 f'{archive.SCHEMA}.games WHERE id = ?',
+                             [game_id] * 2, False,
+                             attach=archive.attach(archive_db))
+    moves = _pgn_moves(game['pgn']) if game['pgn'] else []
+    next_ply = database.sql_exec(db, 'SELECT next_ply FROM game_analysis '
+                                     'WHERE game_id = ?', [game_id],
+                                 False)['next_ply']
+
+    if next_ply > len(moves):
+        _finish(db, game_id)
+        return True
+
+    board = chess.Board()
+    for move in moves[:next_ply - 1]:
+        board.push(move)
+
+    engine = chess.engine.SimpleEngine.popen_uci(engine_command)
+    try:
+        if next_ply > 1:
+            before = _last_eval(db, game_id, next_ply - 1)
+        else:
+            before = _evaluate(engine, board, seconds)
+
+        last_ply = min(len(moves), next_ply + max_plies - 1)
+        for ply in range(next_ply, last_ply + 1):
+            move = moves[ply - 1]
+            san = board.san(move)
+            board.push(move)
+            after = _evaluate(engine, board, seconds)
+
+            if before is None:
+                before = after
+
+            # Score the move from the point of view of whoever played it.
+            sign = 1 if board.turn == chess.BLACK else -1
+            win_before = win_percent(sign * before)
+            win_after = win_percent(sign * after)
+
+            database.sql_exec_batch(db, [
+                ('INSERT OR REPLACE INTO move_analysis (game_id, ply, move, '
+                 'eval, accuracy, classification) VALUES(?, ?, ?, ?, ?, ?)',
+                 [[game_id, ply, san, after,
+                   move_accuracy(win_before, win_after),
+                   classify(win_before, win_after)]]),
+                ('UPDATE game_analysis SET next_ply = ?, updated = ? '
+                 'WHERE game_id = ?', [[ply + 1, time.time(), game_id]])
+            ])
+
+            before = after
+    finally:
+        engine.quit()
+
+    if last_ply == len(moves):
+        _finish(db, game_id)
+        return True
+
+    return False
+
+
+def _claim(limit):
+    """Marks the next games to analyse as running and returns their ids.
+
+    Games left running by a worker that died are picked up again.
+    """
+
+    now = time.time()
+    query = ('SELECT game_id FROM game_analysis WHERE state = ? OR '
+             '(state = ? AND updated < ?) ORDER BY game_id LIMIT ?')
+    query_args = [State.QUEUED, State.RUNNING, now - STALE_SECONDS, limit]
+
+    game_ids = [row['game_id'] for row in database.sql_exec(
+        database.DATABASE_FILE, query, query_args)]
+
+    database.sql_exec_batch(database.DATABASE_FILE, [
+        ('UPDATE game_analysis SET state = ?, updated = ? WHERE game_id = ?',
+         [[State.RUNNING, now, game_id] for game_id in game_ids])
+    ])
+
+    return game_ids
+
+
+def _requeue(game_id, failed):
+    query = ('UPDATE game_analysis SET attempts = attempts + ?, state = CASE '
+             'WHEN attempts + ? >= ? THEN ? ELSE ? END, updated = ? '
+             'WHERE game_id = ?')
+    query_args = [int(failed), int(failed), MAX_ATTEMPTS, State.FAILED,
+                  State.QUEUED, time.time(), game_id]
+
+    database.sql_exec(database.DATABASE_FILE, query, query_args)
+
+
+def _init_worker(profile):
+    database.PROFILE = profile
+
+
+def _get_pool(workers):
+    """Returns the worker processes, starting them on first use."""
+
+    global _pool, _pool_config
+
+    config = (workers, dict(database.PROFILE))
+
+    with _pool_lock:
+        if _pool is None or _pool_config != config:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+
+            # Spawn rather than fork since the scheduler runs jobs from a
+            # thread. Workers don't inherit the profile the app applied,
+            # so it's passed along.
+            _pool = ProcessPoolExecutor(
+                workers, multiprocessing.get_context('spawn'),
+                initializer=_init_worker, initargs=(config[1],))
+            _pool_config = config
+
+        return _pool
+
+
+def _drop_pool(pool):
+    global _pool
+
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+
+    pool.shutdown(wait=False)
+
+
+def run_pending(engine_command, workers=MAX_WORKERS,
+                seconds=SECONDS_PER_POSITION, max_plies=PLIES_PER_RUN):
+    """Analyses a batch of queued games, one per worker process.
+
+    Long games are analysed max_plies at a time over several runs so
+    one run never takes much longer than max_plies * seconds.
+    Returns the number of games finished.
+    """
+
+    game_ids = _claim(workers)
+    if not game_ids:
+        return 0
+
+    finished = 0
+    pool = _get_pool(workers)
+    futures = {
+        game_id: pool.submit(analyse_game, database.DATABASE_FILE,
+                             database.ARCHIVE_FILE, game_id, engine_command,
+                             seconds, max_plies)
+        for game_id in game_ids
+    }
+
+    for game_id, future in futures.items():
+        try:
+            done = future.result()
+        except BrokenProcessPool:
+            # A worker died, which breaks the whole pool; start afresh
+            # next run.
+            _drop_pool(pool)
+            _requeue(game_id, True)
+            continue
+        except Exception:
+            _requeue(game_id, True)
+            continue
+
+        if done:
+            finished += 1
+        else:
+            _requeue(game_id, False)
+
+    return finished
+
+
+def get_moves(game_id):
+    """Retrieves the analysis of every move of a game."""
+
+    query = ('SELECT ply, move, eval, accuracy, classification FROM '
+             'move_analysis WHERE game_id = ? ORDER BY ply')
+
+    return database.rows_to_list(
+        database.sql_exec(database.DATABASE_FILE, query, [game_id]))
@@ -1,41 +1,369 @@
-import flask_session
-import flask_mail
-from flask import Flask, render_template, redirect, request, jsonify, escape
-from apscheduler.schedulers.background import BackgroundScheduler
+import os
+import sys
+
+import click
+from flask import Blueprint, Flask, render_template, redirect
+from flask import request, jsonify, escape, current_app
+from flask.sessions import SessionInterface
 
 from . import helpers, database, handle_errors, user, games
-from . import handle_move, chat
+from . import handle_move, chat, explorer, live_games, pools, jobs
+from . import analysis, digests, archive, migrations, counters
+from . import ratelimit, positions, tournaments, writer, storage
+from . import player_stats, leaderboard, profiling, maintenance
+
+
+DEFAULT_CONFIG = {
+    # Change depending on your mail configuration.
+    'MAIL_SERVER': 'smtp.gmail.com',
+    'MAIL_PORT': 465,
+    'MAIL_USERNAME': 'chesscorpy@gmail.com',
+    'MAIL_PASSWORD': '***',
+    'MAIL_USE_TLS': False,
+    'MAIL_USE_SSL': True,
+
+    'SESSION_TYPE': 'filesystem',
+
+    # Run the scheduled jobs in this process once it serves a request.
+    # Turn off when running worker.py instead.
+    'RUN_JOBS': True,
+
+    # UCI engine command for analysing finished games, e.g.
+    # '/usr/bin/stockfish' or analysis.STUB_ENGINE. None turns it off.
+    'ANALYSIS_ENGINE': None,
+    'ANALYSIS_WORKERS': analysis.MAX_WORKERS,
+    'ANALYSIS_SECONDS_PER_POSITION': analysis.SECONDS_PER_POSITION,
+
+    # Finished games older than this are moved to the archive database.
+    'ARCHIVE_AFTER_DAYS': archive.ARCHIVE_AFTER_DAYS,
+
+    # Chats of games finished this long ago are compacted into one row
+    # per game, and compacted chats are deleted after CHAT_EXPIRE_AFTER_DAYS
+    # (None keeps them forever). Games keep at most CHAT_MAX_MESSAGES live
+    # messages; older ones are compacted too.
+    'CHAT_COMPACT_AFTER_DAYS': chat.COMPACT_AFTER_DAYS,
+    'CHAT_EXPIRE_AFTER_DAYS': chat.EXPIRE_AFTER_DAYS,
+    'CHAT_MAX_MESSAGES': chat.MAX_LIVE_MESSAGES,
+
+    # Token buckets limiting POSTs to /move and /chat per user and per IP.
+    # 'memory' is per process; use 'sqlite' when running several web
+    # processes. None turns rate limiting off.
+    'RATE_LIMIT_STORE': ratelimit.MEMORY,
+    'RATE_LIMITS': ratelimit.LIMITS,
+
+    # 'sqlite' keeps data in chesscorpy.db and its archive. 'memory'
+    # starts from a copy of chesscorpy.db held in memory, for tests,
+    # benchmarks and profiling without disk I/O; it is lost on exit.
+    'STORAGE': storage.SQLITE,
+
+    # How often the leaderboard's rank snapshot is recomputed.
+    'LEADERBOARD_REFRESH_MINUTES': leaderboard.REFRESH_MINUTES,
+
+    # Pragmas applied to every database connection, checked at startup.
+    # {} keeps SQLite's defaults.
+    'SQLITE_PROFILE': database.TUNED_PROFILE,
+
+    # Secret for the /status endpoints, sent in an X-Admin-Token header.
+    # None hides them.
+    'ADMIN_TOKEN': None,
+
+    # Requests sending PROFILING_TOKEN in the X-Profile-Token header, and
+    # a random PROFILING_SAMPLE_RATE (0 to 1) of all others, are sampled
+    # into flame graph stacks in PROFILING_DIR. The oldest are deleted to
+    # keep it under PROFILING_MAX_MB. No token and no rate turns it off.
+    'PROFILING_TOKEN': None,
+    'PROFILING_SAMPLE_RATE': profiling.SAMPLE_RATE,
+    'PROFILING_DIR': profiling.DIRECTORY,
+    'PROFILING_MAX_MB': profiling.MAX_MEGABYTES,
+
+    # Queue batched writes to a single writer thread that commits
+    # everything waiting in one transaction.
+    'GROUP_COMMIT': True
+}
+
+views = Blueprint('views', __name__, cli_group=None)
+
+API_MAX_GAMES = 100
+
+
+class _LazySessionInterface(SessionInterface):
+    """Sets up Flask-Session the first time a session is opened."""
+
+    def __init__(self):
+        self._interface = None
+
+    def _get_interface(self, app):
+        if self._interface is None:
+            import flask_session
+            self._interface = flask_session.Session()._get_interface(app)
+
+        return self._interface
+
+    def open_session(self, app, request_):
+        return self._get_interface(app).open_session(app, request_)
+
+    def save_session(self, app, session, response):
+        return self._get_interface(app).save_session(app, session, response)
+
+
+def _start_jobs(app):
+    """Starts the scheduler that ticks the job runner."""
+
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    # Jobs are run by whichever process holds the leader lease, so it's
+    # safe for every web worker to run this scheduler.
+    runner = jobs.Runner(app.app_context)
+    scheduler = BackgroundScheduler()
+    scheduler.add_job(runner.tick, 'interval', seconds=jobs.TICK_SECONDS)
+    scheduler.start()
+
+    app.extensions['job_scheduler'] = scheduler
+
+
+def _check_sqlite_profile(app):
+    """Applies the SQLite profile and warns about pragmas that didn't take."""
+
+    database.PROFILE = app.config['SQLITE_PROFILE']
+
+    # In memory there's no journal file or mmap to tune.
+    if app.config['STORAGE'] == storage.MEMORY:
+        return
+
+    # The archive is left to be created, and profiled, on first use, so
+    # creating the app doesn't start its writer thread before a server
+    # forks.
+    storage_ = app.extensions['storage']
+    db_files = [storage_.database_file]
+    if os.path.exists(storage_.archive_file):
+        db_files.append(storage_.archive_file)
+
+    for db_file in db_files:
+        for pragma, (wanted, actual) in database.check_profile(
+                db_file).items():
+            app.logger.warning('PRAGMA %s is %s instead of %s in %s.',
+                               pragma, actual, wanted, db_file)
+
+
+def create_app(config=None):
+    """Creates the app.
+
+    Mail, sessions and the job scheduler are only set up once they are
+    first needed, so creating an app for tests or tools is cheap.
+    """
+
+    app = Flask(__name__)
+    app.config.from_mapping(DEFAULT_CONFIG)
+    if config:
+        app.config.from_mapping(config)
+
+    app.session_interface = _LazySessionInterface()
+    app.extensions['storage'] = storage.create(app.config['STORAGE'])
+    app.extensions['storage'].open()
+    database.GROUP_COMMIT = app.config['GROUP_COMMIT']
+    _check_sqlite_profile(app)
+    app.register_blueprint(views)
+
+    if app.config['PROFILING_TOKEN'] or app.config['PROFILING_SAMPLE_RATE']:
+        profiling.init_app(app)
+
+    def handle_timeouts_wrap():
+        """Allow for the call of mail in check_games under app context."""
+
+        with app.app_context():
+            games.handle_timeouts(helpers.get_mail())
+
+    def send_digests_wrap():
+        with app.app_context():
+            return digests.send_digests(helpers.get_mail())
+
+    jobs.register('handle_timeouts', 30, handle_timeouts_wrap)
+    jobs.register('send_digests', 5 * 60, send_digests_wrap)
+    jobs.register('archive_games', 60 * 60, lambda: archive.archive_games(
+        app.config['ARCHIVE_AFTER_DAYS']))
+    jobs.register('chat_maintenance', 15 * 60, lambda: chat.maintain(
+        app.config['CHAT_COMPACT_AFTER_DAYS'],
+        app.config['CHAT_EXPIRE_AFTER_DAYS'], app.config['CHAT_MAX_MESSAGES']))
+    jobs.register('advance_tournaments', 5 * 60, tournaments.advance_all)
+    jobs.register('refresh_leaderboard',
+                  app.config['LEADERBOARD_REFRESH_MINUTES'] * 60,
+                  leaderboard.refresh)
+
+    if app.config['RATE_LIMIT_STORE'] == ratelimit.SQLITE:
+        jobs.register('prune_rate_limits', 60 * 60, ratelimit.prune)
 
+    if app.config['ANALYSIS_ENGINE']:
+        jobs.register('analyse_games', 60, lambda: analysis.run_pending(
+            app.config['ANALYSIS_ENGINE'], app.config['ANALYSIS_WORKERS'],
+            app.config['ANALYSIS_SECONDS_PER_POSITION']))
 
-app = Flask(__name__)
+    if app.config['RUN_JOBS']:
+        app.before_first_request(lambda: _start_jobs(app))
 
-# Change depending on your mail configuration.
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 465
-app.config['MAIL_USERNAME'] = 'chesscorpy@gmail.com'
-app.config['MAIL_PASSWORD'] = '***'
-app.config['MAIL_USE_TLS'] = False
-app.config['MAIL_USE_SSL'] = True
+    return app
 
-app.config['SESSION_TYPE'] = 'filesystem'
-mail = flask_mail.Mail(app)
-flask_session.Session(app)
 
+@views.cli.command('rebuild-explorer')
+def rebuild_explorer():
+    """Rebuilds the opening explorer index from all games."""
 
-def handle_timeouts_wrap():
-    """Allow for the call of mail in check_games under app context."""
+    print(f'Indexed {explorer.rebuild()} position moves.')
 
-    with app.app_context():
-        games.handle_timeouts(mail)
 
+@views.cli.command('rebuild-user-search')
+def rebuild_user_search():
+    """Rebuilds the username search index from all users."""
 
-# Set up the job that checks for timed out games.
-game_check_job = BackgroundScheduler()
-game_check_job.add_job(handle_timeouts_wrap, 'interval', seconds=30)
-game_check_job.start()
+    user.rebuild_search()
 
 
-@app.route('/')
+@views.cli.command('rebuild-live-games')
+def rebuild_live_games():
+    """Rebuilds the live games feed from all active public games."""
+
+    print(f'Added {live_games.rebuild()} games to the feed.')
+
+
+@views.cli.command('rebuild-positions')
+def rebuild_positions():
+    """Recomputes the current position of every game from its PGN."""
+
+    print(f'Rebuilt positions for {positions.rebuild()} games.')
+
+
+@views.cli.command('rebuild-counters')
+def rebuild_counters():
+    """Recounts every user's dashboard counters."""
+
+    print(f'Rebuilt counters for {counters.rebuild()} users.')
+
+
+@views.cli.command('rebuild-stats')
+def rebuild_stats():
+    """Recomputes every user's game statistics from all finished games."""
+
+    print(f'Rebuilt statistics for {player_stats.rebuild()} users.')
+
+
+@views.cli.command('upgrade-schema')
+def upgrade_schema():
+    """Adds the tables, columns and indexes the database is missing."""
+
+    applied = migrations.upgrade_schema(database.DATABASE_FILE)
+
+    for name, after in applied:
+        print(f'Applied {name}.' + (f' Now run: {after}' if after else ''))
+
+    if not applied:
+        print('The schema is up to date.')
+
+
+@views.cli.command('migrate-epoch-times')
+def migrate_epoch_times():
+    """Converts localtime text time columns to UTC epoch integers."""
+
+    migrated = migrations.migrate()
+    print(f'Converted {", ".join(migrated) or "no"} tables.')
+
+
+def _maintained_file(archive_):
+    return database.ARCHIVE_FILE if archive_ else database.DATABASE_FILE
+
+
+# Maintenance commands work in short steps with pauses between them, so
+# they can run while the site is busy. --duty is the share of the time
+# spent working, from 0 to 1.
+_archive_option = click.option('--archive', 'archive_', is_flag=True,
+                               help='Use the archive database.')
+_duty_option = click.option('--duty', type=click.FloatRange(0.01, 1),
+                            default=maintenance.DUTY)
+
+
+@views.cli.command('db-backup')
+@click.argument('destination')
+@_archive_option
+@_duty_option
+@click.option('--pages', type=click.IntRange(1),
+              default=maintenance.BACKUP_PAGES_PER_STEP)
+def db_backup(destination, archive_, duty, pages):
+    """Copies the database to DESTINATION while it stays in use."""
+
+    result = maintenance.backup(_maintained_file(archive_), destination,
+                                pages, duty)
+    print(f'Copied {result["pages"]} pages in {result["steps"]} steps and '
+          f'{result["seconds"]} seconds.')
+
+
+@views.cli.command('db-optimize')
+@_archive_option
+@_duty_option
+def db_optimize(archive_, duty):
+    """Refreshes the statistics the query planner uses."""
+
+    tables = maintenance.optimize(_maintained_file(archive_), duty)
+    print(f'Analysed {tables} tables.')
+
+
+@views.cli.command('db-vacuum')
+@_archive_option
+@_duty_option
+@click.option('--pages', type=click.IntRange(1),
+              default=maintenance.VACUUM_PAGES_PER_STEP)
+@click.option('--enable-incremental', is_flag=True,
+              help='Rebuild the database to allow incremental vacuums. '
+                   'This blocks writes until it is done.')
+def db_vacuum(archive_, duty, pages, enable_incremental):
+    """Gives the database's unused pages back to the file system."""
+
+    db_file = _maintained_file(archive_)
+
+    if enable_incremental:
+        maintenance.enable_incremental_vacuum(db_file)
+
+    freed = maintenance.vacuum(db_file, pages, duty)
+
+    if freed is None:
+        sys.exit('Incremental vacuum is off; turn it on once with '
+                 '--enable-incremental.')
+
+    print(f'Freed {freed} pages.')
+
+
+@views.cli.command('db-check')
+@_archive_option
+@_duty_option
+def db_check(archive_, duty):
+    """Checks the integrity of every table and index."""
+
+    problems = maintenance.check(_maintained_file(archive_), duty)
+
+    for problem in problems:
+        print(problem)
+
+    if problems:
+        sys.exit(f'Found {len(problems)} problems.')
+
+    print('No problems found.')
+
+
+@views.cli.command('db-sizes')
+@_archive_option
+@_duty_option
+def db_sizes(archive_, duty):
+    """Lists every table and index by the space it takes up."""
+
+    for name, table, size in maintenance.sizes(_maintained_file(archive_),
+                                               duty):
+        owner = '' if name == table else f' (on {table})'
+        print(f'{size / 1024:>12,.0f} KiB  {name}{owner}')
+
+
+# Times are stored as UTC epoch seconds and only formatted for display.
+views.add_app_template_filter(helpers.format_time, 'datetime')
+views.add_app_template_filter(helpers.format_time_left, 'time_left')
+
+
+@views.route('/')
 def index():
     """Displays the homepage if user is not logged in,
     otherwise display user page.
@@ -44,12 +372,14 @@ def index():
     if user.logged_in():
         return render_template(
             '/index_loggedin.html',
-            user_data=user.get_data_by_id(user.get_logged_in_id()))
+            user_data=user.get_data_by_id(user.get_logged_in_id()),
+            counters=counters.get(user.get_logged_in_id()),
+            live_games=live_games.get_games(1, live_games.WIDGET_SIZE))
     else:
         return render_template('index.html')
 
 
-@app.route('/register', methods=['GET', 'POST'])
+@views.route('/register', methods=['GET', 'POST'])
 def register():
     """Allows a new user to register."""
 
@@ -75,7 +405,7 @@ def register():
         return render_template('register.html')
 
 
-@app.route('/login', methods=['GET', 'POST'])
+@views.route('/login', methods=['GET', 'POST'])
 def login():
     """Allows a user to login."""
 
@@ -103,7 +433,7 @@ def login():
         return render_template('login.html')
 
 
-@app.route('/logout')
+@views.route('/logout')
 @helpers.login_required
 def logout():
     """Logs a user out."""
@@ -112,7 +442,7 @@ def logout():
     return redirect('/')
 
 
-@app.route('/profile')
+@views.route('/profile')
 @helpers.login_required
 def profile():
     """Displays the profile of a user."""
@@ -123,10 +453,11 @@ def profile():
     if not user_data:
         return helpers.error('That user does not exist.', 400)
 
-    return render_template('profile.html', user_data=user_data)
+    return render_template('profile.html', user_data=user_data,
+                           stats=player_stats.get(user_id))
 
 
-@app.route('/opengames')
+@views.route('/opengames')
 @helpers.login_required
 def opengames():
     """Displays a list of public or private game requests
@@ -138,10 +469,10 @@ def opengames():
     else:
         games_ = games.get_public_requests()
 
-    return render_template('opengames.html', games=games_)
+    return helpers.stream_template('opengames.html', games=games_)
 
 
-@app.route('/newgame', methods=['GET', 'POST'])
+@views.route('/newgame', methods=['GET', 'POST'])
 @helpers.login_required
 def newgame():
     """Allows users to create a game request."""
@@ -173,7 +504,7 @@ def newgame():
         return render_template('newgame.html', username=username)
 
 
-@app.route('/start')
+@views.route('/start')
 @helpers.login_required
 def start():
     """Creates a game from a game request."""
@@ -202,7 +533,82 @@ def start():
     return redirect(f'/game?id={game_id}')
 
 
-@app.route('/game')
+@views.route('/tournaments', methods=['GET', 'POST'])
+@helpers.login_required
+def tournament_list():
+    """Lists recent tournaments and allows users to create one."""
+
+    if request.method == 'POST':
+        name = request.form.get('name', '').strip()
+        format_ = request.form.get('format')
+        turnlimit = request.form.get('turnlimit', type=int)
+        rounds = request.form.get('rounds', type=int)
+
+        errors = handle_errors.for_tournament_input(name, format_, turnlimit,
+                                                    rounds)
+        if errors:
+            return errors
+
+        tournament_id = tournaments.create(name, format_,
+                                           user.get_logged_in_id(), turnlimit,
+                                           rounds)
+
+        return redirect(f'/tournament?id={tournament_id}')
+    else:
+        return render_template('tournaments.html',
+                               tournaments=tournaments.get_all(),
+                               max_rounds=tournaments.MAX_SWISS_ROUNDS)
+
+
+@views.route('/tournament')
+@helpers.login_required
+def tournament():
+    """Shows the players, standings and pairings of a tournament."""
+
+    tournament_id = request.args.get('id', type=int)
+    tournament_data = tournaments.get(tournament_id)
+
+    if not tournament_data:
+        return redirect('/tournaments')
+
+    user_id = user.get_logged_in_id()
+    standings = tournaments.get_standings(tournament_id)
+
+    return render_template('tournament.html', tournament=tournament_data,
+                           standings=standings,
+                           rounds=tournaments.get_rounds(tournament_id),
+                           user_id=user_id,
+                           joined=any(row['user_id'] == user_id
+                                      for row in standings),
+                           Status=tournaments.Status)
+
+
+@views.route('/tournament/join', methods=['POST'])
+@helpers.login_required
+def tournament_join():
+    """Enters the user into a tournament that hasn't started."""
+
+    tournament_id = request.form.get('id', type=int)
+    tournaments.join(tournament_id, user.get_logged_in_id())
+
+    return redirect(f'/tournament?id={tournament_id}')
+
+
+@views.route('/tournament/start', methods=['POST'])
+@helpers.login_required
+def tournament_start():
+    """Starts a tournament and pairs its first round."""
+
+    tournament_id = request.form.get('id', type=int)
+
+    if not tournaments.start(tournament_id, user.get_logged_in_id()):
+        return helpers.error('Only the creator can start a tournament, once '
+                             'it has at least two players.', 400)
+
+    return redirect(f'/tournament?id={tournament_id}')
+
+
+@views.route('/game')
 @helpers.login_required
 def game():
     """Generates a game board based on the status of the game and
@@ -231,7 +637,80 @@ def game():
     return render_template('game.html', game_data=game_data)
 
 
-@app.route('/activegames')
+@views.route('/api/games')
+@helpers.login_required
+def api_games():
+    """Retrieves the current state of up to API_MAX_GAMES games as JSON."""
+
+    try:
+        game_ids = [int(game_id) for game_id in
+                    request.args.get('ids', '').split(',') if game_id]
+    except ValueError:
+        return jsonify(error='ids must be a comma separated list.'), 400
+
+    if len(game_ids) > API_MAX_GAMES:
+        return jsonify(
+            error=f'At most {API_MAX_GAMES} games per request.'), 400
+
+    return jsonify(games=games.get_states_if_authed(game_ids,
+                                                    user.get_logged_in_id()))
+
+
+@views.route('/leaderboard')
+@helpers.login_required
+def leaderboard_page():
+    """Shows a page of players ranked by rating."""
+
+    my_rank = leaderboard.get_rank(user.get_logged_in_id())
+    page = request.args.get('page', type=int) or 1
+
+    return render_template('leaderboard.html', page=page,
+                           players=leaderboard.get_page(page),
+                           pages=max(1, -(-leaderboard.get_count()
+                                          // leaderboard.PAGE_SIZE)),
+                           my_rank=my_rank)
+
+
+@views.route('/api/leaderboard')
+@helpers.login_required
+def api_leaderboard():
+    """Retrieves a page of the leaderboard and the user's rank as JSON."""
+
+    page = request.args.get('page', 1, type=int)
+    size = request.args.get('size', leaderboard.PAGE_SIZE, type=int)
+
+    return jsonify(page=page, players=leaderboard.get_page(page, size),
+                   total=leaderboard.get_count(),
+                   me=leaderboard.get_rank(user.get_logged_in_id()))
+
+
+@views.route('/game/<int:game_id>/state')
+@helpers.login_required
+def game_state(game_id):
+    """Retrieves the state of a game as JSON for polling clients.
+
+    Responds with 304 Not Modified if the client's ETag is still current.
+    """
+
+    user_id = user.get_logged_in_id()
+    version = games.get_version_if_authed(game_id, user_id)
+
+    if not version:
+        return jsonify(error='Game not found.'), 404
+
+    etag = games.version_etag(version)
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(games.get_polled_state_if_authed(game_id, user_id))
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+
+    return response
+
+
+@views.route('/activegames')
 @helpers.login_required
 def activegames():
     """Displays the active games of a user."""
@@ -255,12 +734,12 @@ def activegames():
     else:
         my_games = False
 
-    return render_template('activegames.html',
-                           games=games.format_active_games(games_),
-                           username=username, my_games=my_games)
+    return helpers.stream_template('activegames.html',
+                                   games=games.format_active_games(games_),
+                                   username=username, my_games=my_games)
 
 
-@app.route('/history')
+@views.route('/history')
 @helpers.login_required
 def history():
     """Displays the game history of a user."""
@@ -274,29 +753,37 @@ def history():
     username = user_['username']
     games_ = games.get_game_history_if_authed(user_id, user.get_logged_in_id())
 
-    return render_template('history.html',
-                           games=games.format_game_history(games_),
-                           username=username)
+    return helpers.stream_template('history.html',
+                                   games=games.format_game_history(games_),
+                                   username=username)
 
 
-@app.route('/settings', methods=['GET', 'POST'])
+@views.route('/settings', methods=['GET', 'POST'])
 @helpers.login_required
 def settings():
     """Allows user to change settings."""
 
     if request.method == 'POST':
         notify = 0 if not request.form.get('notifications') else 1
+        digest = request.form.get('digest')
 
-        user.update_settings(user.get_logged_in_id(), notify)
+        if digest not in user.DIGEST_MODES:
+            digest = digests.IMMEDIATE
+
+        user.update_settings(user.get_logged_in_id(), notify, digest)
         return redirect('/')
     else:
-        notify = int(user.get_data_by_id(user.get_logged_in_id(),
-                                         ['notifications'])['notifications'])
-        return render_template('settings.html', notify=notify)
+        settings_ = user.get_data_by_id(user.get_logged_in_id(),
+                                        ['notifications', 'digest'])
+        return render_template('settings.html',
+                               notify=int(settings_['notifications']),
+                               digest=settings_['digest'],
+                               digest_modes=user.DIGEST_MODES)
 
 
-@app.route('/move', methods=['GET', 'POST'])
+@views.route('/move', methods=['GET', 'POST'])
 @helpers.login_required
+@ratelimit.limit('move')
 def move_request():
     """Processes a move request for a game by a user."""
 
@@ -314,23 +801,26 @@ def move_request():
         ):
             return jsonify(successful=False)
 
-        # Need app context for process_move to send mail.
-        with app.app_context():
-            move_success = handle_move.process_move(
-                move, database.row_to_dict(game_data), mail)
+        move_success = handle_move.process_move(
+            move, database.row_to_dict(game_data), helpers.get_mail())
 
         return jsonify(successful=move_success)
     else:
         return redirect('/')
 
 
-@app.route('/chat', methods=['GET', 'POST'])
+@views.route('/chat', methods=['GET', 'POST'])
 @helpers.login_required
+@ratelimit.limit('chat')
 def handle_chat():
     """Sends or retrieves chat messages."""
 
     if request.method == 'GET':
-        return jsonify(chat.get_chats(request.args.get('id', type=int)))
+        game_id = request.args.get('id', type=int)
+        chat.mark_read(game_id, user.get_logged_in_id())
+
+        return jsonify(chat.get_chats(game_id,
+                                      current_app.config['CHAT_MAX_MESSAGES']))
     else:
         game_id = request.form.get('game_id', type=int)
         user_id = request.form.get('user_id', type=int)
@@ -345,3 +835,92 @@ def handle_chat():
         chat.new_chat(game_id, user_id, msg)
 
         return jsonify(successful=True)
+
+
+@views.route('/counters')
+@helpers.login_required
+def user_counters():
+    """Returns the logged in user's dashboard counters for badges."""
+
+    return jsonify(counters.get(user.get_logged_in_id()))
+
+
+@views.route('/explorer')
+@helpers.login_required
+def explorer_moves():
+    """Retrieves site statistics for the moves played from a position."""
+
+    moves = explorer.get_moves(request.args.get('fen', ''))
+
+    if moves is None:
+        return jsonify(successful=False)
+
+    return jsonify(successful=True, moves=moves)
+
+
+@views.route('/users/search')
+@helpers.login_required
+def user_search():
+    """Retrieves users matching a partial username for autocompletion."""
+
+    return jsonify(users=user.search(
+        request.args.get('q', ''),
+        request.args.get('limit', user.SEARCH_MAX_RESULTS, type=int)))
+
+
+@views.route('/livegames')
+@helpers.login_required
+def livegames():
+    """Displays the most recently active public games."""
+
+    page = request.args.get('page', 1, type=int)
+
+    return render_template('livegames.html', games=live_games.get_games(page),
+                           page=max(page, 1))
+
+
+@views.route('/livegames/feed')
+@helpers.login_required
+def livegames_feed():
+    """Retrieves a page of the live games feed."""
+
+    return jsonify(games=live_games.get_games(
+        request.args.get('page', 1, type=int),
+        request.args.get('size', live_games.PAGE_SIZE, type=int)))
+
+
+@views.route('/status/pools')
+@helpers.admin_required
+def pool_status():
+    """Retrieves the load of the background thread pools."""
+
+    return jsonify(pools.stats())
+
+
+@views.route('/status/ratelimits')
+@helpers.admin_required
+def rate_limit_status():
+    """Retrieves the number of requests rejected by rate limits."""
+
+    return jsonify(ratelimit.stats())
+
+
+@views.route('/status/writer')
+@helpers.admin_required
+def writer_status():
+    """Retrieves how many writes each writer thread has grouped together."""
+
+    return jsonify(writer.stats())
+
+
+@views.route('/analysis')
+@helpers.login_required
+def game_analysis():
+    """Retrieves the engine analysis of every move of a finished game."""
+
+    game_id = request.args.get('id', type=int)
+
+    if not games.get_game_data_if_authed(game_id, user.get_logged_in_id()):
+        return jsonify(successful=False)
+
+    return jsonify(successful=True, moves=analysis.get_moves(game_id))
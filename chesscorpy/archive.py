@@ -0,0 +1,96 @@
+import time
+
+from . import database, games, helpers
+
+
+SCHEMA = 'archive'
+ARCHIVE_AFTER_DAYS = 30
+BATCH_SIZE = 200
+MAX_BATCHES_PER_RUN = 10
+
+# Same columns, in the same order, as the games table so rows can be
+# moved and read with SELECT *.
+_GAMES_TABLE = '''CREATE TABLE IF NOT EXISTS "games" (
+    "id" INTEGER NOT NULL UNIQUE,
+    "player_white_id" INTEGER NOT NULL,
+    "player_black_id" INTEGER NOT NULL,
+    "turn_day_limit" INTEGER NOT NULL DEFAULT 1,
+    "to_move" INTEGER NOT NULL,
+    "move_start_time" INTEGER NOT NULL,
+    "status" TEXT NOT NULL,
+    "winner" INTEGER,
+    "pgn" TEXT,
+    "public" INTEGER NOT NULL DEFAULT 1,
+    "timestamp" INTEGER NOT NULL,
+    PRIMARY KEY("id")
+)'''
+
+_GAMES_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS "games_white" ON "games" ("player_white_id")',
+    'CREATE INDEX IF NOT EXISTS "games_black" ON "games" ("player_black_id")'
+)
+
+_created = set()
+
+
+def attach(archive_file=None):
+    """Returns the attach argument for queries that read the archive.
+
+    The archive database is created, with the SQLite profile applied,
+    the first time it is needed.
+    """
+
+    archive_file = archive_file or database.ARCHIVE_FILE
+
+    if archive_file not in _created:
+        database.check_profile(archive_file)
+        database.sql_exec_batch(archive_file, [
+            (query, [()]) for query in (_GAMES_TABLE,) + _GAMES_INDEXES
+        ])
+        _created.add(archive_file)
+
+    return [(archive_file, SCHEMA)]
+
+
+def archive_games(max_age_days=ARCHIVE_AFTER_DAYS):
+    """Moves finished games older than max_age_days into the archive.
+
+    Games are moved in small batches so the write lock is never held for
+    long. Each batch is committed to the archive first, and only the
+    games found there afterwards are deleted from the main database: in
+    WAL mode SQLite doesn't commit across attached databases atomically,
+    so one transaction could lose games in a crash. A crash in between
+    leaves games in both, until the next run finishes moving them.
+    Returns how many were moved.
+    """
+
+    select = ('SELECT * FROM games WHERE status != '
+              f'"{games.Status.NO_MOVE}" AND status != '
+              f'"{games.Status.IN_PROGRESS}" AND move_start_time < ? '
+              f'ORDER BY id LIMIT {BATCH_SIZE}')
+    select_args = [int(time.time()) - max_age_days * helpers.DAY_SECONDS]
+    archive_file = attach()[0][0]
+
+    moved = 0
+    for _ in range(MAX_BATCHES_PER_RUN):
+        rows = database.sql_exec(database.DATABASE_FILE, select, select_args)
+
+        if not rows:
+            break
+
+        columns = ', '.join('?' * len(rows[0]))
+        database.sql_exec_batch(archive_file, [
+            (f'INSERT OR REPLACE INTO games VALUES({columns})',
+             [tuple(row) for row in rows])
+        ])
+
+        ids = ','.join(str(row['id']) for row in rows)
+        archived = [[row['id']] for row in database.sql_exec(
+            archive_file, f'SELECT id FROM games WHERE id IN ({ids})')]
+        database.sql_exec_batch(database.DATABASE_FILE, [
+            ('DELETE FROM games WHERE id = ?', archived)
+        ])
+
+        moved += len(archived)
+
+    return {'archived': moved}
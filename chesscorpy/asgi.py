@@ -0,0 +1,253 @@
+import asyncio
+import json
+import re
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgiInstance
+from werkzeug.http import parse_etags, quote_etag
+
+from . import chat, explorer, games, pools, user
+from .app import create_app
+
+
+EVENTS_POLL_SECONDS = 2
+EVENTS_KEEPALIVE_SECONDS = 15
+
+_flask_app = create_app()
+
+# The plain function asgiref wraps to run on its one shared thread.
+_run_wsgi_app = WsgiToAsgiInstance.__dict__['run_wsgi_app'].func
+
+
+class _PooledWsgiInstance(WsgiToAsgiInstance):
+    """Serves a request with the Flask app on the WEB pool.
+
+    asgiref would run every request on a single shared thread, so only
+    one Flask route could run at a time.
+    """
+
+    async def run_wsgi_app(self, body):
+        await pools.run(pools.WEB, _run_wsgi_app, self, body)
+
+
+def _in_app(fn, *args):
+    """Calls fn in the app's context, so it queries the app's storage."""
+
+    with _flask_app.app_context():
+        return fn(*args)
+
+
+def _session_user_id(scope):
+    """Reads the logged-in user id from the request's Flask session."""
+
+    headers = dict(scope['headers'])
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'HTTP_COOKIE': headers.get(b'cookie', b'').decode('latin-1'),
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'wsgi.url_scheme': scope.get('scheme', 'http')
+    }
+
+    request = _flask_app.request_class(environ)
+    session = _flask_app.session_interface.open_session(_flask_app, request)
+
+    return session.get(user.USER_SESSION) if session else None
+
+
+def _query_arg(scope, name, type_=str):
+    """Returns a query string argument as type_, or None like Flask's
+    request.args.get does if it's missing or doesn't convert.
+    """
+
+    try:
+        return type_(parse_qs(scope['query_string'].decode())[name][0])
+    except (KeyError, ValueError):
+        return None
+
+
+async def _send_response(send, status, body, content_type=b'text/plain',
+                         headers=()):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', content_type), *headers]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _send_json(send, data, status=200, headers=()):
+    await _send_response(send, status, json.dumps(data).encode(),
+                         b'application/json', headers)
+
+
+async def _send_login_redirect(send):
+    # As helpers.login_required does for the Flask routes.
+    await send({'type': 'http.response.start', 'status': 302,
+                'headers': [(b'location', b'/login')]})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def game_state(scope, receive, send, game_id):
+    """Retrieves the state of a game as JSON, like the Flask route.
+
+    Responds with 304 Not Modified if the client's ETag is still current.
+    """
+
+    user_id = await pools.run(pools.DB, _session_user_id, scope)
+    if not user_id:
+        return await _send_login_redirect(send)
+
+    version = await pools.run(pools.DB, _in_app, games.get_version_if_authed,
+                              int(game_id), user_id)
+    if not version:
+        return await _send_json(send, {'error': 'Game not found.'}, 404)
+
+    etag = games.version_etag(version)
+    headers = [(b'etag', quote_etag(etag).encode()),
+               (b'cache-control', b'no-cache')]
+    if_none_match = dict(scope['headers']).get(b'if-none-match', b'')
+
+    if parse_etags(if_none_match.decode('latin-1')).contains(etag):
+        await send({'type': 'http.response.start', 'status': 304,
+                    'headers': headers})
+        return await send({'type': 'http.response.body', 'body': b''})
+
+    state = await pools.run(pools.DB, _in_app,
+                            games.get_polled_state_if_authed, int(game_id),
+                            user_id)
+    await _send_json(send, state, headers=headers)
+
+
+def _read_chats(game_id, user_id):
+    chat.mark_read(game_id, user_id)
+
+    return chat.get_chats(game_id, _flask_app.config['CHAT_MAX_MESSAGES'])
+
+
+async def chat_messages(scope, receive, send):
+    """Retrieves the chat messages of a game, like the Flask route's GET."""
+
+    user_id = await pools.run(pools.DB, _session_user_id, scope)
+    if not user_id:
+        return await _send_login_redirect(send)
+
+    chats = await pools.run(pools.DB, _in_app, _read_chats,
+                            _query_arg(scope, 'id', int), user_id)
+    await _send_json(send, chats)
+
+
+async def explorer_moves(scope, receive, send):
+    """Retrieves site statistics for the moves played from a position."""
+
+    user_id = await pools.run(pools.DB, _session_user_id, scope)
+    if not user_id:
+        return await _send_login_redirect(send)
+
+    position = await pools.run(pools.CHESS, explorer.read_position,
+                               _query_arg(scope, 'fen') or '')
+    if position is None:
+        return await _send_json(send, {'successful': False})
+
+    board, key = position
+    moves = await pools.run(pools.DB, _in_app, explorer.get_move_stats, key)
+    moves = await pools.run(pools.CHESS, explorer.add_sans, board, moves)
+    await _send_json(send, {'successful': True, 'moves': moves})
+
+
+async def game_events(scope, receive, send):
+    """Streams a game's state as server-sent events whenever it changes.
+
+    Each poll only reads the game's ply and status; the full state is
+    read once they change.
+    """
+
+    game_id = _query_arg(scope, 'id', int)
+    if game_id is None:
+        return await _send_response(send, 400, b'Missing game id.')
+
+    user_id = await pools.run(pools.DB, _session_user_id, scope)
+    if not user_id:
+        return await _send_response(send, 403, b'Not logged in.')
+
+    version = await pools.run(pools.DB, _in_app,
+                              games.get_version_if_authed, game_id, user_id)
+
+    if not version:
+        return await _send_response(send, 404, b'No such game.')
+
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', b'text/event-stream'),
+                            (b'cache-control', b'no-cache')]})
+
+    disconnect = asyncio.ensure_future(_wait_for_disconnect(receive))
+    last_version = None
+    idle = 0
+
+    try:
+        # The game is gone once it's no longer visible.
+        while version and not disconnect.done():
+            if tuple(version) != last_version:
+                states = await pools.run(pools.DB, _in_app,
+                                         games.get_states_if_authed,
+                                         [game_id], user_id)
+                event = {key: states[0][key]
+                         for key in ('status', 'to_move', 'fen')}
+                body = f'data: {json.dumps(event)}\n\n'.encode()
+                last_version, idle = tuple(version), 0
+            elif idle >= EVENTS_KEEPALIVE_SECONDS:
+                body, idle = b': keepalive\n\n', 0
+            else:
+                body = None
+
+            if body:
+                await send({'type': 'http.response.body', 'body': body,
+                            'more_body': True})
+
+            await asyncio.wait([disconnect], timeout=EVENTS_POLL_SECONDS)
+            idle += EVENTS_POLL_SECONDS
+
+            if not disconnect.done():
+                version = await pools.run(pools.DB, _in_app,
+                                          games.get_version_if_authed,
+                                          game_id, user_id)
+    except pools.PoolBusy:
+        # End the stream and let the client reconnect once load drops.
+        pass
+
+    if not disconnect.done():
+        disconnect.cancel()
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+# (method, path pattern, handler); groups in the pattern are passed to
+# the handler.
+ASYNC_ROUTES = [
+    ('GET', re.compile(r'/game/events'), game_events),
+    ('GET', re.compile(r'/game/(\d+)/state'), game_state),
+    ('GET', re.compile(r'/chat'), chat_messages),
+    ('GET', re.compile(r'/explorer'), explorer_moves)
+]
+
+
+async def application(scope, receive, send):
+    """Dispatches to a native async route or falls back to Flask."""
+
+    if scope['type'] == 'http':
+        for method, pattern, handler in ASYNC_ROUTES:
+            match = pattern.fullmatch(scope['path'])
+            if match and scope['method'] == method:
+                try:
+                    return await handler(scope, receive, send,
+                                         *match.groups())
+                except pools.PoolBusy:
+                    return await _send_response(send, 503, b'Server busy.')
+
+    try:
+        return await _PooledWsgiInstance(_flask_app)(scope, receive, send)
+    except pools.PoolBusy:
+        return await _send_response(send, 503, b'Server busy.')
@@ -1,30 +1,278 @@
-from . import database, user
+import json
+import threading
+import time
+import zlib
+
+from . import database, games, archive, helpers
 
 
 CHAT_MSG_MAX_LEN = 100
+MAX_LIVE_MESSAGES = 200
+COMPACT_AFTER_DAYS = 7
+EXPIRE_AFTER_DAYS = None
+MAINTENANCE_BATCH_SIZE = 50
+MAINTENANCE_MAX_BATCHES = 20
 
+# Most compacted chats kept decompressed, for games whose chat is
+# polled while it has too few live messages.
+MAX_CACHED_ARCHIVES = 100
 
-def get_chats(game_id):
-    """Retrieves the chat messages for a specified game."""
+# Fields of each message kept in a compacted chat, in order.
+_ARCHIVED_FIELDS = ('user_id', 'user_name', 'contents', 'timestamp')
 
-    query = 'SELECT * FROM chats WHERE game_id = ? ORDER BY timestamp ASC'
-    query_args = [game_id]
+# Maps (database file, game id) to (updated, messages), least recently
+# used first.
+_archive_cache = {}
+_archive_cache_lock = threading.Lock()
+
+
+def _get_archived(game_id):
+    """Retrieves the compacted messages of a game, oldest first.
+
+    Only the blob's update time is read while the decompressed messages
+    in the cache are still current.
+    """
+
+    row = database.sql_exec(database.DATABASE_FILE,
+                            'SELECT updated FROM chat_archives WHERE '
+                            'game_id = ?', [game_id], False)
+    if not row:
+        return []
+
+    key = (database.DATABASE_FILE, game_id)
+    with _archive_cache_lock:
+        cached = _archive_cache.pop(key, None)
+        if cached and cached[0] == row['updated']:
+            _archive_cache[key] = cached
+            return cached[1]
+
+    row = database.sql_exec(database.DATABASE_FILE,
+                            'SELECT messages, updated FROM chat_archives '
+                            'WHERE game_id = ?', [game_id], False)
+    if not row:
+        return []
+
+    messages = [dict(zip(_ARCHIVED_FIELDS, message)) for message in
+                json.loads(zlib.decompress(row['messages']))]
+
+    with _archive_cache_lock:
+        _archive_cache[key] = (row['updated'], messages)
+        if len(_archive_cache) > MAX_CACHED_ARCHIVES:
+            del _archive_cache[next(iter(_archive_cache))]
+
+    return messages
+
+
+def get_chats(game_id, limit=MAX_LIVE_MESSAGES):
+    """Retrieves the most recent chat messages for a specified game.
+
+    Older messages are read from the game's compacted archive if there
+    aren't enough live ones.
+    """
+
+    query = ('SELECT chats.*, users.username AS user_name FROM chats JOIN '
+             'users ON users.id = chats.user_id WHERE game_id = ? '
+             'ORDER BY chats.id DESC LIMIT ?')
+    query_args = [game_id, limit]
 
-    chats = database.sql_exec(database.DATABASE_FILE, query, query_args)
-    chats = [dict(chat) for chat in chats]
+    chats = database.rows_to_list(
+        database.sql_exec(database.DATABASE_FILE, query, query_args))
+    chats.reverse()
 
-    # Add username to the chat data
-    for chat in chats:
-        chat['user_name'] = user.get_data_by_id(chat['user_id'],
-                                                ['username'])['username']
+    if len(chats) < limit:
+        archived = _get_archived(game_id)
+        chats = (archived[max(0, len(archived) - (limit - len(chats))):]
+                 + chats)
 
     return chats
 
 
 def new_chat(game_id, user_id, msg):
-    """Inserts a new chat message for a specified game into the database."""
+    """Inserts a new chat message for a specified game into the database.
+
+    The message is counted as unread for the sender's opponent.
+    """
 
     query = 'INSERT INTO chats (game_id, user_id, contents) VALUES(?, ?, ?)'
     query_args = [game_id, user_id, msg]
 
-    database.sql_exec(database.DATABASE_FILE, query, query_args)
+    opponent = ('SELECT CASE WHEN player_white_id = ? THEN player_black_id '
+                'ELSE player_white_id END, {} FROM games WHERE id = ?')
+    opponent_args = [user_id, game_id]
+
+    database.sql_exec_batch(database.DATABASE_FILE, [
+        (query, [query_args]),
+        (f'INSERT INTO chat_unread (user_id, game_id, count) '
+         f'{opponent.format("?, 1")} ON CONFLICT(user_id, game_id) DO UPDATE '
+         'SET count = count + 1', [[user_id, game_id, game_id]]),
+        ('INSERT INTO user_counters (user_id, unread_chats) '
+         f'{opponent.format("1")} ON CONFLICT(user_id) DO UPDATE SET '
+         'unread_chats = unread_chats + 1', [opponent_args])
+    ])
+
+
+def mark_read(game_id, user_id):
+    """Clears a user's unread chat messages in a game."""
+
+    unread = database.sql_exec(database.DATABASE_FILE,
+                               'SELECT count FROM chat_unread WHERE '
+                               'user_id = ? AND game_id = ?',
+                               [user_id, game_id], False)
+
+    # Chats are polled often, so only write when there's something to clear.
+    if not unread:
+        return
+
+    database.sql_exec_batch(database.DATABASE_FILE, [
+        ('UPDATE user_counters SET unread_chats = unread_chats - (SELECT '
+         'count FROM chat_unread WHERE user_id = ? AND game_id = ?) WHERE '
+         'user_id = ?', [[user_id, game_id, user_id]]),
+        ('DELETE FROM chat_unread WHERE user_id = ? AND game_id = ?',
+         [[user_id, game_id]])
+    ])
+
+
+def _compact(game_id, keep):
+    """Moves all but the newest keep messages of a game into its archive.
+
+    Unread counts are cut down to the messages left, which are all that
+    a player is shown once there are keep of them. Runs in a single
+    short transaction.
+    """
+
+    query = ('SELECT chats.id, chats.user_id, users.username AS user_name, '
+             'chats.contents, chats.timestamp FROM chats JOIN users ON '
+             'users.id = chats.user_id WHERE game_id = ? ORDER BY chats.id')
+    query_args = [game_id]
+
+    if keep:
+        newest_kept = database.sql_exec(database.DATABASE_FILE,
+                                        'SELECT id FROM chats WHERE '
+                                        'game_id = ? ORDER BY id DESC '
+                                        'LIMIT 1 OFFSET ?',
+                                        [game_id, keep - 1], False)
+        if not newest_kept:
+            return 0
+
+        query = query.replace('ORDER BY', 'AND chats.id < ? ORDER BY')
+        query_args.append(newest_kept['id'])
+
+    moving = database.rows_to_list(
+        database.sql_exec(database.DATABASE_FILE, query, query_args))
+    if not moving:
+        return 0
+
+    messages = [[message[field] for field in _ARCHIVED_FIELDS]
+                for message in _get_archived(game_id) + moving]
+    blob = zlib.compress(json.dumps(messages,
+                                    separators=(',', ':')).encode())
+
+    database.sql_exec_batch(database.DATABASE_FILE, [
+        ('INSERT OR REPLACE INTO chat_archives (game_id, messages, '
+         'message_count, updated) VALUES(?, ?, ?, ?)',
+         [[game_id, blob, len(messages), time.time()]]),
+        ('DELETE FROM chats WHERE game_id = ? AND id <= ?',
+         [[game_id, moving[-1]['id']]]),
+        ('UPDATE user_counters SET unread_chats = unread_chats - (SELECT '
+         'count - ? FROM chat_unread WHERE chat_unread.user_id = '
+         'user_counters.user_id AND game_id = ?) WHERE user_id IN (SELECT '
+         'user_id FROM chat_unread WHERE game_id = ? AND count > ?)',
+         [[keep, game_id, game_id, keep]]),
+        ('UPDATE chat_unread SET count = ? WHERE game_id = ? AND count > ?',
+         [[keep, game_id, keep]]),
+        ('DELETE FROM chat_unread WHERE game_id = ? AND count = 0',
+         [[game_id]])
+    ])
+
+    return len(moving)
+
+
+def _finished_games_with_chats(cutoff_days, limit):
+    finished = (f'status != "{games.Status.NO_MOVE}" AND status != '
+                f'"{games.Status.IN_PROGRESS}" AND move_start_time < ?')
+    query = ('SELECT DISTINCT game_id FROM chats WHERE game_id IN (SELECT id '
+             f'FROM main.games WHERE {finished} UNION ALL SELECT id FROM '
+             f'{archive.SCHEMA}.games WHERE {finished}) LIMIT ?')
+    cutoff = int(time.time()) - cutoff_days * helpers.DAY_SECONDS
+    query_args = [cutoff, cutoff, limit]
+
+    return [row['game_id'] for row in database.sql_exec(
+        database.DATABASE_FILE, query, query_args, attach=archive.attach())]
+
+
+def _games_over_cap(max_messages, limit):
+    query = ('SELECT game_id FROM chats GROUP BY game_id HAVING COUNT(*) > ? '
+             'LIMIT ?')
+
+    return [row['game_id'] for row in database.sql_exec(
+        database.DATABASE_FILE, query, [max_messages, limit])]
+
+
+def _expire(expire_after_days, limit):
+    query = 'SELECT game_id FROM chat_archives WHERE updated < ? LIMIT ?'
+    query_args = [time.time() - expire_after_days * helpers.DAY_SECONDS,
+                  limit]
+
+    game_ids = [row['game_id'] for row in database.sql_exec(
+        database.DATABASE_FILE, query, query_args)]
+
+    database.sql_exec_batch(database.DATABASE_FILE, [
+        ('DELETE FROM chat_archives WHERE game_id = ?',
+         [[game_id] for game_id in game_ids])
+    ])
+
+    return len(game_ids)
+
+
+def _table_count(table):
+    return database.sql_exec(database.DATABASE_FILE,
+                             f'SELECT COUNT(*) AS count FROM {table}', (),
+                             False)['count']
+
+
+def maintain(compact_after_days=COMPACT_AFTER_DAYS,
+             expire_after_days=EXPIRE_AFTER_DAYS,
+             max_messages=MAX_LIVE_MESSAGES):
+    """Compacts, caps and expires chat logs.
+
+    Chats of games finished over compact_after_days ago are folded into
+    one archived blob per game, games with more than max_messages live
+    messages have the oldest ones folded in, and blobs untouched for
+    expire_after_days are deleted (never, if None). Work is done a game
+    at a time so the write lock is only ever held briefly. Returns what
+    was done and the live chat count before and after.
+    """
+
+    report = {'live_messages_before': _table_count('chats'),
+              'compacted_games': 0, 'compacted_messages': 0,
+              'capped_messages': 0, 'expired_games': 0}
+
+    for _ in range(MAINTENANCE_MAX_BATCHES):
+        game_ids = _finished_games_with_chats(compact_after_days,
+                                              MAINTENANCE_BATCH_SIZE)
+        for game_id in game_ids:
+            report['compacted_messages'] += _compact(game_id, 0)
+            report['compacted_games'] += 1
+
+        if len(game_ids) < MAINTENANCE_BATCH_SIZE:
+            break
+
+    for _ in range(MAINTENANCE_MAX_BATCHES):
+        game_ids = _games_over_cap(max_messages, MAINTENANCE_BATCH_SIZE)
+        for game_id in game_ids:
+            report['capped_messages'] += _compact(game_id, max_messages)
+
+        if len(game_ids) < MAINTENANCE_BATCH_SIZE:
+            break
+
+    if expire_after_days is not None:
+        for _ in range(MAINTENANCE_MAX_BATCHES):
+            expired = _expire(expire_after_days, MAINTENANCE_BATCH_SIZE)
+            report['expired_games'] += expired
+
+            if expired < MAINTENANCE_BATCH_SIZE:
+                break
+
+    report['live_messages_after'] = _table_count('chats')
+
+    return report
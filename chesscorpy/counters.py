@@ -0,0 +1,57 @@
+from . import database, games, user
+
+
+FIELDS = ('games_to_move', 'active_games', 'open_challenges', 'unread_chats')
+
+
+def change(field, changes):
+    """Returns a statement for sql_exec_batch that adjusts a counter.
+
+    changes is a list of (user_id, amount) pairs. Running it in the same
+    batch as the write it counts keeps the counter in step with it.
+    """
+
+    query = (f'INSERT INTO user_counters (user_id, {field}) VALUES(?, ?) '
+             f'ON CONFLICT(user_id) DO UPDATE SET {field} = {field} + '
+             f'excluded.{field}')
+
+    return query, [list(user_change) for user_change in changes]
+
+
+def get(user_id):
+    """Retrieves a user's dashboard counters."""
+
+    query = f'SELECT {", ".join(FIELDS)} FROM user_counters WHERE user_id = ?'
+    row = database.sql_exec(database.DATABASE_FILE, query, [user_id], False)
+
+    return database.row_to_dict(row) if row else dict.fromkeys(FIELDS, 0)
+
+
+def rebuild():
+    """Recounts every user's counters from the games, requests and chats.
+
+    Returns the number of users with counters.
+    """
+
+    active = (f'status = "{games.Status.NO_MOVE}" OR '
+              f'status = "{games.Status.IN_PROGRESS}"')
+    query = (f'INSERT INTO user_counters (user_id, {", ".join(FIELDS)}) '
+             'SELECT user_id, SUM(to_move), SUM(active), SUM(challenges), '
+             'SUM(unread) FROM (SELECT player_white_id AS user_id, '
+             'to_move = player_white_id AS to_move, 1 AS active, '
+             '0 AS challenges, 0 AS unread FROM games WHERE '
+             f'{active} UNION ALL SELECT player_black_id, '
+             'to_move = player_black_id, 1, 0, 0 FROM games WHERE '
+             f'{active} UNION ALL SELECT opponent_id, 0, 0, 1, 0 FROM '
+             f'game_requests WHERE opponent_id != {user.PUBLIC_USER_ID} '
+             'UNION ALL SELECT user_id, 0, 0, 0, count FROM chat_unread) '
+             'GROUP BY user_id')
+
+    database.sql_exec_batch(database.DATABASE_FILE, [
+        ('DELETE FROM user_counters', [()]),
+        (query, [()])
+    ])
+
+    return database.sql_exec(database.DATABASE_FILE,
+                             'SELECT COUNT(*) AS count FROM user_counters',
+                             (), False)['count']
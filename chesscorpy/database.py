@@ -1,13 +1,138 @@
+from concurrent.futures import Future
+from contextlib import contextmanager
 from sqlite3 import connect, Row
 
+from flask import current_app, has_app_context
 
-DATABASE_FILE = 'chesscorpy.db'
+from . import writer
 
 
-def sql_exec(db, query, query_args=(), get_all=True, get_last_row=False):
-    """Performs queries on a database."""
+# Where each database is when no storage says otherwise. DATABASE_FILE,
+# ARCHIVE_FILE and LEADERBOARD_FILE are looked up on the storage in use;
+# see __getattr__.
+DEFAULT_FILES = {
+    'DATABASE_FILE': 'chesscorpy.db',
+    'ARCHIVE_FILE': 'chesscorpy_archive.db',
+    'LEADERBOARD_FILE': 'chesscorpy_leaderboard.db'
+}
 
-    db = connect(db)
+# The storage used outside any app context, like in job and pool
+# threads. The first storage opened sets it.
+default_storage = None
+
+# Send batches through each file's writer thread so concurrent writes
+# share commits. create_app turns this on from its GROUP_COMMIT config.
+GROUP_COMMIT = False
+
+# Pragmas for throughput over SQLite's conservative defaults. WAL lets
+# readers and the writer run at once, and NORMAL only syncs at
+# checkpoints, which is still safe from corruption in WAL mode.
+TUNED_PROFILE = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'cache_size': -32 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory'
+}
+
+# The pragmas applied to every connection. create_app sets this from
+# its SQLITE_PROFILE config; empty keeps SQLite's defaults.
+PROFILE = {}
+
+# journal_mode is stored in the database file, so it's only set by
+# check_profile rather than on every connection.
+_PERSISTENT_PRAGMAS = ('journal_mode',)
+
+# A connection kept open on each WAL database checked. Otherwise the last
+# connection to close, which is usually every one, checkpoints and
+# deletes the WAL, and the next has to create it again.
+_held_open = {}
+
+# Rows sql_iter reads on each connection.
+ITER_BATCH_SIZE = 500
+
+# Pragmas that read back as numbers.
+_PRAGMA_NUMBERS = {
+    'synchronous': {'off': 0, 'normal': 1, 'full': 2, 'extra': 3},
+    'temp_store': {'default': 0, 'file': 1, 'memory': 2}
+}
+
+
+def __getattr__(name):
+    """Looks up the database files of the current app's storage, or of
+    the default storage outside an app.
+    """
+
+    if name not in DEFAULT_FILES:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    storage = default_storage
+    if has_app_context():
+        storage = current_app.extensions.get('storage', storage)
+
+    return getattr(storage, name.lower()) if storage else DEFAULT_FILES[name]
+
+
+def apply_profile(db):
+    """Applies the connection pragmas of PROFILE to a connection."""
+
+    for pragma, value in PROFILE.items():
+        if pragma not in _PERSISTENT_PRAGMAS:
+            db.execute(f'PRAGMA {pragma} = {value}')
+
+
+def check_profile(db_file):
+    """Applies PROFILE to a database file and reads every pragma back.
+
+    Returns {pragma: (wanted, actual)} for those that didn't take, like
+    WAL on an in-memory database.
+    """
+
+    db = connect(db_file, uri=True, check_same_thread=False)
+    apply_profile(db)
+    mismatches = {}
+
+    for pragma, value in PROFILE.items():
+        if pragma in _PERSISTENT_PRAGMAS:
+            db.execute(f'PRAGMA {pragma} = {value}')
+
+        # Some pragmas, like mmap_size in memory, have nothing to report.
+        row = db.execute(f'PRAGMA {pragma}').fetchone()
+        actual = row[0] if row else None
+        wanted = _PRAGMA_NUMBERS.get(pragma, {}).get(str(value).lower(),
+                                                     value)
+        if str(actual).lower() != str(wanted).lower():
+            mismatches[pragma] = (value, actual)
+
+    if db.execute('PRAGMA journal_mode').fetchone()[0] == 'wal':
+        db, _held_open[db_file] = _held_open.get(db_file), db
+
+    if db:
+        db.close()
+
+    return mismatches
+
+
+def _connect(db, attach):
+    # URIs let the in-memory storage share one database between threads.
+    db = connect(db, uri=True)
+    apply_profile(db)
+
+    for attach_db, schema in attach:
+        db.execute(f'ATTACH DATABASE ? AS {schema}', [attach_db])
+
+    return db
+
+
+def sql_exec(db, query, query_args=(), get_all=True, get_last_row=False,
+             attach=()):
+    """Performs queries on a database.
+
+    Other databases can be attached as (file, schema name) pairs.
+    """
+
+    db = _connect(db, attach)
     db.row_factory = Row
     cur = db.cursor()
     data = cur.execute(query, query_args)
@@ -22,6 +147,105 @@ def sql_exec(db, query, query_args=(), get_all=True, get_last_row=False):
     return data if not get_last_row else last_row_id
 
 
+def sql_iter(db, query, query_args=(), attach=(), key=('id',),
+             batch_size=ITER_BATCH_SIZE):
+    """Yields the rows of a query in key order, one at a time.
+
+    Rows are read batch_size at a time, each batch by its own connection
+    picking up after the key of the last row, so memory doesn't grow
+    with the result and no read transaction stays open while the rows
+    are sent. Otherwise a slow client would stop the WAL from being
+    checkpointed until it had the whole page. The key columns must be
+    unique and never NULL. Since batches are separate reads, a row that
+    changes between them may be missed or show its newer values.
+    """
+
+    columns = ', '.join(key)
+    after_last = f'WHERE ({columns}) > ({", ".join("?" * len(key))})'
+    after = None
+
+    while True:
+        batch_query = (f'SELECT * FROM ({query}) '
+                       f'{after_last if after else ""} ORDER BY {columns} '
+                       'LIMIT ?')
+        batch_args = [*query_args, *(after or ()), batch_size]
+
+        batch = sql_exec(db, batch_query, batch_args, attach=attach)
+        yield from batch
+
+        if len(batch) < batch_size:
+            return
+
+        after = [batch[-1][column] for column in key]
+
+
+def sql_exec_batch(db, statements, attach=()):
+    """Performs several queries on a database in a single transaction.
+
+    Each statement is a (query, list of query args) tuple and is run
+    once for every set of query args. Returns the id of the last row
+    inserted.
+    """
+
+    if GROUP_COMMIT and not attach:
+        return submit_batch(db, statements).result()
+
+    db = _connect(db, attach)
+
+    with db:
+        for query, query_args_list in statements:
+            db.executemany(query, query_args_list)
+
+        last_row_id = db.execute('SELECT last_insert_rowid()').fetchone()[0]
+
+    db.close()
+
+    return last_row_id
+
+
+def submit_batch(db, statements):
+    """Queues statements for sql_exec_batch without waiting for them.
+
+    Returns a future for the id of the last row inserted, resolved once
+    the statements are committed.
+    """
+
+    if GROUP_COMMIT:
+        return writer.get(db).submit(statements)
+
+    future = Future()
+    try:
+        future.set_result(sql_exec_batch(db, statements))
+    except Exception as exception:
+        future.set_exception(exception)
+
+    return future
+
+
+@contextmanager
+def write_transaction(db, attach=()):
+    """Yields a connection holding the write lock for a transaction.
+
+    For writes that depend on what they read, since nothing else can
+    write until the transaction commits.
+    """
+
+    db = _connect(db, attach)
+    db.row_factory = Row
+    db.isolation_level = None
+
+    try:
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+    finally:
+        db.close()
+
+
 def row_to_dict(row):
     """Converts a Row object into a dictionary."""
 
@@ -0,0 +1,96 @@
+import time
+
+from . import database
+
+
+IMMEDIATE = 'immediate'
+HOURLY = 'hourly'
+DAILY = 'daily'
+
+# Digest mode: seconds events are collected for before they are sent.
+WINDOWS = {
+    HOURLY: 60 * 60,
+    DAILY: 24 * 60 * 60
+}
+
+MAX_USERS_PER_RUN = 500
+
+
+def queue_event(user_id, event):
+    """Saves a game event to be sent in the user's next digest."""
+
+    query = ('INSERT INTO notifications (user_id, event, created) '
+             'VALUES(?, ?, ?)')
+    query_args = [user_id, event, time.time()]
+
+    database.sql_exec(database.DATABASE_FILE, query, query_args)
+
+
+def _due_users(now):
+    """Retrieves users whose oldest pending event has waited a full window."""
+
+    query = ('SELECT users.id, users.username, users.email, '
+             'MAX(notifications.id) AS last_event FROM notifications JOIN '
+             'users ON users.id = notifications.user_id GROUP BY users.id '
+             'HAVING MIN(notifications.created) <= ? - (CASE users.digest '
+             + ' '.join(f"WHEN '{mode}' THEN {window}"
+                        for mode, window in WINDOWS.items())
+             + ' ELSE 0 END) LIMIT ?')
+    query_args = [now, MAX_USERS_PER_RUN]
+
+    return database.sql_exec(database.DATABASE_FILE, query, query_args)
+
+
+def _render(user_, events):
+    lines = '\n'.join(f'- {event}' for event in events)
+
+    return (
+        f'Hi {user_["username"]}!\n\n'
+        'Here is what has happened in your games:\n\n'
+        f'{lines}\n\n'
+        'Your pal,\n'
+        'ChessCorPyBot'
+    )
+
+
+def queue_depth():
+    """Returns the number of events waiting to be sent."""
+
+    return database.sql_exec(database.DATABASE_FILE,
+                             'SELECT COUNT(*) AS depth FROM notifications',
+                             (), False)['depth']
+
+
+def send_digests(mail):
+    """Sends one email to every user with a digest due.
+
+    All digests go out over a single SMTP connection. Returns the
+    number of emails sent and the events still queued afterwards.
+    """
+
+    import flask_mail
+
+    sent = 0
+    due = _due_users(time.time())
+
+    if due:
+        with mail.connect() as connection:
+            for user_ in due:
+                query = ('SELECT event FROM notifications WHERE user_id = ? '
+                         'AND id <= ? ORDER BY id')
+                query_args = [user_['id'], user_['last_event']]
+                events = [row['event'] for row in database.sql_exec(
+                    database.DATABASE_FILE, query, query_args)]
+
+                msg = flask_mail.Message('Game Digest',
+                                         sender='chesscorpy@gmail.com',
+                                         recipients=[user_['email']])
+                msg.body = _render(user_, events)
+                connection.send(msg)
+                sent += 1
+
+                database.sql_exec(database.DATABASE_FILE,
+                                  'DELETE FROM notifications WHERE '
+                                  'user_id = ? AND id <= ?', query_args)
+
+    return {'sent': sent, 'queued': queue_depth()}
@@ -0,0 +1,180 @@
+import io
+
+from . import database, games, user, archive
+
+
+MAX_MOVES_SHOWN = 20
+
+
+def _result_column(winner):
+    import chess
+
+    if winner == chess.WHITE:
+        return 'white_wins'
+    elif winner == chess.BLACK:
+        return 'black_wins'
+    else:
+        return 'draws'
+
+
+def position_key(board):
+    """Returns the index key of a board position.
+
+    The key is the position's Zobrist hash squeezed into a signed 64-bit
+    integer so SQLite can store it as an INTEGER primary key.
+    """
+
+    import chess.polyglot
+
+    key = chess.polyglot.zobrist_hash(board)
+    return key - (1 << 64) if key >= (1 << 63) else key
+
+
+def _walk_moves(moves):
+    """Yields a (position key, uci move) pair for every move played."""
+
+    import chess
+
+    board = chess.Board()
+    for move in moves:
+        yield position_key(board), move.uci()
+        board.push(move)
+
+
+def _pgn_moves(pgn):
+    import chess.pgn
+
+    game = chess.pgn.read_game(io.StringIO(pgn.replace('\\n', '\n')))
+    return list(game.mainline_moves()) if game else []
+
+
+def _winner_color(game_data):
+    import chess
+
+    if game_data['winner'] == user.DRAW_USER_ID:
+        return None
+    elif game_data['winner'] == game_data['player_white_id']:
+        return chess.WHITE
+    else:
+        return chess.BLACK
+
+
+def add_move(key, move_uci):
+    """Adds a newly played move to the position index."""
+
+    query = ('INSERT INTO explorer (position, move, games) VALUES(?, ?, 1) '
+             'ON CONFLICT(position, move) DO UPDATE SET games = games + 1')
+    query_args = [key, move_uci]
+
+    database.sql_exec(database.DATABASE_FILE, query, query_args)
+
+
+def add_result(moves, winner):
+    """Credits the result of a finished game to every move it played.
+
+    The winner is chess.WHITE, chess.BLACK, or None for a draw.
+    """
+
+    column = _result_column(winner)
+    query = (f'UPDATE explorer SET {column} = {column} + 1 '
+             'WHERE position = ? AND move = ?')
+
+    database.sql_exec_batch(database.DATABASE_FILE,
+                            [(query, list(_walk_moves(moves)))])
+
+
+def add_result_from_pgn(pgn, winner):
+    """Credits the result of a finished game given its PGN."""
+
+    if pgn:
+        add_result(_pgn_moves(pgn), winner)
+
+
+def rebuild():
+    """Rebuilds the whole position index from the games table."""
+
+    # Aggregate in memory first so the index is swapped in one transaction.
+    index = {}
+    query = ('SELECT * FROM main.games WHERE pgn IS NOT NULL UNION ALL '
+             f'SELECT * FROM {archive.SCHEMA}.games WHERE pgn IS NOT NULL')
+
+    for game in database.sql_exec(database.DATABASE_FILE, query,
+                                  attach=archive.attach()):
+        if game['status'] in (games.Status.NO_MOVE, games.Status.IN_PROGRESS):
+            column = None
+        else:
+            column = _result_column(_winner_color(game))
+
+        for key, move in _walk_moves(_pgn_moves(game['pgn'])):
+            counts = index.setdefault((key, move), {
+                'games': 0, 'white_wins': 0, 'draws': 0, 'black_wins': 0
+            })
+            counts['games'] += 1
+            if column:
+                counts[column] += 1
+
+    rows = [[key, move, c['games'], c['white_wins'], c['draws'],
+             c['black_wins']] for (key, move), c in index.items()]
+
+    database.sql_exec_batch(database.DATABASE_FILE, [
+        ('DELETE FROM explorer', [()]),
+        ('INSERT INTO explorer (position, move, games, white_wins, draws, '
+         'black_wins) VALUES(?, ?, ?, ?, ?, ?)', rows)
+    ])
+
+    return len(rows)
+
+
+def read_position(fen):
+    """Returns the board of a FEN and its index key, or None if the FEN is
+    not valid.
+    """
+
+    import chess
+
+    try:
+        board = chess.Board(fen)
+    except ValueError:
+        return None
+
+    return board, position_key(board)
+
+
+def get_move_stats(key):
+    """Retrieves site statistics for the moves most played from the
+    position with an index key.
+    """
+
+    query = ('SELECT move, games, white_wins, draws, black_wins FROM explorer '
+             'WHERE position = ? ORDER BY games DESC LIMIT ?')
+    query_args = [key, MAX_MOVES_SHOWN]
+
+    return database.rows_to_list(
+        database.sql_exec(database.DATABASE_FILE, query, query_args))
+
+
+def add_sans(board, moves):
+    """Names each of the moves, played from board, in SAN."""
+
+    import chess
+
+    for move in moves:
+        move['san'] = board.san(chess.Move.from_uci(move['move']))
+
+    return moves
+
+
+def get_moves(fen):
+    """Retrieves site statistics for every move played from a position.
+
+    Returns None if the FEN is not valid.
+    """
+
+    position = read_position(fen)
+
+    if position is None:
+        return None
+
+    board, key = position
+
+    return add_sans(board, get_move_stats(key))
@@ -1,6 +1,8 @@
-import datetime
+import time
 
-from . import database, user, helpers, handle_errors
+from . import database, user, helpers, handle_errors, explorer, live_games
+from . import analysis, archive, counters, positions, tournaments
+from . import player_stats
 
 
 class Status:
@@ -12,8 +14,12 @@ class Status:
     DRAW = 'draw'
 
 
+# When the player to move runs out of time, as UTC epoch seconds.
+DEADLINE = f'move_start_time + turn_day_limit * {helpers.DAY_SECONDS}'
+
+
 def get_public_requests():
-    """Retrieves a list of public game requests."""
+    """Yields the public game requests the logged in user can accept."""
 
     query = ('SELECT game_requests.id, game_requests.turn_day_limit, '
              'game_requests.color, game_requests.timestamp, users.username, '
@@ -23,11 +29,11 @@ def get_public_requests():
              ' BETWEEN min_rating AND max_rating')
     query_args = [user.PUBLIC_USER_ID] + [user.get_logged_in_id()] * 2
 
-    return database.sql_exec(database.DATABASE_FILE, query, query_args)
+    return database.sql_iter(database.DATABASE_FILE, query, query_args)
 
 
 def get_direct_requests():
-    """Retrieves a list of direct game requests to the logged in user."""
+    """Yields the direct game requests to the logged in user."""
 
     query = ('SELECT game_requests.id, game_requests.turn_day_limit, '
              'game_requests.color, game_requests.timestamp, users.username, '
@@ -35,7 +41,7 @@ def get_direct_requests():
              'game_requests.user_id = users.id WHERE opponent_id = ?')
     query_args = [user.get_logged_in_id()]
 
-    return database.sql_exec(database.DATABASE_FILE, query, query_args)
+    return database.sql_iter(database.DATABASE_FILE, query, query_args)
 
 
 def create_request(user_id, opponent_id, turnlimit, minrating, maxrating,
@@ -48,14 +54,24 @@ def create_request(user_id, opponent_id, turnlimit, minrating, maxrating,
     query_args = [user_id, opponent_id, turnlimit, minrating, maxrating,
                   color, is_public]
 
-    database.sql_exec(database.DATABASE_FILE, query, query_args)
+    statements = [(query, [query_args])]
+    if opponent_id != user.PUBLIC_USER_ID:
+        statements.append(counters.change('open_challenges',
+                                          [(opponent_id, 1)]))
+
+    database.sql_exec_batch(database.DATABASE_FILE, statements)
 
 
 def delete_request(request_id):
     """Deletes a game request."""
 
-    database.sql_exec(database.DATABASE_FILE,
-                      'DELETE FROM game_requests WHERE id = ?', [request_id])
+    # Public requests are never counted, so there's no row to update.
+    database.sql_exec_batch(database.DATABASE_FILE, [
+        ('UPDATE user_counters SET open_challenges = open_challenges - 1 '
+         'WHERE user_id = (SELECT opponent_id FROM game_requests WHERE '
+         'id = ?)', [[request_id]]),
+        ('DELETE FROM game_requests WHERE id = ?', [[request_id]])
+    ])
 
 
 def get_request_data_if_authed(request_id, user_id, fields=('*',)):
@@ -75,20 +91,157 @@ def create_game(white_id, black_id, turnlimit, is_public):
              'turn_day_limit ,to_move, public) VALUES(?, ?, ?, ?, ?)')
     query_args = [white_id, black_id, turnlimit, white_id, is_public]
 
-    return database.sql_exec(database.DATABASE_FILE, query, query_args,
-                             False, True)
+    game_id = database.sql_exec_batch(database.DATABASE_FILE, [
+        counters.change('active_games', [(white_id, 1), (black_id, 1)]),
+        counters.change('games_to_move', [(white_id, 1)]),
+        (query, [query_args])
+    ])
+
+    if is_public:
+        live_games.add_game(game_id, white_id, black_id)
+
+    return game_id
+
+
+def create_games(db, pairings, turnlimit, is_public):
+    """Creates many games within an open write transaction.
+
+    pairings is a list of (white id, black id) tuples. Returns the new
+    game ids in the same order.
+    """
+
+    query = ('INSERT INTO games (player_white_id, player_black_id, '
+             'turn_day_limit ,to_move, public) VALUES(?, ?, ?, ?, ?)')
+
+    game_ids = [
+        db.execute(query, [white_id, black_id, turnlimit, white_id,
+                           is_public]).lastrowid
+        for white_id, black_id in pairings
+    ]
+
+    statements = [
+        counters.change('active_games',
+                        [(player_id, 1) for pairing in pairings
+                         for player_id in pairing]),
+        counters.change('games_to_move',
+                        [(white_id, 1) for white_id, _ in pairings])
+    ]
+    if is_public:
+        statements.append(live_games.add(
+            [(game_id,) + tuple(pairing)
+             for game_id, pairing in zip(game_ids, pairings)]))
+
+    for statement, query_args_list in statements:
+        db.executemany(statement, query_args_list)
+
+    return game_ids
 
 
 def get_game_data_if_authed(game_id, user_id, auth_public=True):
-    """Retrieves game data if the user is authorized to see it."""
+    """Retrieves game data if the user is authorized to see it.
+
+    Archived games are looked up if the game isn't an active one.
+    """
 
     public = ' OR public = 1' if auth_public else ''
 
-    query = ('SELECT * FROM games WHERE id = ? AND (player_white_id = ? OR '
+    query = ('SELECT * FROM {} WHERE id = ? AND (player_white_id = ? OR '
              f'player_black_id = ?{public}) LIMIT 1')
     query_args = [game_id] + [user_id] * 2
 
-    return database.sql_exec(database.DATABASE_FILE, query, query_args, False)
+    game = database.sql_exec(database.DATABASE_FILE, query.format('games'),
+                             query_args, False)
+
+    if game is None:
+        game = database.sql_exec(database.DATABASE_FILE,
+                                 query.format(f'{archive.SCHEMA}.games'),
+                                 query_args, False, attach=archive.attach())
+
+    return game
+
+
+def get_states_if_authed(game_ids, user_id):
+    """Retrieves the current state of several games at once.
+
+    Games the user isn't authorized to see, by the same rules as
+    get_game_data_if_authed, are left out.
+    """
+
+    if not game_ids:
+        return []
+
+    ids = ','.join('?' * len(game_ids))
+    active = (f'games.status = "{Status.NO_MOVE}" OR '
+              f'games.status = "{Status.IN_PROGRESS}"')
+    query = ('SELECT games.id, games.player_white_id, games.player_black_id, '
+             'games.to_move, games.status, games.winner, games.public, '
+             f'CASE WHEN {active} THEN {DEADLINE} END AS deadline, '
+             f"COALESCE(game_positions.fen, '{positions.STARTING_FEN}') AS "
+             'fen, game_positions.last_move, COALESCE(game_positions.ply, 0) '
+             f'AS ply FROM (SELECT * FROM main.games WHERE id IN ({ids}) '
+             f'UNION ALL SELECT * FROM {archive.SCHEMA}.games WHERE id IN '
+             f'({ids})) AS games LEFT JOIN game_positions ON '
+             'game_positions.game_id = games.id WHERE (player_white_id = ? '
+             'OR player_black_id = ? OR public = 1) ORDER BY games.id')
+    query_args = list(game_ids) * 2 + [user_id] * 2
+
+    states = database.rows_to_list(
+        database.sql_exec(database.DATABASE_FILE, query, query_args,
+                          attach=archive.attach()))
+
+    players = user.get_data_by_ids(
+        [state[f'player_{color}_id'] for state in states
+         for color in ('white', 'black')], ['id', 'username', 'rating'])
+
+    for state in states:
+        for color in ('white', 'black'):
+            state[color] = database.row_to_dict(
+                players[state.pop(f'player_{color}_id')])
+
+        state['side_to_move'] = (
+            'white' if state['to_move'] == state['white']['id'] else 'black')
+
+    return states
+
+
+def get_version_if_authed(game_id, user_id):
+    """Retrieves what changes whenever a game does, if the user may see it.
+
+    A single primary key lookup for active games, so it's cheap to poll.
+    """
+
+    query = ('SELECT games.status, COALESCE(game_positions.ply, 0) AS ply '
+             'FROM {} AS games LEFT JOIN game_positions ON '
+             'game_positions.game_id = games.id WHERE games.id = ? AND '
+             '(player_white_id = ? OR player_black_id = ? OR public = 1)')
+    query_args = [game_id] + [user_id] * 2
+
+    version = database.sql_exec(database.DATABASE_FILE,
+                                query.format('main.games'), query_args, False)
+
+    if version is None:
+        version = database.sql_exec(database.DATABASE_FILE,
+                                    query.format(f'{archive.SCHEMA}.games'),
+                                    query_args, False,
+                                    attach=archive.attach())
+
+    return version
+
+
+def version_etag(version):
+    """Returns the ETag of a version from get_version_if_authed."""
+
+    return f'{version["ply"]}-{version["status"]}'
+
+
+def get_polled_state_if_authed(game_id, user_id):
+    """Retrieves the state of a game with its PGN for polling clients."""
+
+    state = get_states_if_authed([game_id], user_id)[0]
+    pgn = get_game_data_if_authed(game_id, user_id)['pgn']
+    state['pgn'] = pgn.replace('\\n', '\n') if pgn else None
+
+    return state
 
 
 def get_game_data_if_to_move(game_id, user_id):
@@ -100,81 +253,84 @@ def get_game_data_if_to_move(game_id, user_id):
     return database.sql_exec(database.DATABASE_FILE, query, query_args, False)
 
 
+# Names of both players and whoever is to move, for listing games.
+_PLAYER_NAMES = ('white.username AS white_name, black.username AS '
+                 'black_name, mover.username AS player_to_move FROM games '
+                 'JOIN users AS white ON white.id = games.player_white_id '
+                 'JOIN users AS black ON black.id = games.player_black_id '
+                 'JOIN users AS mover ON mover.id = games.to_move')
+
+
 def get_active_games(user_id):
-    """Retrieves a list of active games for a user."""
+    """Yields the active games of a user, most urgent first."""
 
-    query = ('SELECT * FROM games WHERE (player_white_id = ? OR '
-             f'player_black_id = ?) AND (status = "{Status.NO_MOVE}" OR '
+    query = (f'SELECT games.*, {DEADLINE} AS deadline, {_PLAYER_NAMES} '
+             'WHERE (player_white_id = ? OR player_black_id = ?) AND '
+             f'(status = "{Status.NO_MOVE}" OR '
              f'status = "{Status.IN_PROGRESS}") AND '
              '(public = 1 OR player_white_id = ? OR player_black_id = ?)')
     query_args = ([user_id] * 2) + ([user.get_logged_in_id()] * 2)
 
-    return database.sql_exec(database.DATABASE_FILE, query, query_args)
+    return database.sql_iter(database.DATABASE_FILE, query, query_args,
+                             key=('deadline', 'id'))
 
 
 def get_active_games_to_move(user_id):
-    """Retrieves a list of active games for a user
+    """Yields the active games of a user
     where it's also the user's turn to move.
     """
 
-    query = (f'SELECT * FROM games WHERE to_move = ? AND '
-             f'(status = "{Status.NO_MOVE}" OR '
+    query = (f'SELECT games.*, {DEADLINE} AS deadline, {_PLAYER_NAMES} '
+             f'WHERE to_move = ? AND (status = "{Status.NO_MOVE}" OR '
              f'status = "{Status.IN_PROGRESS}")')
     query_args = [user_id]
 
-    return database.sql_exec(database.DATABASE_FILE, query, query_args)
+    return database.sql_iter(database.DATABASE_FILE, query, query_args,
+                             key=('deadline', 'id'))
 
 
 def get_game_history_if_authed(player_id, viewer_id):
-    """Retrieves a list of completed games of a user
-    if the viewer is authorized to see it.
+    """Yields the completed games of a user
+    if the viewer is authorized to see them, including archived ones.
     """
 
-    query = ('SELECT * FROM games WHERE (public = 1 OR player_white_id = ? OR '
+    query = ('SELECT games.*, white.username AS player_white_name, '
+             'black.username AS player_black_name, '
+             'game_analysis.white_accuracy, '
+             'game_analysis.black_accuracy, game_analysis.white_blunders, '
+             'game_analysis.black_blunders FROM (SELECT * FROM main.games '
+             f'UNION ALL SELECT * FROM {archive.SCHEMA}.games) AS games '
+             'JOIN users AS white ON white.id = games.player_white_id '
+             'JOIN users AS black ON black.id = games.player_black_id '
+             'LEFT JOIN '
+             'game_analysis ON game_analysis.game_id = games.id AND '
+             f'game_analysis.state = "{analysis.State.DONE}" WHERE '
+             '(public = 1 OR player_white_id = ? OR '
              'player_black_id = ?) AND (player_white_id = ? OR '
              f'player_black_id = ?) AND status != "{Status.NO_MOVE}" AND '
              f'status != "{Status.IN_PROGRESS}"')
     query_args = [viewer_id] * 2 + [player_id] * 2
 
-    return database.sql_exec(database.DATABASE_FILE, query, query_args)
+    return database.sql_iter(database.DATABASE_FILE, query, query_args,
+                             attach=archive.attach())
 
 
 def format_active_games(games_data):
-    """Adds/modifies some things for better readability."""
+    """Yields games with keys added for better readability."""
 
-    # Add extra keys into games list for opponent info and user's color.
-    games_data = database.rows_to_list(games_data)
     for game_ in games_data:
-        white = user.get_data_by_id(game_['player_white_id'],
-                                    ['id', 'username'])
-        game_['white_name'] = white['username']
-        game_['white_id'] = white['id']
-
-        black = user.get_data_by_id(game_['player_black_id'],
-                                    ['id', 'username'])
-        game_['black_name'] = black['username']
-        game_['black_id'] = black['id']
-
-        game_['player_to_move'] = user.get_data_by_id(game_['to_move'],
-                                                      ['username'])['username']
-        game_['time_to_move'] = (
-            helpers.get_turn_time_left(game_['move_start_time'],
-                                       game_['turn_day_limit']))
+        game_ = database.row_to_dict(game_)
+        game_['white_id'] = game_['player_white_id']
+        game_['black_id'] = game_['player_black_id']
 
-    return games_data
+        yield game_
 
 
 def format_game_history(games_data):
-    """Adds/modifies some things for better readability."""
+    """Yields games with their results added for better readability."""
 
-    games_data = database.rows_to_list(games_data)
     for game_ in games_data:
-        game_['player_white_name'] = (
-            user.get_data_by_id(game_['player_white_id'],
-                                ['username'])['username'])
-        game_['player_black_name'] = (
-            user.get_data_by_id(game_['player_black_id'],
-                                ['username'])['username'])
+        game_ = database.row_to_dict(game_)
 
         # Determine the 'result' based on who won or if it was a draw.
         if game_['winner'] == 0:
@@ -184,7 +340,7 @@ def format_game_history(games_data):
         else:
             game_['result'] = '0 - 1'
 
-    return games_data
+        yield game_
 
 
 def get_opponent_id(username):
@@ -202,43 +358,55 @@ def get_opponent_id(username):
         return user.PUBLIC_USER_ID
 
 
-def get_games():
-    """Retrieves all active games."""
+def get_timed_out_games():
+    """Retrieves all active games whose player to move is out of time."""
 
-    query = (f'SELECT * FROM games WHERE status = "{Status.NO_MOVE}" '
-             f'OR status = "{Status.IN_PROGRESS}"')
+    query = (f'SELECT * FROM games WHERE (status = "{Status.NO_MOVE}" '
+             f'OR status = "{Status.IN_PROGRESS}") AND {DEADLINE} < ?')
+    query_args = [int(time.time())]
 
-    return database.sql_exec(database.DATABASE_FILE, query)
+    return database.sql_exec(database.DATABASE_FILE, query, query_args)
 
 
 def handle_timeouts(mail):
     """Checks to see if a player has ran out of time in each game."""
 
-    all_games = get_games()
-
-    for game in all_games:
-        # Check if any player has timed out.
-        if helpers.get_turn_time_left(
-                game['move_start_time'],
-                game['turn_day_limit']) < datetime.timedelta():
-            if game['to_move'] == game['player_white_id']:
-                winner = game['player_black_id']
-            else:
-                winner = game['player_white_id']
-
-            # If so, update game status.
-            query = (f'UPDATE games SET status = "{Status.TIMEOUT}", '
-                     f'winner = {winner} WHERE id = {game["id"]}')
-            database.sql_exec(database.DATABASE_FILE, query)
-
-            # Then email the loser.
-            loser_data = user.get_data_by_id(game['to_move'],
-                                             ['id', 'username', 'email'])
-            msg = (
-                f'Hi {loser_data["username"]},\n\n'
-                'Unfortunately you have lost a game due to timeout.\n\n'
-                'From,\n'
-                'ChessCorPyBot'
-            )
-            helpers.send_mail(mail, loser_data['email'], 'Game Update', msg,
-                              loser_data['id'])
+    import chess
+
+    for game in get_timed_out_games():
+        if game['to_move'] == game['player_white_id']:
+            winner = game['player_black_id']
+            winner_color = chess.BLACK
+        else:
+            winner = game['player_white_id']
+            winner_color = chess.WHITE
+
+        # The player to move has timed out, so update game status.
+        query = (f'UPDATE games SET status = "{Status.TIMEOUT}", '
+                 f'winner = {winner} WHERE id = {game["id"]}')
+        database.sql_exec_batch(database.DATABASE_FILE, [
+            (query, [()]),
+            counters.change('active_games',
+                            [(game['player_white_id'], -1),
+                             (game['player_black_id'], -1)]),
+            counters.change('games_to_move', [(game['to_move'], -1)]),
+            player_stats.record(game['player_white_id'],
+                                game['player_black_id'], winner)
+        ])
+        explorer.add_result_from_pgn(game['pgn'], winner_color)
+        live_games.remove_game(game['id'])
+        analysis.enqueue(game['id'])
+        tournaments.game_finished(game['id'])
+
+        # Then email the loser.
+        loser_data = user.get_data_by_id(game['to_move'],
+                                         ['id', 'username', 'email'])
+        msg = (
+            f'Hi {loser_data["username"]},\n\n'
+            'Unfortunately you have lost a game due to timeout.\n\n'
+            'From,\n'
+            'ChessCorPyBot'
+        )
+        helpers.send_mail(mail, loser_data['email'], 'Game Update', msg,
+                          loser_data['id'],
+                          f'Game {game["id"]}: You lost due to timeout.')
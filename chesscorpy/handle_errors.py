@@ -1,6 +1,6 @@
 from werkzeug.security import check_password_hash
 
-from . import input_validation, helpers, user
+from . import input_validation, helpers, user, tournaments
 
 
 def for_register(username, password, email, rating):
@@ -137,3 +137,31 @@ def for_newgame_opponent(opponent):
         return helpers.error('Please enter a valid user to challenge.', 400)
     elif opponent['id'] == user.get_logged_in_id():
         return helpers.error('You cannot challenge yourself.', 400)
+
+
+def for_tournament_input(name, format_, turnlimit, rounds):
+    """Handles errors for the tournaments route."""
+
+    error_msgs = {
+        input_validation.TurnLimit.NONE: 'Please enter a turn limit in days.',
+        input_validation.TurnLimit.OUT_OF_BOUNDS: ('Please enter a turn limit '
+                                                   'greater than 0.')
+    }
+
+    turnlimit_check = input_validation.TurnLimit.check_valid(turnlimit)
+
+    error_msg = None
+    if not name or len(name) > tournaments.NAME_MAX_LEN:
+        error_msg = ('Please enter a tournament name of at most '
+                     f'{tournaments.NAME_MAX_LEN} characters.')
+    elif format_ not in tournaments.FORMATS:
+        error_msg = 'Please select a valid tournament format.'
+    elif turnlimit_check in error_msgs:
+        error_msg = error_msgs[turnlimit_check]
+    elif rounds is not None and not (
+            0 < rounds <= tournaments.MAX_SWISS_ROUNDS):
+        error_msg = ('Please enter a number of rounds between 1 and '
+                     f'{tournaments.MAX_SWISS_ROUNDS}.')
+
+    if error_msg is not None:
+        return helpers.error(error_msg, 400)
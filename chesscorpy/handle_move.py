@@ -1,20 +1,37 @@
-import datetime
 import io
+import time
 
-import chess
-import chess.pgn
+from . import user, database, games, helpers, explorer, live_games
+from . import analysis, counters, positions, tournaments, player_stats
 
-from . import user, database, games, helpers
 
-
-def _update_game_db(game_data):
+def _update_game_db(game_data, mover_id, board, last_move):
     query = ('UPDATE games SET to_move = ?, move_start_time = ?, status = ?, '
              'winner = ?, pgn = ? WHERE id = ?')
     query_args = [game_data['to_move'], game_data['move_start_time'],
                   game_data['status'], game_data['winner'], game_data['pgn'],
                   game_data['id']]
 
-    database.sql_exec(database.DATABASE_FILE, query, query_args)
+    if game_data['status'] == games.Status.IN_PROGRESS:
+        counter_changes = [
+            counters.change('games_to_move', [(mover_id, -1),
+                                              (game_data['to_move'], 1)])
+        ]
+    else:
+        counter_changes = [
+            counters.change('games_to_move', [(mover_id, -1)]),
+            counters.change('active_games',
+                            [(game_data['player_white_id'], -1),
+                             (game_data['player_black_id'], -1)]),
+            player_stats.record(game_data['player_white_id'],
+                                game_data['player_black_id'],
+                                game_data['winner'])
+        ]
+
+    database.sql_exec_batch(database.DATABASE_FILE, [
+        (query, [query_args]),
+        positions.update(game_data['id'], board.fen(), last_move, board.ply())
+    ] + counter_changes)
 
 
 def _update_player_to_move(game_data):
@@ -25,6 +42,8 @@ def _update_player_to_move(game_data):
 
 
 def _update_game_status(game_status, game_data):
+    import chess
+
     if game_status:
         status_options = {
             game_status.termination.CHECKMATE: games.Status.CHECKMATE,
@@ -52,8 +71,7 @@ def _update_game_status(game_status, game_data):
 
 def _update_game_data(game_data, game_pgn, game_status):
     game_data['pgn'] = game_pgn
-    game_data['move_start_time'] = (
-        datetime.datetime.now().replace(microsecond=0))
+    game_data['move_start_time'] = int(time.time())
     _update_player_to_move(game_data)
     _update_game_status(game_status, game_data)
 
@@ -65,8 +83,8 @@ def _get_game_status(game):
 def _regen_pgn_headers(game, game_data):
     game.headers['Event'] = 'Correspondence Chess'
     game.headers['Site'] = 'ChessCorPy'
-    game.headers['Date'] = datetime.datetime.strptime(
-        game_data['timestamp'], '%Y-%m-%d %H:%M:%S').strftime('%Y.%m.%d')
+    game.headers['Date'] = helpers.format_time(game_data['timestamp'],
+                                               '%Y.%m.%d')
     game.headers['Round'] = '-'
     game.headers['White'] = user.get_data_by_id(game_data[f'player_white_id'],
                                                 ['username'])['username']
@@ -75,6 +93,8 @@ def _regen_pgn_headers(game, game_data):
 
 
 def _board_load_pgn(board, pgn):
+    import chess.pgn
+
     game = chess.pgn.read_game(io.StringIO(pgn))
     for move in game.mainline_moves():
         board.push(move)
@@ -108,26 +128,33 @@ def _notify_player(mail, outcome, game_data, move_san):
 
     next_player = user.get_data_by_id(game_data['to_move'],
                                       ['id', 'username', 'email'])
+    event = f'Your opponent has played the move {move_san}. {msg_body}'
     msg = (
         f'Hi {next_player["username"]}!\n\n'
-        f'Your opponent has played the move {move_san}. '
-        f'{msg_body}\n\n'
+        f'{event}\n\n'
         'Your pal,\n'
         'ChessCorPyBot'
     )
 
     helpers.send_mail(mail, next_player['email'], 'Game Update', msg,
-                      next_player['id'])
+                      next_player['id'], f'Game {game_data["id"]}: {event}')
 
 
 def process_move(move_san, game_data, mail):
     """Processes a move request from a user."""
 
+    # chess is slow to import, so it's loaded on the first move
+    # rather than whenever the app starts.
+    import chess
+    import chess.pgn
+
     board = chess.Board()
 
     if game_data['pgn']:
         _board_load_pgn(board, game_data['pgn'])
 
+    position = explorer.position_key(board)
+
     if not _attempt_move(move_san, board):
         return False
 
@@ -137,10 +164,22 @@ def process_move(move_san, game_data, mail):
     # previous headers are lost so re-generate them.
     _regen_pgn_headers(game, game_data)
 
+    mover_id = game_data['to_move']
     _update_game_data(game_data, str(game).replace('\n', '\\n'),
                       _get_game_status(board))
-    _update_game_db(game_data)
+    _update_game_db(game_data, mover_id, board, game.end().san())
+
+    explorer.add_move(position, board.peek().uci())
+    outcome = _get_game_status(board)
+    if outcome:
+        explorer.add_result(board.move_stack, outcome.winner)
+        live_games.remove_game(game_data['id'])
+        analysis.enqueue(game_data['id'])
+        tournaments.game_finished(game_data['id'])
+    else:
+        live_games.update_game(game_data['id'], game.end().san(),
+                               board.ply())
 
-    _notify_player(mail, _get_game_status(board), game_data, move_san)
+    _notify_player(mail, outcome, game_data, move_san)
 
     return True
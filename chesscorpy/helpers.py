@@ -1,22 +1,78 @@
+import hmac
 import random
 import datetime
+import time
 from functools import wraps
 
-import flask_mail
-from flask import redirect, render_template
+from flask import redirect, render_template, current_app, Response
+from flask import request, abort
+from flask import stream_with_context
 
-from . import user
+from . import user, pools, digests
 
 
-def send_mail(mail, to, subject, body, user_id):
-    if int(user.get_data_by_id(user_id,
-                               ['notifications'])['notifications']) == 0:
+DAY_SECONDS = 24 * 60 * 60
+
+
+def get_mail():
+    """Returns the current app's mail client, setting it up on first use."""
+
+    app = current_app._get_current_object()
+
+    if 'mail' not in app.extensions:
+        import flask_mail
+        flask_mail.Mail(app)
+
+    return app.extensions['mail']
+
+
+def _send_mail_in_context(app, mail, msg):
+    with app.app_context():
+        try:
+            mail.send(msg)
+        except Exception:
+            app.logger.exception('Unable to send mail to %s.', msg.recipients)
+
+
+def send_mail(mail, to, subject, body, user_id, event=None):
+    settings = user.get_data_by_id(user_id, ['notifications', 'digest'])
+
+    if int(settings['notifications']) == 0:
+        return
+
+    # Users getting digests are sent the event in their next one instead.
+    if settings['digest'] != digests.IMMEDIATE:
+        digests.queue_event(user_id, event or body)
         return
 
+    import flask_mail
+
     msg = flask_mail.Message(subject, sender='chesscorpy@gmail.com',
                              recipients=[to])
     msg.body = body
-    mail.send(msg)
+
+    # Hand SMTP off to the mail pool so the caller doesn't wait on it,
+    # unless the pool is backed up, in which case the caller waits.
+    app = current_app._get_current_object()
+    try:
+        pools.submit(pools.MAIL, _send_mail_in_context, app, mail, msg)
+    except pools.PoolBusy:
+        mail.send(msg)
+
+
+def stream_template(template_name, **context):
+    """Renders a template into a response sent as it is generated.
+
+    Lists in the context can be generators, so rows go out as they're
+    read instead of the whole page being built first. Flask 2.0 has no
+    stream_template of its own.
+    """
+
+    app = current_app._get_current_object()
+    app.update_template_context(context)
+    template = app.jinja_env.get_or_select_template(template_name)
+
+    return Response(stream_with_context(template.generate(context)))
 
 
 def error(msg, code):
@@ -38,6 +94,22 @@ def login_required(f):
     return decorated_function
 
 
+def admin_required(f):
+    """Decorate routes to require the ADMIN_TOKEN config in the
+    X-Admin-Token header.
+
+    Other requests get a 404, as do all of them if no token is set.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        token = current_app.config['ADMIN_TOKEN']
+        sent = request.headers.get('X-Admin-Token')
+        if not token or not sent or not hmac.compare_digest(sent, token):
+            abort(404)
+        return f(*args, **kwargs)
+    return decorated_function
+
+
 def get_player_colors(white_id, user_id):
     """Returns a tuple of colors in the order (user, opponent)."""
 
@@ -63,12 +135,13 @@ def determine_player_colors(requester_color, requester_id, challenger_id):
             return challenger_id, requester_id
 
 
-def get_turn_time_left(turn_start, turnlimit):
-    """Determines how much time left a player has to move."""
+def format_time(epoch_time, fmt='%Y-%m-%d %H:%M:%S'):
+    """Formats an epoch time in the server's local time for display."""
+
+    return datetime.datetime.fromtimestamp(epoch_time).strftime(fmt)
+
+
+def format_time_left(deadline):
+    """Formats the time until an epoch time deadline for display."""
 
-    # Works by getting the time the move started,
-    # adds the turn limit to that time,
-    # and then subtracts the current time from the total.
-    return (datetime.datetime.strptime(turn_start, '%Y-%m-%d %H:%M:%S')
-            + (datetime.timedelta(days=turnlimit))
-            - datetime.datetime.now().replace(microsecond=0))
+    return str(datetime.timedelta(seconds=deadline - int(time.time())))
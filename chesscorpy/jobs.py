@@ -0,0 +1,182 @@
+import contextlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+from . import database
+
+
+LEASE_NAME = 'jobs'
+LEASE_SECONDS = 60
+# The lease is renewed this often while a job runs, so jobs can take
+# longer than the lease without another runner taking over.
+HEARTBEAT_SECONDS = LEASE_SECONDS / 4
+TICK_SECONDS = 5
+RUN_HISTORY_DAYS = 7
+
+# Job name: (interval in seconds, function taking no arguments).
+# Whatever a job returns is saved with its run as JSON, so jobs can
+# report what they did.
+JOBS = {}
+
+
+def register(name, interval, fn):
+    """Registers a job to be run every interval seconds by the leader."""
+
+    JOBS[name] = (interval, fn)
+
+
+def _acquire_lease(holder, now):
+    """Takes or renews the leader lease and returns whether it's held.
+
+    The lease can only be taken over once its holder has let it expire.
+    """
+
+    query = ('INSERT INTO leases (name, holder, expires) VALUES(?, ?, ?) '
+             'ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, '
+             'expires = excluded.expires WHERE leases.holder = '
+             'excluded.holder OR leases.expires < ?')
+    query_args = [LEASE_NAME, holder, now + LEASE_SECONDS, now]
+
+    database.sql_exec(database.DATABASE_FILE, query, query_args)
+
+    lease = database.sql_exec(database.DATABASE_FILE,
+                              'SELECT holder FROM leases WHERE name = ?',
+                              [LEASE_NAME], False)
+
+    return lease is not None and lease['holder'] == holder
+
+
+def _release_lease(holder):
+    database.sql_exec(database.DATABASE_FILE,
+                      'DELETE FROM leases WHERE name = ? AND holder = ?',
+                      [LEASE_NAME, holder])
+
+
+def _last_scheduled_time(name):
+    run = database.sql_exec(database.DATABASE_FILE,
+                            'SELECT MAX(scheduled) AS scheduled FROM job_runs '
+                            'WHERE job = ?', [name], False)
+
+    return run['scheduled'] if run else None
+
+
+def _record_run(name, holder, scheduled, started, finished, result, error):
+    query = ('INSERT INTO job_runs (job, holder, scheduled, started, '
+             'finished, lag, result, error) VALUES(?, ?, ?, ?, ?, ?, ?, ?)')
+    query_args = [name, holder, scheduled, started, finished,
+                  started - scheduled,
+                  json.dumps(result) if result is not None else None, error]
+
+    database.sql_exec(database.DATABASE_FILE, query, query_args)
+
+
+def _prune_runs(now):
+    database.sql_exec(database.DATABASE_FILE,
+                      'DELETE FROM job_runs WHERE started < ?',
+                      [now - RUN_HISTORY_DAYS * 24 * 60 * 60])
+
+
+class Runner:
+    """Runs the registered jobs while holding the leader lease.
+
+    Any number of runners may tick at once, across threads or
+    processes, but only the one holding the lease runs jobs. If it
+    dies, another takes over once the lease expires.
+
+    context returns a context manager to run in, like an app's
+    app_context, so the runner uses that app's storage.
+    """
+
+    def __init__(self, context=contextlib.nullcontext):
+        self.holder = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4()}'
+        self.is_leader = False
+        self._context = context
+        self._next_runs = {}
+
+    def _become_leader(self, now):
+        # Carry on from the previous leader's schedule so failing over
+        # doesn't run every job again straight away.
+        for name, (interval, _) in JOBS.items():
+            last = _last_scheduled_time(name)
+            self._next_runs[name] = last + interval if last else now
+
+        self.is_leader = True
+
+    def _renew_lease(self, stopped):
+        with self._context():
+            while not stopped.wait(HEARTBEAT_SECONDS):
+                try:
+                    _acquire_lease(self.holder, time.time())
+                except sqlite3.OperationalError:
+                    # Try again at the next beat; the lease has time left.
+                    pass
+
+    def _run_job(self, name, fn, scheduled):
+        started = time.time()
+        result, error = None, None
+        stopped = threading.Event()
+        heartbeat = threading.Thread(target=self._renew_lease,
+                                     args=(stopped,), daemon=True)
+        heartbeat.start()
+
+        try:
+            result = fn()
+        except Exception:
+            error = traceback.format_exc()
+        finally:
+            stopped.set()
+            heartbeat.join()
+
+        _record_run(name, self.holder, scheduled, started, time.time(),
+                    result, error)
+
+    def tick(self):
+        """Runs every job that is due if this runner is the leader."""
+
+        with self._context():
+            self._tick()
+
+    def _tick(self):
+        now = time.time()
+        ran_jobs = False
+
+        if not _acquire_lease(self.holder, now):
+            self.is_leader = False
+            return
+
+        if not self.is_leader:
+            self._become_leader(now)
+
+        for name, (interval, fn) in JOBS.items():
+            scheduled = self._next_runs.setdefault(name, now)
+            if scheduled > time.time():
+                continue
+
+            # Make sure the lease didn't lapse during a previous long job.
+            if not _acquire_lease(self.holder, time.time()):
+                self.is_leader = False
+                return
+
+            self._run_job(name, fn, scheduled)
+            ran_jobs = True
+
+            # Skip runs that were missed rather than running them back to
+            # back.
+            self._next_runs[name] = max(scheduled + interval, time.time())
+
+        if ran_jobs:
+            _prune_runs(now)
+
+    def stop(self):
+        """Gives up the lease so another runner can take over at once."""
+
+        if self.is_leader:
+            with self._context():
+                _release_lease(self.holder)
+            self.is_leader = False
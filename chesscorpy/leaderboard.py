@@ -0,0 +1,141 @@
+import time
+
+from . import database
+
+
+SCHEMA = 'ranks'
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+REFRESH_MINUTES = 10
+
+_TABLE = '''CREATE TABLE IF NOT EXISTS "leaderboard" (
+    "position" INTEGER NOT NULL,
+    "rank" INTEGER NOT NULL,
+    "user_id" INTEGER NOT NULL,
+    "rating" INTEGER NOT NULL,
+    PRIMARY KEY("position")
+)'''
+
+_INDEXES = (
+    'CREATE UNIQUE INDEX IF NOT EXISTS "leaderboard_user" ON "leaderboard" '
+    '("user_id")',
+    'CREATE INDEX IF NOT EXISTS "leaderboard_rating" ON "leaderboard" '
+    '("rating" DESC, "position")'
+)
+
+_created = set()
+
+
+def attach(leaderboard_file=None):
+    """Returns the attach argument for queries that read the leaderboard.
+
+    The snapshot has its own database in WAL mode, so refreshing it
+    never holds the main database's write lock and never blocks
+    readers. It is created the first time it is needed.
+    """
+
+    leaderboard_file = leaderboard_file or database.LEADERBOARD_FILE
+
+    if leaderboard_file not in _created:
+        database.sql_exec(leaderboard_file, 'PRAGMA journal_mode = WAL')
+        database.sql_exec_batch(leaderboard_file, [
+            (query, [()]) for query in (_TABLE,) + _INDEXES
+        ])
+        _created.add(leaderboard_file)
+
+    return [(leaderboard_file, SCHEMA)]
+
+
+def refresh():
+    """Snapshots every user's rank by rating.
+
+    Players with the same rating share a rank; position breaks the tie
+    so pages are stable. Returns the number of ranked users and the
+    seconds the refresh took, as {'ranked', 'seconds'}.
+    """
+
+    started = time.perf_counter()
+
+    # One quick pass over the rating index is all the main database sees.
+    users = database.sql_exec(database.DATABASE_FILE,
+                              'SELECT id, rating FROM users ORDER BY '
+                              'rating DESC, id')
+
+    rows = []
+    rank = 0
+    for position, (user_id, rating) in enumerate(users, 1):
+        if position == 1 or rating != rows[-1][3]:
+            rank = position
+        rows.append((position, rank, user_id, rating))
+
+    # Indexing the rows after inserting them is about twice as fast.
+    leaderboard_file = attach()[0][0]
+    database.sql_exec_batch(leaderboard_file, [
+        ('DELETE FROM leaderboard', [()]),
+        ('DROP INDEX leaderboard_user', [()]),
+        ('DROP INDEX leaderboard_rating', [()]),
+        ('INSERT INTO leaderboard (position, rank, user_id, rating) '
+         'VALUES(?, ?, ?, ?)', rows)
+    ] + [(query, [()]) for query in _INDEXES])
+
+    return {'ranked': len(rows),
+            'seconds': round(time.perf_counter() - started, 3)}
+
+
+def get_page(page, size=PAGE_SIZE):
+    """Retrieves one page of the leaderboard, best first, from 1."""
+
+    size = max(1, min(size, MAX_PAGE_SIZE))
+    first = (max(page, 1) - 1) * size + 1
+
+    query = ('SELECT ranked.rank, ranked.user_id, users.username, '
+             f'users.rating FROM {SCHEMA}.leaderboard AS ranked JOIN users '
+             'ON users.id = ranked.user_id WHERE ranked.position BETWEEN ? '
+             'AND ? ORDER BY ranked.position')
+
+    return database.rows_to_list(database.sql_exec(
+        database.DATABASE_FILE, query, [first, first + size - 1],
+        attach=attach()))
+
+
+def get_rank(user_id):
+    """Retrieves a user's rank and the page of the leaderboard it's on.
+
+    Users who joined since the last snapshot are placed by their rating
+    among the ranked players. Returns None for unknown users.
+    """
+
+    row = database.sql_exec(database.DATABASE_FILE,
+                            'SELECT ranked.position, ranked.rank FROM '
+                            f'users LEFT JOIN {SCHEMA}.leaderboard AS '
+                            'ranked ON ranked.user_id = users.id WHERE '
+                            'users.id = ?', [user_id], False,
+                            attach=attach())
+
+    if not row:
+        return None
+
+    if row['position'] is None:
+        # The first ranked player rated no higher is where they'd go.
+        row = database.sql_exec(database.DATABASE_FILE,
+                                'SELECT position, rank FROM '
+                                f'{SCHEMA}.leaderboard WHERE rating <= '
+                                '(SELECT rating FROM users WHERE id = ?) '
+                                'ORDER BY rating DESC, position LIMIT 1',
+                                [user_id], False, attach=attach())
+
+    if row:
+        position, rank = row['position'], row['rank']
+    else:
+        position = rank = get_count() + 1
+
+    return {'rank': rank, 'position': position,
+            'page': (position - 1) // PAGE_SIZE + 1}
+
+
+def get_count():
+    """Returns the number of users in the last snapshot."""
+
+    return database.sql_exec(attach()[0][0],
+                             'SELECT MAX(position) AS count FROM leaderboard',
+                             (), False)['count'] or 0
@@ -0,0 +1,138 @@
+import io
+import threading
+import time
+
+from . import database, games
+
+
+PAGE_SIZE = 20
+WIDGET_SIZE = 5
+CACHE_SECONDS = 5
+
+# Most pages kept in the cache. Pages come from the query string, so
+# without a limit anyone could grow it forever.
+MAX_CACHED_PAGES = 100
+
+# Maps (page, page size) to (expiry time, games), oldest first.
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def add(games_):
+    """Returns a statement for sql_exec_batch that adds games to the feed.
+
+    games_ is a list of (game id, white id, black id) tuples.
+    """
+
+    query = ('INSERT INTO live_games (game_id, player_white_id, '
+             'player_black_id, white_name, white_rating, black_name, '
+             'black_rating) SELECT ?, white.id, black.id, white.username, '
+             'white.rating, black.username, black.rating FROM users AS white, '
+             'users AS black WHERE white.id = ? AND black.id = ?')
+
+    return query, [list(game) for game in games_]
+
+
+def add_game(game_id, white_id, black_id):
+    """Adds a newly created public game to the live games feed."""
+
+    database.sql_exec_batch(database.DATABASE_FILE,
+                            [add([(game_id, white_id, black_id)])])
+
+
+def update_game(game_id, last_move, ply):
+    """Records the latest move of a game in the feed.
+
+    Does nothing for games that are not in the feed.
+    """
+
+    query = ('UPDATE live_games SET last_move = ?, ply = ?, updated = ? '
+             'WHERE game_id = ?')
+    query_args = [last_move, ply, int(time.time()), game_id]
+
+    database.sql_exec(database.DATABASE_FILE, query, query_args)
+
+
+def remove_game(game_id):
+    """Removes a finished game from the feed."""
+
+    database.sql_exec(database.DATABASE_FILE,
+                      'DELETE FROM live_games WHERE game_id = ?', [game_id])
+
+
+def rebuild():
+    """Rebuilds the feed from the active public games."""
+
+    query = ('SELECT id, player_white_id, player_black_id, pgn FROM games '
+             f'WHERE public = 1 AND (status = "{games.Status.NO_MOVE}" OR '
+             f'status = "{games.Status.IN_PROGRESS}")')
+
+    import chess.pgn
+
+    rows = []
+    for game in database.sql_exec(database.DATABASE_FILE, query):
+        last_move, ply = None, 0
+        if game['pgn']:
+            pgn = chess.pgn.read_game(
+                io.StringIO(game['pgn'].replace('\\n', '\n')))
+            last_node = pgn.end()
+            if last_node is not pgn:
+                last_move, ply = last_node.san(), last_node.ply()
+
+        rows.append([game['id'], last_move, ply, game['player_white_id'],
+                     game['player_black_id']])
+
+    database.sql_exec_batch(database.DATABASE_FILE, [
+        ('DELETE FROM live_games', [()]),
+        ('INSERT INTO live_games (game_id, last_move, ply, player_white_id, '
+         'player_black_id, white_name, white_rating, black_name, '
+         'black_rating) SELECT ?, ?, ?, white.id, black.id, white.username, '
+         'white.rating, black.username, black.rating FROM users AS white, '
+         'users AS black WHERE white.id = ? AND black.id = ?', rows)
+    ])
+
+    return len(rows)
+
+
+def get_games(page=1, page_size=PAGE_SIZE):
+    """Retrieves a page of the most recently active public games.
+
+    Pages are cached for a few seconds so frequent polling of the
+    feed doesn't reach the database.
+    """
+
+    page = max(page, 1)
+    page_size = max(1, min(page_size, PAGE_SIZE))
+
+    key = (page, page_size)
+    cached = _cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
+    query = ('SELECT * FROM live_games ORDER BY updated DESC, game_id DESC '
+             'LIMIT ? OFFSET ?')
+    query_args = [page_size, (page - 1) * page_size]
+
+    games_ = database.rows_to_list(
+        database.sql_exec(database.DATABASE_FILE, query, query_args))
+    _cache_page(key, games_)
+
+    return games_
+
+
+def _cache_page(key, games_):
+    now = time.monotonic()
+
+    with _cache_lock:
+        _cache.pop(key, None)
+
+        if len(_cache) >= MAX_CACHED_PAGES:
+            for old_key in [old_key for old_key, (expires, _) in
+                            _cache.items() if expires <= now]:
+                del _cache[old_key]
+
+        # Every page lives as long, so the first is the closest to expiry.
+        if len(_cache) >= MAX_CACHED_PAGES:
+            del _cache[next(iter(_cache))]
+
+        _cache[key] = (now + CACHE_SECONDS, games_)
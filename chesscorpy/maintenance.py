@@ -0,0 +1,188 @@
+import os
+import sqlite3
+import time
+
+from . import database
+
+
+# Every step is followed by a pause, so maintenance works at most this
+# share of the time and requests get the disk and the write lock back.
+DUTY = 0.2
+
+BACKUP_PAGES_PER_STEP = 1024
+VACUUM_PAGES_PER_STEP = 256
+
+# Rows ANALYZE samples from each index, which keeps it quick on big
+# tables at the cost of slightly rougher statistics.
+ANALYSIS_LIMIT = 1000
+
+INCREMENTAL = 2
+
+
+def _connect(db_file):
+    db = sqlite3.connect(db_file, uri=True, isolation_level=None)
+    database.apply_profile(db)
+
+    return db
+
+
+def _pause(started, duty):
+    """Sleeps long enough that the step since started took up duty of
+    the time.
+    """
+
+    time.sleep((time.perf_counter() - started) * (1 - duty) / duty)
+
+
+def _tables(db):
+    # Virtual tables keep their data in ordinary shadow tables, which
+    # are listed too.
+    return [row[0] for row in db.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND sql NOT "
+        "LIKE 'CREATE VIRTUAL%' ORDER BY name")]
+
+
+def backup(db_file, destination, pages=BACKUP_PAGES_PER_STEP, duty=DUTY):
+    """Copies a database to destination while it stays in use.
+
+    The copy is taken from one read snapshot, so writers carry on
+    without restarting it, though the WAL can't be checkpointed past the
+    snapshot until it's done. It's written next to destination first, so
+    destination is only ever a complete backup.
+    """
+
+    started = time.perf_counter()
+    step_started = started
+    steps = 0
+
+    def progress(status, remaining, total):
+        nonlocal step_started, steps
+        steps += 1
+        _pause(step_started, duty)
+        step_started = time.perf_counter()
+
+    partial = f'{destination}.partial'
+    source = _connect(db_file)
+    target = sqlite3.connect(partial)
+
+    try:
+        source.execute('BEGIN')
+        source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+        source.backup(target, pages=pages, progress=progress)
+        source.execute('COMMIT')
+        page_count = target.execute('PRAGMA page_count').fetchone()[0]
+    finally:
+        target.close()
+        source.close()
+
+    os.replace(partial, destination)
+
+    return {'pages': page_count, 'steps': steps,
+            'seconds': round(time.perf_counter() - started, 3)}
+
+
+def optimize(db_file, duty=DUTY):
+    """Refreshes the query planner's statistics one table at a time.
+
+    Returns the number of tables analysed.
+    """
+
+    db = _connect(db_file)
+    db.execute(f'PRAGMA analysis_limit = {ANALYSIS_LIMIT}')
+    tables = _tables(db)
+
+    for table in tables:
+        started = time.perf_counter()
+        db.execute(f'ANALYZE "{table}"')
+        _pause(started, duty)
+
+    # Catches anything else the planner would benefit from.
+    db.execute('PRAGMA optimize')
+    db.close()
+
+    return len(tables)
+
+
+def vacuum(db_file, pages=VACUUM_PAGES_PER_STEP, duty=DUTY):
+    """Returns the database's free pages to the file system a few at a
+    time.
+
+    Needs incremental auto vacuum; see enable_incremental_vacuum.
+    Returns the number of pages freed, or None if it isn't enabled.
+    """
+
+    db = _connect(db_file)
+
+    if db.execute('PRAGMA auto_vacuum').fetchone()[0] != INCREMENTAL:
+        db.close()
+        return None
+
+    def free_pages():
+        return db.execute('PRAGMA freelist_count').fetchone()[0]
+
+    before = remaining = free_pages()
+    while remaining:
+        started = time.perf_counter()
+        db.execute(f'PRAGMA incremental_vacuum({pages})').fetchall()
+        remaining = free_pages()
+        _pause(started, duty)
+
+    db.close()
+
+    return before
+
+
+def enable_incremental_vacuum(db_file):
+    """Turns on incremental auto vacuum.
+
+    This rebuilds the whole database with one VACUUM, which blocks
+    writers throughout, so run it when the site is quiet.
+    """
+
+    db = _connect(db_file)
+    db.execute(f'PRAGMA auto_vacuum = {INCREMENTAL}')
+    db.execute('VACUUM')
+    db.close()
+
+
+def check(db_file, duty=DUTY):
+    """Checks the integrity of each table and its indexes in turn.
+
+    Returns a list of the problems found.
+    """
+
+    db = _connect(db_file)
+    problems = []
+
+    for table in _tables(db):
+        started = time.perf_counter()
+        problems += [row[0] for row in db.execute(
+            f'PRAGMA integrity_check("{table}")') if row[0] != 'ok']
+        _pause(started, duty)
+
+    db.close()
+
+    return problems
+
+
+def sizes(db_file, duty=DUTY):
+    """Measures the space used by every table and index.
+
+    Returns (name, table name, bytes) tuples, biggest first.
+    """
+
+    db = _connect(db_file)
+    btrees = db.execute("SELECT name, tbl_name FROM sqlite_master WHERE "
+                        "type IN ('table', 'index') AND rootpage > 0")
+    found = []
+
+    for name, table in btrees.fetchall():
+        started = time.perf_counter()
+        found.append((name, table, db.execute(
+            'SELECT pgsize FROM dbstat WHERE name = ? AND aggregate = TRUE',
+            [name]).fetchone()[0]))
+        _pause(started, duty)
+
+    db.close()
+
+    return sorted(found, key=lambda btree: btree[2], reverse=True)
@@ -0,0 +1,187 @@
+import os
+import re
+import sqlite3
+
+from . import database
+
+
+# Columns that used to hold localtime 'YYYY-MM-DD HH:MM:SS' text and now
+# hold UTC seconds since the epoch.
+EPOCH_COLUMNS = {
+    'games': ('move_start_time', 'timestamp'),
+    'game_requests': ('timestamp',),
+    'chats': ('timestamp',),
+    'live_games': ('updated',)
+}
+
+# Each file in this folder adds the tables, columns and indexes of one
+# feature. They are applied in name order and only once per database.
+SCHEMA_DIR = os.path.join(os.path.dirname(__file__), 'schema')
+
+# A schema file can name the command that fills in its new tables from
+# existing data in a comment like this.
+_AFTER = re.compile(r'^-- After: (.+)$', re.MULTILINE)
+
+_SCHEMA_CHANGES = '''CREATE TABLE IF NOT EXISTS "schema_changes" (
+    "name" TEXT NOT NULL,
+    "applied" INTEGER NOT NULL
+        DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+    PRIMARY KEY("name")
+) WITHOUT ROWID'''
+
+EPOCH_DEFAULT = "(CAST(strftime('%s', 'now') AS INTEGER))"
+_TEXT_TIME = (r'\s+TEXT NOT NULL'
+              r"( DEFAULT \(datetime\(CURRENT_TIMESTAMP, 'localtime'\)\))?")
+
+
+def _column_types(db, table):
+    return {row[1]: row[2] for row in
+            db.execute(f'PRAGMA table_info("{table}")')}
+
+
+def _has_sequence(db):
+    return db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND "
+                      "name = 'sqlite_sequence'").fetchone() is not None
+
+
+def _migrate_table(db, table, columns):
+    """Rebuilds a table with its time columns as integers.
+
+    SQLite can't change a column's type in place, so the table is
+    copied into a new one and renamed, and its indexes recreated.
+    """
+
+    types = _column_types(db, table)
+    columns = [column for column in columns
+               if column in types and types[column].upper() != 'INTEGER']
+    if not columns:
+        return False
+
+    table_sql, = db.execute('SELECT sql FROM sqlite_master WHERE '
+                            "type = 'table' AND name = ?", [table]).fetchone()
+    index_sqls = [row[0] for row in db.execute(
+        'SELECT sql FROM sqlite_master WHERE type = ? AND tbl_name = ? AND '
+        'sql IS NOT NULL', ['index', table])]
+
+    for column in columns:
+        table_sql = re.sub(f'"{column}"{_TEXT_TIME}',
+                           f'"{column}"\tINTEGER NOT NULL DEFAULT '
+                           f'{EPOCH_DEFAULT}', table_sql)
+    table_sql = table_sql.replace(f'"{table}"', f'"new_{table}"', 1)
+
+    # The 'utc' modifier reads the old values as localtime.
+    select = ', '.join(
+        f"CAST(strftime('%s', \"{name}\", 'utc') AS INTEGER)"
+        if name in columns else f'"{name}"' for name in types)
+
+    # Dropping the table drops its AUTOINCREMENT counter too, which would
+    # hand out the ids of deleted and archived rows again.
+    sequence = db.execute('SELECT seq FROM sqlite_sequence WHERE name = ?',
+                          [table]).fetchone() if _has_sequence(db) else None
+
+    # Left behind by a run from before the rebuild was transactional.
+    db.execute(f'DROP TABLE IF EXISTS "new_{table}"')
+    db.execute(table_sql)
+    db.execute(f'INSERT INTO "new_{table}" SELECT {select} FROM "{table}"')
+    db.execute(f'DROP TABLE "{table}"')
+    db.execute(f'ALTER TABLE "new_{table}" RENAME TO "{table}"')
+    for index_sql in index_sqls:
+        db.execute(index_sql)
+
+    if sequence:
+        db.execute('DELETE FROM sqlite_sequence WHERE name = ?', [table])
+        db.execute('INSERT INTO sqlite_sequence (name, seq) VALUES(?, ?)',
+                   [table, sequence[0]])
+
+    return True
+
+
+def to_epoch_times(db_file, tables=None):
+    """Converts the time columns of a database to UTC epoch integers.
+
+    Tables that are missing or already converted are skipped, so it's
+    safe to run more than once. Returns the names of converted tables.
+    """
+
+    tables = EPOCH_COLUMNS if tables is None else tables
+    # In Python's default transaction mode the CREATE TABLE of a rebuild
+    # would commit on its own, so a failed run would leave it behind.
+    db = sqlite3.connect(db_file, uri=True, isolation_level=None)
+    migrated = []
+
+    try:
+        db.execute('BEGIN')
+        existing = {row[0] for row in db.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+        for table, columns in tables.items():
+            if table in existing and _migrate_table(db, table, columns):
+                migrated.append(table)
+
+        db.execute('COMMIT')
+    except BaseException:
+        if db.in_transaction:
+            db.execute('ROLLBACK')
+        raise
+    finally:
+        db.close()
+
+    return migrated
+
+
+def migrate():
+    """Converts the main and archive databases to epoch times."""
+
+    return (to_epoch_times(database.DATABASE_FILE)
+            + to_epoch_times(database.ARCHIVE_FILE,
+                             {'games': EPOCH_COLUMNS['games']}))
+
+
+def _statements(script):
+    statement = ''
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            yield statement
+            statement = ''
+
+
+def upgrade_schema(db_file, schema_dir=SCHEMA_DIR):
+    """Applies the schema files a database hasn't had yet.
+
+    Tables and indexes are created if they don't exist and columns
+    added if they're missing, so databases that already have some of a
+    file's changes can still take the rest. Returns (name, command to
+    run afterwards or None) for each file applied.
+    """
+
+    db = sqlite3.connect(db_file, uri=True)
+    applied = []
+
+    with db:
+        db.execute(_SCHEMA_CHANGES)
+        done = {row[0] for row in db.execute('SELECT name FROM '
+                                             'schema_changes')}
+
+        for file_name in sorted(os.listdir(schema_dir)):
+            name, extension = os.path.splitext(file_name)
+            if extension != '.sql' or name in done:
+                continue
+
+            with open(os.path.join(schema_dir, file_name)) as file:
+                script = file.read()
+
+            for statement in _statements(script):
+                try:
+                    db.execute(statement)
+                except sqlite3.OperationalError as error:
+                    if 'duplicate column name' not in str(error):
+                        raise
+
+            db.execute('INSERT INTO schema_changes (name) VALUES(?)', [name])
+            after = _AFTER.search(script)
+            applied.append((name, after.group(1) if after else None))
+
+    db.close()
+
+    return applied
@@ -0,0 +1,106 @@
+from . import database, games, user, archive
+
+
+WIN = 1
+LOSS = -1
+DRAW = 0
+
+FIELDS = ('wins', 'losses', 'draws', 'white_wins', 'white_losses',
+          'white_draws', 'black_wins', 'black_losses', 'black_draws',
+          'streak', 'best_streak')
+
+# Wins in a row are a positive streak and losses in a row a negative one.
+# Upserts read the old row, so the new streak is spelled out for both
+# columns that need it.
+_STREAK = ('CASE WHEN excluded.streak > 0 AND user_stats.streak > 0 THEN '
+           'user_stats.streak + 1 WHEN excluded.streak < 0 AND '
+           'user_stats.streak < 0 THEN user_stats.streak - 1 ELSE '
+           'excluded.streak END')
+
+
+def _result_row(user_id, result, is_white):
+    counts = [int(result == WIN), int(result == LOSS), int(result == DRAW)]
+    by_color = counts + [0] * 3 if is_white else [0] * 3 + counts
+
+    return [user_id] + counts + by_color + [result, int(result == WIN)]
+
+
+def record(white_id, black_id, winner):
+    """Returns a statement for sql_exec_batch that records a game's result.
+
+    winner is the id of the winning player or user.DRAW_USER_ID. Run it
+    in the same batch as the game's final update.
+    """
+
+    adds = ', '.join(f'{field} = {field} + excluded.{field}'
+                     for field in FIELDS[:-2])
+    query = (f'INSERT INTO user_stats (user_id, {", ".join(FIELDS)}) '
+             f'VALUES({", ".join("?" * (len(FIELDS) + 1))}) ON '
+             f'CONFLICT(user_id) DO UPDATE SET {adds}, streak = {_STREAK}, '
+             f'best_streak = MAX(best_streak, {_STREAK})')
+
+    if winner == user.DRAW_USER_ID:
+        results = (DRAW, DRAW)
+    elif winner == white_id:
+        results = (WIN, LOSS)
+    else:
+        results = (LOSS, WIN)
+
+    return query, [_result_row(white_id, results[0], True),
+                   _result_row(black_id, results[1], False)]
+
+
+def get(user_id):
+    """Retrieves a user's game statistics."""
+
+    query = f'SELECT {", ".join(FIELDS)} FROM user_stats WHERE user_id = ?'
+    row = database.sql_exec(database.DATABASE_FILE, query, [user_id], False)
+
+    return database.row_to_dict(row) if row else dict.fromkeys(FIELDS, 0)
+
+
+def rebuild():
+    """Recomputes every user's statistics from all finished games.
+
+    Returns the number of users with statistics.
+    """
+
+    finished = (f'status != "{games.Status.NO_MOVE}" AND '
+                f'status != "{games.Status.IN_PROGRESS}"')
+    ended = (f'CASE WHEN status = "{games.Status.TIMEOUT}" THEN '
+             f'{games.DEADLINE} ELSE move_start_time END')
+    query = (f'SELECT player_white_id, player_black_id, winner, {ended} AS '
+             f'ended, id FROM main.games WHERE {finished} UNION ALL SELECT '
+             f'player_white_id, player_black_id, winner, {ended}, id FROM '
+             f'{archive.SCHEMA}.games WHERE {finished} ORDER BY ended, id')
+
+    stats = {}
+    for game in database.sql_exec(database.DATABASE_FILE, query,
+                                  attach=archive.attach()):
+        _, rows = record(game['player_white_id'], game['player_black_id'],
+                         game['winner'])
+
+        for row in rows:
+            totals = stats.setdefault(row[0], dict.fromkeys(FIELDS, 0))
+            for field, value in zip(FIELDS[:-2], row[1:]):
+                totals[field] += value
+
+            result = row[-2]
+            if result > 0 and totals['streak'] > 0:
+                totals['streak'] += 1
+            elif result < 0 and totals['streak'] < 0:
+                totals['streak'] -= 1
+            else:
+                totals['streak'] = result
+            totals['best_streak'] = max(totals['best_streak'],
+                                        totals['streak'])
+
+    database.sql_exec_batch(database.DATABASE_FILE, [
+        ('DELETE FROM user_stats', [()]),
+        (f'INSERT INTO user_stats (user_id, {", ".join(FIELDS)}) '
+         f'VALUES({", ".join("?" * (len(FIELDS) + 1))})',
+         [[user_id] + [totals[field] for field in FIELDS]
+          for user_id, totals in stats.items()])
+    ])
+
+    return len(stats)
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+DB = 'db'
+CHESS = 'chess'
+MAIL = 'mail'
+WEB = 'web'
+
+# Pool name: (worker threads, max jobs waiting for a worker). WEB runs
+# the Flask routes in ASGI mode, so it caps the synchronous requests
+# handled at once.
+POOL_SIZES = {
+    WEB: (16, 200),
+    DB: (4, 200),
+    CHESS: (2, 50),
+    MAIL: (2, 500)
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolBusy(Exception):
+    """Raised when a pool's queue is full."""
+
+
+class Pool:
+    """A thread pool with a bounded queue that tracks its own load."""
+
+    def __init__(self, name, workers, max_queued):
+        self.name = name
+        self.workers = workers
+        self.max_queued = max_queued
+        self._executor = ThreadPoolExecutor(workers, f'chesscorpy-{name}')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._peak_queued = 0
+
+    def _queued(self):
+        return self._pending - self._running
+
+    def _run(self, fn, args, kwargs):
+        with self._lock:
+            self._running += 1
+
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._pending -= 1
+                self._completed += 1
+
+    def submit(self, fn, *args, **kwargs):
+        """Queues a call and returns its future.
+
+        Raises PoolBusy instead of queuing past the pool's limit.
+        """
+
+        with self._lock:
+            if self._queued() >= self.max_queued:
+                self._rejected += 1
+                raise PoolBusy(self.name)
+
+            self._pending += 1
+            self._peak_queued = max(self._peak_queued, self._queued())
+
+        return self._executor.submit(self._run, fn, args, kwargs)
+
+    def stats(self):
+        """Returns the pool's current load and lifetime counters."""
+
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'running': self._running,
+                'queued': self._queued(),
+                'max_queued': self.max_queued,
+                'peak_queued': self._peak_queued,
+                'completed': self._completed,
+                'rejected': self._rejected
+            }
+
+
+def get(name):
+    """Returns the named pool, creating it on first use."""
+
+    with _pools_lock:
+        if name not in _pools:
+            _pools[name] = Pool(name, *POOL_SIZES[name])
+
+        return _pools[name]
+
+
+def submit(name, fn, *args, **kwargs):
+    """Queues a call on the named pool and returns its future."""
+
+    return get(name).submit(fn, *args, **kwargs)
+
+
+async def run(name, fn, *args, **kwargs):
+    """Awaits a blocking call run on the named pool."""
+
+    return await asyncio.wrap_future(submit(name, fn, *args, **kwargs))
+
+
+def stats():
+    """Returns the stats of every pool created so far."""
+
+    with _pools_lock:
+        pools = list(_pools.values())
+
+    return {pool.name: pool.stats() for pool in pools}
@@ -0,0 +1,49 @@
+import io
+
+from . import database, archive
+
+
+STARTING_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+
+def update(game_id, fen, last_move, ply):
+    """Returns a statement for sql_exec_batch that records a game's position.
+
+    Run it in the same batch as the move so the two never disagree.
+    """
+
+    query = ('INSERT OR REPLACE INTO game_positions (game_id, fen, '
+             'last_move, ply) VALUES(?, ?, ?, ?)')
+
+    return query, [[game_id, fen, last_move, ply]]
+
+
+def rebuild():
+    """Recomputes the position of every game from its PGN.
+
+    Returns the number of games with moves.
+    """
+
+    import chess.pgn
+
+    query = (f'SELECT id, pgn FROM main.games WHERE pgn IS NOT NULL UNION ALL '
+             f'SELECT id, pgn FROM {archive.SCHEMA}.games WHERE pgn IS NOT '
+             'NULL')
+
+    rows = []
+    for game in database.sql_exec(database.DATABASE_FILE, query,
+                                  attach=archive.attach()):
+        pgn = chess.pgn.read_game(io.StringIO(game['pgn'].replace('\\n',
+                                                                  '\n')))
+        last_node = pgn.end()
+        if last_node is not pgn:
+            rows.append([game['id'], last_node.board().fen(),
+                         last_node.san(), last_node.ply()])
+
+    database.sql_exec_batch(database.DATABASE_FILE, [
+        ('DELETE FROM game_positions', [()]),
+        ('INSERT INTO game_positions (game_id, fen, last_move, ply) '
+         'VALUES(?, ?, ?, ?)', rows)
+    ])
+
+    return len(rows)
@@ -0,0 +1,150 @@
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import g, request
+
+
+HEADER = 'X-Profile-Token'
+DIRECTORY = 'profiles'
+MAX_MEGABYTES = 50
+SAMPLE_RATE = 0
+INTERVAL = 0.005
+
+# Profiles are written in the collapsed stack format, one "frame;frame
+# count" line per stack, which flamegraph.pl, speedscope and others read.
+EXTENSION = '.folded'
+
+_written_lock = threading.Lock()
+
+
+class Sampler:
+    """Records a thread's stack every interval from another thread.
+
+    Unlike cProfile it doesn't slow down the code it watches, and it
+    sees whole stacks, which is what a flame graph needs.
+    """
+
+    def __init__(self, thread_id, interval=INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+
+            while frame:
+                code = frame.f_code
+                file_name = os.path.basename(code.co_filename)
+                stack.append(f'{code.co_name} ({file_name}:'
+                             f'{code.co_firstlineno})')
+                frame = frame.f_back
+
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Stops sampling and returns the number of times each stack was
+        seen.
+        """
+
+        self._stopped.set()
+        self._thread.join()
+
+        return self.stacks
+
+
+def should_profile(token, sample_rate):
+    """Decides whether the current request is profiled.
+
+    Requests carrying the token in HEADER always are, and others at
+    random at sample_rate, from 0 to 1.
+    """
+
+    sent = request.headers.get(HEADER)
+    if token and sent and hmac.compare_digest(sent, token):
+        return True
+
+    return random.random() < sample_rate
+
+
+def _tag():
+    """Names the request for the profile's root frame."""
+
+    # A semicolon would split the frame in two.
+    return f'{request.method} {request.full_path.rstrip("?")}'.replace(
+        ';', ',')
+
+
+def write(stacks, tag, endpoint, directory, max_megabytes):
+    """Writes collapsed stacks under tag to a new file in directory.
+
+    The oldest profiles are deleted to keep the directory under
+    max_megabytes. Returns the path of the new file.
+    """
+
+    name = re.sub(r'[^\w.-]', '_', endpoint or 'unknown')
+    path = os.path.join(directory, f'{time.time_ns()}-{name}{EXTENSION}')
+
+    with _written_lock:
+        os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as file:
+            for stack, count in stacks.items():
+                file.write(f'{tag};{stack} {count}\n')
+
+        # Names start with the time written, so they sort oldest first.
+        profiles = sorted(
+            (entry for entry in os.scandir(directory)
+             if entry.name.endswith(EXTENSION)),
+            key=lambda entry: entry.name)
+        total = sum(entry.stat().st_size for entry in profiles)
+
+        for entry in profiles[:-1]:
+            if total <= max_megabytes * 1024 * 1024:
+                break
+            total -= entry.stat().st_size
+            os.remove(entry.path)
+
+    return path
+
+
+def init_app(app):
+    """Profiles the app's requests that should_profile picks."""
+
+    config = app.config
+
+    @app.before_request
+    def start_profiling():
+        if should_profile(config['PROFILING_TOKEN'],
+                          config['PROFILING_SAMPLE_RATE']):
+            g.profiler = Sampler(threading.get_ident())
+            g.profiler.start()
+
+    @app.after_request
+    def stop_profiling(response):
+        profiler = g.pop('profiler', None)
+
+        if profiler:
+            tag, endpoint = _tag(), request.endpoint
+
+            # Streamed pages are still being generated at this point, so
+            # the profile ends once the response is finished.
+            def finish():
+                write(profiler.stop(), tag, endpoint,
+                      config['PROFILING_DIR'], config['PROFILING_MAX_MB'])
+
+            response.call_on_close(finish)
+
+        return response
@@ -0,0 +1,200 @@
+import math
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from flask import current_app, request, jsonify
+
+from . import database, user
+
+
+MEMORY = 'memory'
+SQLITE = 'sqlite'
+
+# Route name: scope: (burst size, requests refilled per minute).
+# IP limits are looser since players can share an address.
+LIMITS = {
+    'move': {'user': (10, 30), 'ip': (60, 180)},
+    'chat': {'user': (10, 20), 'ip': (60, 120)}
+}
+
+# Buckets untouched for this long are full again and can be dropped.
+IDLE_SECONDS = 60 * 60
+PRUNE_EVERY = 1000
+
+_rejected = Counter()
+_rejected_lock = threading.Lock()
+
+
+class MemoryStore:
+    """Token buckets shared by the threads of one process."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._takes = 0
+
+    def take(self, key, capacity, rate, now):
+        """Takes a token from a bucket.
+
+        Returns 0 if one was taken, otherwise the seconds until one
+        will be available.
+        """
+
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                retry_after = 0
+            else:
+                self._buckets[key] = (tokens, now)
+                retry_after = (1 - tokens) / rate
+
+            self._takes += 1
+            if self._takes % PRUNE_EVERY == 0:
+                self._buckets = {
+                    key: bucket for key, bucket in self._buckets.items()
+                    if bucket[1] >= now - IDLE_SECONDS
+                }
+
+        return retry_after
+
+    def refund(self, key, capacity):
+        """Puts back a token taken from a bucket."""
+
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated = self._buckets[key]
+                self._buckets[key] = (min(capacity, tokens + 1), updated)
+
+
+class SQLiteStore:
+    """Token buckets in the database, shared by every process."""
+
+    def take(self, key, capacity, rate, now):
+        """Takes a token from a bucket.
+
+        Returns 0 if one was taken, otherwise the seconds until one
+        will be available.
+        """
+
+        # The update is skipped, so nothing is returned, if the bucket
+        # is empty.
+        refilled = 'MIN(?, rate_limits.tokens + (? - rate_limits.updated) * ?)'
+        query = ('INSERT INTO rate_limits (key, tokens, updated) '
+                 'VALUES(?, ?, ?) ON CONFLICT(key) DO UPDATE SET '
+                 f'tokens = {refilled} - 1, updated = excluded.updated '
+                 f'WHERE {refilled} >= 1 RETURNING tokens')
+        query_args = [key, capacity - 1, now] + [capacity, now, rate] * 2
+
+        if database.sql_exec(database.DATABASE_FILE, query, query_args,
+                             False):
+            return 0
+
+        bucket = database.sql_exec(database.DATABASE_FILE,
+                                   'SELECT tokens, updated FROM rate_limits '
+                                   'WHERE key = ?', [key], False)
+        tokens = min(capacity, bucket['tokens']
+                     + (now - bucket['updated']) * rate)
+
+        return max(0, (1 - tokens) / rate)
+
+    def refund(self, key, capacity):
+        """Puts back a token taken from a bucket."""
+
+        database.sql_exec(database.DATABASE_FILE,
+                          'UPDATE rate_limits SET tokens = MIN(?, tokens + 1) '
+                          'WHERE key = ?', [capacity, key])
+
+
+def prune():
+    """Deletes idle buckets from the database and returns how many."""
+
+    idle = database.sql_exec(database.DATABASE_FILE,
+                             'SELECT COUNT(*) AS count FROM rate_limits '
+                             'WHERE updated < ?',
+                             [time.time() - IDLE_SECONDS], False)['count']
+    database.sql_exec(database.DATABASE_FILE,
+                      'DELETE FROM rate_limits WHERE updated < ?',
+                      [time.time() - IDLE_SECONDS])
+
+    return {'pruned': idle}
+
+
+def _get_store(app):
+    if 'rate_limit_store' not in app.extensions:
+        stores = {MEMORY: MemoryStore, SQLITE: SQLiteStore}
+        app.extensions['rate_limit_store'] = (
+            stores[app.config['RATE_LIMIT_STORE']]())
+
+    return app.extensions['rate_limit_store']
+
+
+def check(name):
+    """Takes a token for the current user and IP from a route's buckets.
+
+    Returns 0 if the request may go ahead, otherwise the seconds the
+    client should wait. A rejected request gives back the tokens it took,
+    so one limit doesn't use up the other's.
+    """
+
+    app = current_app._get_current_object()
+    if not app.config['RATE_LIMIT_STORE']:
+        return 0
+
+    store = _get_store(app)
+    now = time.time()
+    keys = {'user': user.get_logged_in_id(), 'ip': request.remote_addr}
+    taken = []
+
+    for scope, (capacity, per_minute) in app.config['RATE_LIMITS'].get(
+            name, {}).items():
+        if keys.get(scope) is None:
+            continue
+
+        key = f'{name}:{scope}:{keys[scope]}'
+        retry_after = store.take(key, capacity, per_minute / 60, now)
+        if retry_after:
+            for taken_key, taken_capacity in taken:
+                store.refund(taken_key, taken_capacity)
+            with _rejected_lock:
+                _rejected[f'{name}:{scope}'] += 1
+            return retry_after
+
+        taken.append((key, capacity))
+
+    return 0
+
+
+def limit(name):
+    """Decorate write routes to rate limit their POST requests."""
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method == 'POST':
+                retry_after = check(name)
+                if retry_after:
+                    response = jsonify(successful=False,
+                                       error='Too many requests.')
+                    response.status_code = 429
+                    response.headers['Retry-After'] = str(
+                        math.ceil(retry_after))
+                    return response
+
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def stats():
+    """Returns the number of rejected requests by route and scope.
+
+    Counts are for this process since it started.
+    """
+
+    with _rejected_lock:
+        return dict(_rejected)
@@ -0,0 +1,12 @@
+-- Move counts and results per position for the opening explorer.
+-- After: flask rebuild-explorer
+
+CREATE TABLE IF NOT EXISTS "explorer" (
+    "position" INTEGER NOT NULL,
+    "move" TEXT NOT NULL,
+    "games" INTEGER NOT NULL DEFAULT 0,
+    "white_wins" INTEGER NOT NULL DEFAULT 0,
+    "draws" INTEGER NOT NULL DEFAULT 0,
+    "black_wins" INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY("position", "move")
+) WITHOUT ROWID;
@@ -0,0 +1,10 @@
+-- Trigram username search, and the index behind short prefix lookups.
+-- After: flask rebuild-user-search
+
+CREATE INDEX IF NOT EXISTS "users_username" ON "users" (
+    "username" COLLATE NOCASE
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS "users_search" USING fts5(
+    username, content='users', content_rowid='id', tokenize='trigram'
+);
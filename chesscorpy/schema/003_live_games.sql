@@ -0,0 +1,21 @@
+-- One row per active public game for the spectator feed.
+-- After: flask rebuild-live-games
+
+CREATE TABLE IF NOT EXISTS "live_games" (
+    "game_id" INTEGER NOT NULL UNIQUE,
+    "player_white_id" INTEGER NOT NULL,
+    "player_black_id" INTEGER NOT NULL,
+    "white_name" TEXT NOT NULL,
+    "white_rating" INTEGER NOT NULL,
+    "black_name" TEXT NOT NULL,
+    "black_rating" INTEGER NOT NULL,
+    "last_move" TEXT,
+    "ply" INTEGER NOT NULL DEFAULT 0,
+    "updated" INTEGER NOT NULL
+        DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+    PRIMARY KEY("game_id")
+);
+
+CREATE INDEX IF NOT EXISTS "live_games_updated" ON "live_games" (
+    "updated" DESC, "game_id" DESC
+);
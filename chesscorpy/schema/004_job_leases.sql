@@ -0,0 +1,25 @@
+-- The lease that picks which process runs scheduled jobs, and a log of
+-- each run.
+
+CREATE TABLE IF NOT EXISTS "leases" (
+    "name" TEXT NOT NULL UNIQUE,
+    "holder" TEXT NOT NULL,
+    "expires" REAL NOT NULL,
+    PRIMARY KEY("name")
+);
+
+CREATE TABLE IF NOT EXISTS "job_runs" (
+    "id" INTEGER NOT NULL UNIQUE,
+    "job" TEXT NOT NULL,
+    "holder" TEXT NOT NULL,
+    "scheduled" REAL NOT NULL,
+    "started" REAL NOT NULL,
+    "finished" REAL NOT NULL,
+    "lag" REAL NOT NULL,
+    "error" TEXT,
+    PRIMARY KEY("id" AUTOINCREMENT)
+);
+
+CREATE INDEX IF NOT EXISTS "job_runs_job" ON "job_runs" ("job", "scheduled");
+
+CREATE INDEX IF NOT EXISTS "job_runs_started" ON "job_runs" ("started");
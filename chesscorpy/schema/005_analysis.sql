@@ -0,0 +1,28 @@
+-- The queue of finished games to analyse and each move's analysis.
+
+CREATE TABLE IF NOT EXISTS "game_analysis" (
+    "game_id" INTEGER NOT NULL UNIQUE,
+    "state" TEXT NOT NULL DEFAULT 'queued',
+    "next_ply" INTEGER NOT NULL DEFAULT 1,
+    "attempts" INTEGER NOT NULL DEFAULT 0,
+    "white_accuracy" REAL,
+    "black_accuracy" REAL,
+    "white_blunders" INTEGER,
+    "black_blunders" INTEGER,
+    "updated" REAL NOT NULL,
+    PRIMARY KEY("game_id")
+);
+
+CREATE INDEX IF NOT EXISTS "game_analysis_state" ON "game_analysis" (
+    "state", "game_id"
+);
+
+CREATE TABLE IF NOT EXISTS "move_analysis" (
+    "game_id" INTEGER NOT NULL,
+    "ply" INTEGER NOT NULL,
+    "move" TEXT NOT NULL,
+    "eval" INTEGER NOT NULL,
+    "accuracy" REAL NOT NULL,
+    "classification" TEXT,
+    PRIMARY KEY("game_id", "ply")
+) WITHOUT ROWID;
@@ -0,0 +1,18 @@
+-- Notification digests: each user's choice, the queue of events waiting
+-- for a digest, and the summary each job run returns.
+
+ALTER TABLE "users" ADD COLUMN "digest" TEXT NOT NULL DEFAULT 'immediate';
+
+ALTER TABLE "job_runs" ADD COLUMN "result" TEXT;
+
+CREATE TABLE IF NOT EXISTS "notifications" (
+    "id" INTEGER NOT NULL UNIQUE,
+    "user_id" INTEGER NOT NULL,
+    "event" TEXT NOT NULL,
+    "created" REAL NOT NULL,
+    PRIMARY KEY("id" AUTOINCREMENT)
+);
+
+CREATE INDEX IF NOT EXISTS "notifications_user" ON "notifications" (
+    "user_id", "id"
+);
@@ -0,0 +1,16 @@
+-- Compacted chats, one compressed row per game, and the index that
+-- loads a game's newest messages.
+
+CREATE TABLE IF NOT EXISTS "chat_archives" (
+    "game_id" INTEGER NOT NULL UNIQUE,
+    "messages" BLOB NOT NULL,
+    "message_count" INTEGER NOT NULL,
+    "updated" REAL NOT NULL,
+    PRIMARY KEY("game_id")
+);
+
+CREATE INDEX IF NOT EXISTS "chat_archives_updated" ON "chat_archives" (
+    "updated"
+);
+
+CREATE INDEX IF NOT EXISTS "chats_game" ON "chats" ("game_id", "id");
@@ -0,0 +1,18 @@
+-- Each user's dashboard counts, and unread chat messages per game.
+-- After: flask rebuild-counters
+
+CREATE TABLE IF NOT EXISTS "user_counters" (
+    "user_id" INTEGER NOT NULL UNIQUE,
+    "games_to_move" INTEGER NOT NULL DEFAULT 0,
+    "active_games" INTEGER NOT NULL DEFAULT 0,
+    "open_challenges" INTEGER NOT NULL DEFAULT 0,
+    "unread_chats" INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY("user_id")
+);
+
+CREATE TABLE IF NOT EXISTS "chat_unread" (
+    "user_id" INTEGER NOT NULL,
+    "game_id" INTEGER NOT NULL,
+    "count" INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY("user_id", "game_id")
+) WITHOUT ROWID;
@@ -0,0 +1,13 @@
+-- Token buckets shared by every process when RATE_LIMIT_STORE is
+-- 'sqlite'.
+
+CREATE TABLE IF NOT EXISTS "rate_limits" (
+    "key" TEXT NOT NULL UNIQUE,
+    "tokens" REAL NOT NULL,
+    "updated" REAL NOT NULL,
+    PRIMARY KEY("key")
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS "rate_limits_updated" ON "rate_limits" (
+    "updated"
+);
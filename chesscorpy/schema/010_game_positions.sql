@@ -0,0 +1,10 @@
+-- Each game's current position, so it isn't parsed from the PGN.
+-- After: flask rebuild-positions
+
+CREATE TABLE IF NOT EXISTS "game_positions" (
+    "game_id" INTEGER NOT NULL UNIQUE,
+    "fen" TEXT NOT NULL,
+    "last_move" TEXT,
+    "ply" INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY("game_id")
+);
@@ -0,0 +1,38 @@
+-- Tournaments, their players and the pairings of each round.
+
+CREATE TABLE IF NOT EXISTS "tournaments" (
+    "id" INTEGER NOT NULL UNIQUE,
+    "name" TEXT NOT NULL,
+    "format" TEXT NOT NULL,
+    "creator_id" INTEGER NOT NULL,
+    "turn_day_limit" INTEGER NOT NULL DEFAULT 1,
+    "rounds" INTEGER,
+    "current_round" INTEGER NOT NULL DEFAULT 0,
+    "status" TEXT NOT NULL DEFAULT 'open',
+    "timestamp" INTEGER NOT NULL
+        DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+    PRIMARY KEY("id" AUTOINCREMENT)
+);
+
+CREATE INDEX IF NOT EXISTS "tournaments_status" ON "tournaments" (
+    "status"
+);
+
+CREATE TABLE IF NOT EXISTS "tournament_players" (
+    "tournament_id" INTEGER NOT NULL,
+    "user_id" INTEGER NOT NULL,
+    PRIMARY KEY("tournament_id", "user_id")
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS "tournament_games" (
+    "tournament_id" INTEGER NOT NULL,
+    "round" INTEGER NOT NULL,
+    "white_id" INTEGER NOT NULL,
+    "black_id" INTEGER,
+    "game_id" INTEGER,
+    PRIMARY KEY("tournament_id", "round", "white_id")
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS "tournament_games_game" ON "tournament_games" (
+    "game_id"
+);
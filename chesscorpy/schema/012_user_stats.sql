@@ -0,0 +1,18 @@
+-- Each user's win, loss and draw counts and streaks.
+-- After: flask rebuild-stats
+
+CREATE TABLE IF NOT EXISTS "user_stats" (
+    "user_id" INTEGER NOT NULL,
+    "wins" INTEGER NOT NULL DEFAULT 0,
+    "losses" INTEGER NOT NULL DEFAULT 0,
+    "draws" INTEGER NOT NULL DEFAULT 0,
+    "white_wins" INTEGER NOT NULL DEFAULT 0,
+    "white_losses" INTEGER NOT NULL DEFAULT 0,
+    "white_draws" INTEGER NOT NULL DEFAULT 0,
+    "black_wins" INTEGER NOT NULL DEFAULT 0,
+    "black_losses" INTEGER NOT NULL DEFAULT 0,
+    "black_draws" INTEGER NOT NULL DEFAULT 0,
+    "streak" INTEGER NOT NULL DEFAULT 0,
+    "best_streak" INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY("user_id")
+);
@@ -0,0 +1,3 @@
+-- Reads users in rating order for the leaderboard snapshot.
+
+CREATE INDEX IF NOT EXISTS "users_rating" ON "users" ("rating" DESC);
@@ -0,0 +1,3 @@
+-- Finds a game's unread counts when its chat is compacted.
+
+CREATE INDEX IF NOT EXISTS "chat_unread_game" ON "chat_unread" ("game_id");
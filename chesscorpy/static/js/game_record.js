@@ -0,0 +1,54 @@
+// Keeps the captured pieces and move list of a game up to date one move at
+// a time, instead of walking the whole history after every move.
+
+const CAPTURABLE = ['Q', 'R', 'B', 'N', 'P']
+
+function newRecord() {
+    return {
+        // Pieces of each color that have been captured.
+        captured: {
+            w: {'Q': 0, 'R': 0, 'B': 0, 'N': 0, 'P': 0},
+            b: {'Q': 0, 'R': 0, 'B': 0, 'N': 0, 'P': 0}
+        },
+        // Verbose chess.js moves, oldest first.
+        moves: []
+    }
+}
+
+function recordMove(record, move) {
+    if (move.captured) {
+        const loser = move.color === 'w' ? 'b' : 'w'
+        record.captured[loser][move.captured.toUpperCase()]++
+    }
+
+    record.moves.push(move)
+}
+
+function unrecordMove(record) {
+    const move = record.moves.pop()
+
+    if (move && move.captured) {
+        const loser = move.color === 'w' ? 'b' : 'w'
+        record.captured[loser][move.captured.toUpperCase()]--
+    }
+
+    return move
+}
+
+function recordFromHistory(history) {
+    const record = newRecord()
+
+    for (const move of history) {
+        recordMove(record, move)
+    }
+
+    return record
+}
+
+if (typeof exports !== 'undefined') {
+    exports.CAPTURABLE = CAPTURABLE
+    exports.newRecord = newRecord
+    exports.recordMove = recordMove
+    exports.unrecordMove = unrecordMove
+    exports.recordFromHistory = recordFromHistory
+}
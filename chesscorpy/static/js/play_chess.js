@@ -31,6 +31,12 @@ function getChat() {
     )
 }
 
+function tooManyRequests(xhr, what) {
+    const wait = xhr.getResponseHeader('Retry-After')
+    return 'Too many ' + what + '. Please try again'
+           + (wait ? ' in ' + wait + ' seconds.' : ' shortly.')
+}
+
 function postChat() {
     const user_id = getUserId()
 
@@ -52,9 +58,141 @@ function postChat() {
                 alert('Unable to send chat message!')
             }
         }
+    ).fail(function (xhr) {
+        // The message stays in the box, so it can be sent again.
+        if (xhr.status === 429) {
+            alert(tooManyRequests(xhr, 'messages'))
+        } else {
+            alert('Unable to send chat message!')
+        }
+    })
+}
+
+function setExplorerDisplay(moves) {
+    $('#explorer').html('<b>Site Games</b><br>')
+    for (const move of moves) {
+        $('#explorer').append(move.san + ': ' + move.games + ' (+'
+                              + move.white_wins + ' =' + move.draws
+                              + ' -' + move.black_wins + ')<br>')
+    }
+}
+
+function getExplorer() {
+    $.get('/explorer',
+        {
+            fen: game.fen()
+        },
+        function (data, success) {
+            if (data.successful && success === 'success') {
+                setExplorerDisplay(data.moves)
+            }
+        }
     )
 }
 
+// Polling starts fast and slows down while nothing changes,
+// resetting whenever the game does.
+const POLL_MIN_MS = 2000
+const POLL_MAX_MS = 60000
+const POLL_BACKOFF = 1.5
+let poll_delay = POLL_MIN_MS
+let game_status = GAME_STATUS
+
+const RESULTS = {
+    checkmate: 'Checkmate!',
+    stalemate: 'Stalemate!',
+    draw: 'Draw!'
+}
+
+function showResult(state) {
+    // Endings on the board are shown by checkGame as the move is made.
+    if (['no_move', 'in_progress'].includes(state.status)
+            || game.game_over()) {
+        return
+    }
+
+    if (state.status === 'timeout') {
+        const winner = state.winner === PLAYER_WHITE_ID ? PLAYER_WHITE
+                                                        : PLAYER_BLACK
+        endGame('Game over. ' + winner + ' wins on time!')
+    } else {
+        endGame('Game over. ' + (RESULTS[state.status] || ''))
+    }
+}
+
+function applyState(state) {
+    const status_changed = state.status !== game_status
+    game_status = state.status
+
+    // Our own move may not have reached the server yet, but a timeout
+    // comes without one.
+    if (state.ply <= record.moves.length) {
+        if (status_changed) {
+            showResult(state)
+        }
+        return status_changed
+    }
+
+    const move = state.ply === record.moves.length + 1
+                 ? game.move(state.last_move) : null
+
+    if (move !== null) {
+        recordMove(record, move)
+    } else {
+        game.reset()
+        if (state.pgn) {
+            game.load_pgn(state.pgn)
+        }
+        record = recordFromHistory(game.history({ verbose: true }))
+    }
+
+    board.position(game.fen())
+    setCapturedDisplay()
+    checkGame()
+    if (status_changed) {
+        showResult(state)
+    }
+    getExplorer()
+
+    return true
+}
+
+function schedulePoll() {
+    // Hidden tabs check in rarely.
+    const delay = document.hidden ? POLL_MAX_MS : poll_delay
+    setTimeout(pollState, delay)
+}
+
+function pollState() {
+    $.ajax({
+        url: '/game/' + GAME_ID + '/state',
+        ifModified: true,
+        success: function (data, status) {
+            if (status !== 'notmodified' && applyState(data)) {
+                poll_delay = POLL_MIN_MS
+            } else {
+                poll_delay = Math.min(poll_delay * POLL_BACKOFF, POLL_MAX_MS)
+            }
+
+            if (status === 'notmodified' || data.deadline !== null) {
+                schedulePoll()
+            }
+        },
+        error: function () {
+            poll_delay = POLL_MAX_MS
+            schedulePoll()
+        }
+    })
+}
+
+function undoMove(message) {
+    alert(message)
+    game.undo()
+    unrecordMove(record)
+    setCapturedDisplay()
+    board.position(game.fen())
+}
+
 function postMove(move_san) {
     $.post('/move', {
             id: GAME_ID,
@@ -62,12 +200,21 @@ function postMove(move_san) {
         },
         function (data, status) {
             if (!data.successful || status !== 'success') {
-                alert('Unable to perform move.')
-                game.undo()
-                board.position(game.fen())
+                undoMove('Unable to perform move.')
             }
+            poll_delay = POLL_MIN_MS
+            getExplorer()
         }
-    )
+    ).fail(function (xhr) {
+        // Polling only applies states ahead of the board, so a move the
+        // server never took has to be taken back here.
+        if (xhr.status === 429) {
+            undoMove(tooManyRequests(xhr, 'moves'))
+        } else {
+            undoMove('Unable to perform move. Please try again.')
+        }
+        poll_delay = POLL_MIN_MS
+    })
 }
 
 function promptPromotion() {
@@ -96,42 +243,76 @@ function moveIsPromotion(from, to) {
     return game.get(from).type === 'p' && (to[1] === '1' || to[1] === '8')
 }
 
-function setCapturedDisplay() {
-    if (board.orientation() === 'white') {
-        first_captured = captured_white
-        first_color = 'w'
-        second_captured = captured_black
-        second_color = 'b'
-    } else {
-        first_captured = captured_black
-        first_color = 'b'
-        second_captured = captured_white
-        second_color = 'w'
-    }
-    $('#captured').html('')
-    for (const piece in first_captured) {
-        for (let i = 0; i < first_captured[piece]; i++) {
-            $('#captured').append('<img src="/static/img/chesspieces/wikipedia/' + first_color + piece + '.png" width="15%" height="15%" />')
+const PIECE_IMG = '/static/img/chesspieces/wikipedia/'
+
+// How many captured pieces of each kind, and how many moves, are on the
+// page, so only what changed needs to be touched.
+const rendered = {
+    captured: {
+        w: {'Q': 0, 'R': 0, 'B': 0, 'N': 0, 'P': 0},
+        b: {'Q': 0, 'R': 0, 'B': 0, 'N': 0, 'P': 0}
+    },
+    moves: 0
+}
+
+function setUpCapturedDisplay() {
+    const top = board.orientation()[0]
+    const bottom = top === 'w' ? 'b' : 'w'
+
+    $('#captured').html('<div id="captured_' + top + '"></div>'
+                        + '<br><div id="move_list"></div><br><br>'
+                        + '<div id="captured_' + bottom + '"></div>')
+
+    for (const color of ['w', 'b']) {
+        for (const piece of CAPTURABLE) {
+            $('#captured_' + color).append('<span id="captured_' + color
+                                           + piece + '"></span>')
         }
     }
-    $('#captured').append('<br>' + game.pgn({newline_char: '<br>', show_headers: false}) + '<br><br>')
-    for (const piece in second_captured) {
-        for (let i = 0; i < second_captured[piece]; i++) {
-            $('#captured').append('<img src="/static/img/chesspieces/wikipedia/' + second_color + piece + '.png" width="15%" height="15%" />')
+}
+
+function setCapturedPiecesDisplay(color) {
+    for (const piece of CAPTURABLE) {
+        const count = record.captured[color][piece]
+        const shown = rendered.captured[color][piece]
+
+        if (count === shown) {
+            continue
+        }
+
+        const $slot = $('#captured_' + color + piece)
+        for (let i = shown; i < count; i++) {
+            $slot.append('<img src="' + PIECE_IMG + color + piece
+                         + '.png" width="15%" height="15%" />')
         }
+        $slot.children().slice(count).remove()
+
+        rendered.captured[color][piece] = count
     }
 }
 
-function getCapturedPieces(color) {
-    const captured = {'Q': 0, 'R': 0, 'B': 0, 'N': 0, 'P': 0}
+function setMoveListDisplay() {
+    const $move_list = $('#move_list')
 
-    for (const move of game.history({ verbose: true })) {
-        if (move.hasOwnProperty('captured') && move.color !== color[0]) {
-            captured[move.captured.toUpperCase()]++
-        }
+    while (rendered.moves > record.moves.length) {
+        $move_list.children().last().remove()
+        rendered.moves--
+    }
+
+    while (rendered.moves < record.moves.length) {
+        const move = record.moves[rendered.moves]
+        const number = rendered.moves % 2 === 0
+                       ? (rendered.moves / 2 + 1) + '. ' : ''
+
+        $move_list.append($('<span>').text(number + move.san + ' '))
+        rendered.moves++
     }
+}
 
-    return captured
+function setCapturedDisplay() {
+    setCapturedPiecesDisplay('w')
+    setCapturedPiecesDisplay('b')
+    setMoveListDisplay()
 }
 
 function endGame(msg) {
@@ -150,8 +331,13 @@ function checkGame() {
     }
 }
 
+let highlighted = []
+
 function unHighlightSquares() {
-    $('#' + BOARD_NAME + ' .square-55d63').css('background', '')
+    for (const $square of highlighted) {
+        $square.css('background', '')
+    }
+    highlighted = []
 }
 
 function highlightSquare(square) {
@@ -163,6 +349,7 @@ function highlightSquare(square) {
     }
 
     $square.css('background', background)
+    highlighted.push($square)
 }
 
 function onPieceDrag(source, piece, position, orientation) {
@@ -193,10 +380,7 @@ function onPieceMove(source, target) {
         return 'snapback'
     }
 
-    // For now naively re-check for captured pieces
-    // even if move didn't result in capture.
-    captured_white = getCapturedPieces('white')
-    captured_black = getCapturedPieces('black')
+    recordMove(record, move)
     setCapturedDisplay()
 
     checkGame()
@@ -262,8 +446,10 @@ if (board.orientation() === 'white') {
     $('#player2').html('<b>' + PLAYER_BLACK + '</b>')
 }
 
-let captured_white = getCapturedPieces('white')
-let captured_black = getCapturedPieces('black')
+let record = recordFromHistory(game.history({ verbose: true }))
+setUpCapturedDisplay()
 setCapturedDisplay()
 
-getChat()
\ No newline at end of file
+getChat()
+getExplorer()
+schedulePoll()
\ No newline at end of file
@@ -0,0 +1,28 @@
+const SEARCH_DELAY_MS = 200
+
+let search_timer = null
+
+function setUserSuggestions(users) {
+    const $list = document.getElementById('usernames')
+    $list.innerHTML = ''
+    for (const user of users) {
+        const option = document.createElement('option')
+        option.value = user.username
+        option.label = user.username + ' (' + user.rating + ')'
+        $list.appendChild(option)
+    }
+}
+
+function searchUsers() {
+    const text = document.getElementById('username').value
+
+    fetch('/users/search?q=' + encodeURIComponent(text))
+        .then(response => response.json())
+        .then(data => setUserSuggestions(data.users))
+}
+
+// Wait for the user to stop typing before asking the server.
+document.getElementById('username').addEventListener('input', function () {
+    clearTimeout(search_timer)
+    search_timer = setTimeout(searchUsers, SEARCH_DELAY_MS)
+})
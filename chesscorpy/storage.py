@@ -0,0 +1,110 @@
+import itertools
+import sqlite3
+
+from . import database, writer
+
+
+SQLITE = 'sqlite'
+MEMORY = 'memory'
+
+_memory_ids = itertools.count(1)
+
+# Open in-memory storages, so they aren't freed while nothing else
+# refers to them.
+_open_memory = set()
+
+
+class SQLiteStorage:
+    """Keeps users, games, requests and chats in database files on disk.
+
+    Defaults to the database module's DEFAULT_FILES. Queries made in an
+    app's context use its storage's files, so apps with different
+    storages can run in one process.
+    """
+
+    def __init__(self, database_file=None, archive_file=None,
+                 leaderboard_file=None):
+        defaults = database.DEFAULT_FILES
+        self.database_file = database_file or defaults['DATABASE_FILE']
+        self.archive_file = archive_file or defaults['ARCHIVE_FILE']
+        self.leaderboard_file = (leaderboard_file
+                                 or defaults['LEADERBOARD_FILE'])
+
+    def files(self):
+        return self.database_file, self.archive_file, self.leaderboard_file
+
+    def open(self):
+        """Readies the storage for use.
+
+        The first storage opened is also used outside any app context.
+        """
+
+        if database.default_storage is None:
+            database.default_storage = self
+
+    def close(self):
+        """Stops the writer threads of the storage's databases."""
+
+        for db_file in self.files():
+            writer.stop(db_file)
+
+        if database.default_storage is self:
+            database.default_storage = None
+
+
+class MemoryStorage(SQLiteStorage):
+    """Keeps everything in memory, starting from a copy of a database file.
+
+    The same SQL runs against SQLite's in-memory database, so it behaves
+    exactly like the file storage without touching the disk. It is
+    shared by the threads of one process and lost when closed, so
+    anything run in another process, like game analysis, can't see it.
+    """
+
+    def __init__(self, source_file=None):
+        name = f'/chesscorpy-{next(_memory_ids)}'
+        super().__init__(f'file:{name}?vfs=memdb',
+                         f'file:{name}-archive?vfs=memdb',
+                         f'file:{name}-leaderboard?vfs=memdb')
+        self.source_file = (source_file
+                            or database.DEFAULT_FILES['DATABASE_FILE'])
+        self._connections = []
+
+    def open(self):
+        """Copies the source database into memory."""
+
+        if not self._connections:
+            # An in-memory database is freed with its last connection.
+            self._connections = [
+                sqlite3.connect(uri, uri=True, check_same_thread=False)
+                for uri in self.files()
+            ]
+
+            # Unlike the backup API, this copies a WAL database into
+            # one that works without WAL.
+            source = sqlite3.connect(self.source_file, uri=True)
+            source.execute('VACUUM INTO ?', [self.database_file])
+            source.close()
+            _open_memory.add(self)
+
+        super().open()
+
+    def close(self):
+        """Frees the in-memory databases."""
+
+        # Writers hold connections too, which would keep them alive.
+        super().close()
+
+        for connection in self._connections:
+            connection.close()
+
+        self._connections = []
+        _open_memory.discard(self)
+
+
+def create(kind, **kwargs):
+    """Returns a new storage of the given kind."""
+
+    storages = {SQLITE: SQLiteStorage, MEMORY: MemoryStorage}
+
+    return storages[kind](**kwargs)
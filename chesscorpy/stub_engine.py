@@ -0,0 +1,100 @@
+"""A tiny UCI engine for testing the analysis pipeline without Stockfish.
+
+It scores positions by material alone and picks the move that wins the
+most material right away. Run it with ``python path/to/stub_engine.py``;
+it depends only on python-chess.
+"""
+
+import sys
+
+import chess
+
+
+PIECE_VALUES = {
+    chess.PAWN: 100,
+    chess.KNIGHT: 300,
+    chess.BISHOP: 300,
+    chess.ROOK: 500,
+    chess.QUEEN: 900,
+    chess.KING: 0
+}
+
+
+def evaluate(board):
+    """Scores a position in centipawns for the side to move."""
+
+    if board.is_checkmate():
+        return -100000
+    if board.is_game_over():
+        return 0
+
+    score = 0
+    for piece in board.piece_map().values():
+        value = PIECE_VALUES[piece.piece_type]
+        score += value if piece.color == board.turn else -value
+
+    return score
+
+
+def best_move(board):
+    """Returns the move leaving the opponent with the worst score."""
+
+    best, best_score = None, None
+    for move in board.legal_moves:
+        board.push(move)
+        score = -evaluate(board)
+        board.pop()
+
+        if best_score is None or score > best_score:
+            best, best_score = move, score
+
+    return best, best_score
+
+
+def _score(score):
+    if abs(score) == 100000:
+        return f'mate {1 if score > 0 else -1}'
+    return f'cp {score}'
+
+
+def main():
+    board = chess.Board()
+
+    for line in sys.stdin:
+        command, _, args = line.strip().partition(' ')
+
+        if command == 'uci':
+            print('id name ChessCorPy Stub')
+            print('id author ChessCorPy')
+            print('uciok')
+        elif command == 'isready':
+            print('readyok')
+        elif command == 'ucinewgame':
+            board = chess.Board()
+        elif command == 'position':
+            tokens = args.split()
+            if tokens[0] == 'startpos':
+                board = chess.Board()
+                rest = tokens[1:]
+            else:
+                board = chess.Board(' '.join(tokens[1:7]))
+                rest = tokens[7:]
+            for uci in rest[1:] if rest[:1] == ['moves'] else []:
+                board.push_uci(uci)
+        elif command == 'go':
+            move, score = best_move(board)
+            if move is None:
+                score = 'mate 0' if board.is_checkmate() else 'cp 0'
+                print(f'info depth 0 score {score}')
+                print('bestmove 0000')
+            else:
+                print(f'info depth 1 score {_score(score)} pv {move.uci()}')
+                print(f'bestmove {move.uci()}')
+        elif command == 'quit':
+            break
+
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,313 @@
+import math
+
+from . import database, games, user, archive
+
+
+ROUND_ROBIN = 'round_robin'
+SWISS = 'swiss'
+FORMATS = (ROUND_ROBIN, SWISS)
+
+NAME_MAX_LEN = 50
+MAX_SWISS_ROUNDS = 20
+LIST_SIZE = 50
+
+
+class Status:
+    OPEN = 'open'
+    RUNNING = 'running'
+    FINISHED = 'finished'
+
+
+def round_robin_pairings(player_ids, round_number):
+    """Pairs players for a round of a round robin using the circle method.
+
+    Player ids must be given in the same order every round. Returns
+    (white id, black id) tuples, with None as the opponent of a player
+    sitting out.
+    """
+
+    players = list(player_ids)
+    if len(players) % 2:
+        players.append(None)
+
+    # The first player stays put while the others rotate one place a round.
+    shift = (round_number - 1) % (len(players) - 1)
+    others = players[1:]
+    others = others[len(others) - shift:] + others[:len(others) - shift]
+    players = players[:1] + others
+
+    pairings = []
+    for board in range(len(players) // 2):
+        white, black = players[board], players[-board - 1]
+
+        # Alternate colors between rounds and down the boards.
+        if (round_number + board) % 2 == 0:
+            white, black = black, white
+
+        if white is None:
+            white, black = black, white
+
+        pairings.append((white, black))
+
+    return pairings
+
+
+def swiss_pairings(ranked_ids, opponents, whites, had_bye):
+    """Pairs players for a Swiss round.
+
+    ranked_ids is every player, best first. opponents maps a player to
+    the set of players they have already played, whites to how many
+    times they have had white, and had_bye is the set of players who
+    have already sat out. Returns (white id, black id) tuples, with None
+    as the opponent of the player sitting out.
+    """
+
+    unpaired = list(ranked_ids)
+    pairings = []
+
+    # The lowest ranked player who hasn't sat out yet gets the bye.
+    if len(unpaired) % 2:
+        bye = next((player for player in reversed(unpaired)
+                    if player not in had_bye), unpaired[-1])
+        unpaired.remove(bye)
+        pairings.append((bye, None))
+
+    while unpaired:
+        player = unpaired.pop(0)
+        opponent = next((other for other in unpaired
+                         if other not in opponents.get(player, ())),
+                        unpaired[0])
+        unpaired.remove(opponent)
+
+        if whites.get(player, 0) <= whites.get(opponent, 0):
+            pairings.append((player, opponent))
+        else:
+            pairings.append((opponent, player))
+
+    return pairings
+
+
+def create(name, format_, creator_id, turnlimit, rounds=None):
+    """Creates a tournament open for players to join and returns its id."""
+
+    query = ('INSERT INTO tournaments (name, format, creator_id, '
+             'turn_day_limit, rounds) VALUES(?, ?, ?, ?, ?)')
+    query_args = [name, format_, creator_id, turnlimit, rounds]
+
+    tournament_id = database.sql_exec(database.DATABASE_FILE, query,
+                                      query_args, False, True)
+    join(tournament_id, creator_id)
+
+    return tournament_id
+
+
+def join(tournament_id, user_id):
+    """Adds a player to a tournament that hasn't started yet."""
+
+    query = ('INSERT OR IGNORE INTO tournament_players (tournament_id, '
+             'user_id) SELECT id, ? FROM tournaments WHERE id = ? AND '
+             'status = ?')
+    query_args = [user_id, tournament_id, Status.OPEN]
+
+    database.sql_exec(database.DATABASE_FILE, query, query_args)
+
+
+def get(tournament_id):
+    """Retrieves a tournament."""
+
+    return database.sql_exec(database.DATABASE_FILE,
+                             'SELECT * FROM tournaments WHERE id = ?',
+                             [tournament_id], False)
+
+
+def get_all():
+    """Retrieves the most recent tournaments with their player counts."""
+
+    query = ('SELECT tournaments.*, COUNT(tournament_players.user_id) AS '
+             'players FROM tournaments LEFT JOIN tournament_players ON '
+             'tournament_players.tournament_id = tournaments.id GROUP BY '
+             'tournaments.id ORDER BY tournaments.id DESC LIMIT ?')
+
+    return database.sql_exec(database.DATABASE_FILE, query, [LIST_SIZE])
+
+
+def _standings_query():
+    """Ranks the players of a tournament by points, wins, then rating.
+
+    A win or a bye is worth a point and a draw half a point.
+    """
+
+    finished = (f'{{0}}.status != "{games.Status.NO_MOVE}" AND '
+                f'{{0}}.status != "{games.Status.IN_PROGRESS}"')
+    winner = 'COALESCE(main_game.winner, archived_game.winner)'
+    query = ('SELECT players.user_id, users.username, users.rating, '
+             'COALESCE(SUM(CASE WHEN rounds.round IS NOT NULL AND '
+             'rounds.game_id IS NULL THEN 1.0 WHEN '
+             f'{winner} = players.user_id THEN 1.0 WHEN {winner} = '
+             f'{user.DRAW_USER_ID} THEN 0.5 ELSE 0 END), 0) AS points, '
+             f'COUNT(CASE WHEN {winner} = players.user_id THEN 1 END) AS '
+             f'wins, COUNT({winner}) AS played FROM tournament_players AS '
+             'players JOIN users ON users.id = players.user_id LEFT JOIN '
+             'tournament_games AS rounds ON rounds.tournament_id = '
+             'players.tournament_id AND (rounds.white_id = players.user_id '
+             'OR rounds.black_id = players.user_id) LEFT JOIN main.games AS '
+             'main_game ON main_game.id = rounds.game_id AND '
+             f'{finished.format("main_game")} LEFT JOIN '
+             f'{archive.SCHEMA}.games AS archived_game ON archived_game.id = '
+             'rounds.game_id WHERE players.tournament_id = ? GROUP BY '
+             'players.user_id ORDER BY points DESC, wins DESC, '
+             'users.rating DESC, players.user_id')
+
+    return query
+
+
+def get_standings(tournament_id):
+    """Retrieves the standings of a tournament, best first."""
+
+    return database.sql_exec(database.DATABASE_FILE, _standings_query(),
+                             [tournament_id], attach=archive.attach())
+
+
+def get_rounds(tournament_id):
+    """Retrieves every pairing of a tournament grouped by round."""
+
+    query = ('SELECT rounds.round, rounds.game_id, white.username AS '
+             'white_name, black.username AS black_name FROM tournament_games '
+             'AS rounds JOIN users AS white ON white.id = rounds.white_id '
+             'LEFT JOIN users AS black ON black.id = rounds.black_id WHERE '
+             'rounds.tournament_id = ? ORDER BY rounds.round, '
+             'rounds.game_id IS NULL, rounds.game_id')
+
+    rounds = {}
+    for row in database.sql_exec(database.DATABASE_FILE, query,
+                                 [tournament_id]):
+        rounds.setdefault(row['round'], []).append(row)
+
+    return rounds
+
+
+def _pair_next_round(db, tournament, round_number):
+    ranked_ids = [row['user_id'] for row in
+                  db.execute(_standings_query(), [tournament['id']])]
+
+    if tournament['format'] == ROUND_ROBIN:
+        return round_robin_pairings(sorted(ranked_ids), round_number)
+
+    opponents, whites, had_bye = {}, {}, set()
+    for row in db.execute('SELECT white_id, black_id FROM tournament_games '
+                          'WHERE tournament_id = ?', [tournament['id']]):
+        if row['black_id'] is None:
+            had_bye.add(row['white_id'])
+            continue
+
+        opponents.setdefault(row['white_id'], set()).add(row['black_id'])
+        opponents.setdefault(row['black_id'], set()).add(row['white_id'])
+        whites[row['white_id']] = whites.get(row['white_id'], 0) + 1
+
+    return swiss_pairings(ranked_ids, opponents, whites, had_bye)
+
+
+def advance(tournament_id):
+    """Starts the next round of a tournament once every game is finished.
+
+    The round's games are created in the same transaction that checks
+    the previous round, so concurrent callers can't pair a round twice.
+    Returns whether the tournament moved on.
+    """
+
+    with database.write_transaction(database.DATABASE_FILE,
+                                    archive.attach()) as db:
+        tournament = db.execute('SELECT * FROM tournaments WHERE id = ?',
+                                [tournament_id]).fetchone()
+
+        if not tournament or tournament['status'] != Status.RUNNING:
+            return False
+
+        # Finished games may have been archived, but unfinished ones can't.
+        unfinished = db.execute(
+            'SELECT COUNT(*) FROM tournament_games AS rounds JOIN main.games '
+            'ON games.id = rounds.game_id WHERE rounds.tournament_id = ? AND '
+            f'rounds.round = ? AND (games.status = "{games.Status.NO_MOVE}" '
+            f'OR games.status = "{games.Status.IN_PROGRESS}")',
+            [tournament_id, tournament['current_round']]).fetchone()[0]
+
+        if unfinished:
+            return False
+
+        if tournament['current_round'] >= tournament['rounds']:
+            db.execute('UPDATE tournaments SET status = ? WHERE id = ?',
+                       [Status.FINISHED, tournament_id])
+            return True
+
+        round_number = tournament['current_round'] + 1
+        pairings = _pair_next_round(db, tournament, round_number)
+        playing = [pairing for pairing in pairings if pairing[1] is not None]
+
+        game_ids = iter(games.create_games(
+            db, playing, tournament['turn_day_limit'], 1))
+
+        db.executemany(
+            'INSERT INTO tournament_games (tournament_id, round, white_id, '
+            'black_id, game_id) VALUES(?, ?, ?, ?, ?)',
+            [[tournament_id, round_number, white_id, black_id,
+              next(game_ids) if black_id is not None else None]
+             for white_id, black_id in pairings])
+        db.execute('UPDATE tournaments SET current_round = ? WHERE id = ?',
+                   [round_number, tournament_id])
+
+    return True
+
+
+def start(tournament_id, user_id):
+    """Closes entries to a tournament and pairs its first round.
+
+    Only the tournament's creator can start it, once it has at least
+    two players. Returns whether it was started.
+    """
+
+    players = database.sql_exec(database.DATABASE_FILE,
+                                'SELECT COUNT(*) AS count FROM '
+                                'tournament_players WHERE tournament_id = ?',
+                                [tournament_id], False)['count']
+    tournament = get(tournament_id)
+
+    if (not tournament or tournament['creator_id'] != user_id
+            or tournament['status'] != Status.OPEN or players < 2):
+        return False
+
+    if tournament['format'] == ROUND_ROBIN:
+        rounds = players - 1 + players % 2
+    else:
+        rounds = tournament['rounds'] or math.ceil(math.log2(players))
+
+    database.sql_exec(database.DATABASE_FILE,
+                      'UPDATE tournaments SET status = ?, rounds = ? WHERE '
+                      'id = ? AND status = ?',
+                      [Status.RUNNING, rounds, tournament_id, Status.OPEN])
+
+    return advance(tournament_id)
+
+
+def game_finished(game_id):
+    """Moves a game's tournament on if that was the last game of its round."""
+
+    row = database.sql_exec(database.DATABASE_FILE,
+                            'SELECT tournament_id FROM tournament_games '
+                            'WHERE game_id = ?', [game_id], False)
+
+    if row:
+        advance(row['tournament_id'])
+
+
+def advance_all():
+    """Moves on every running tournament whose round is over.
+
+    Catches rounds whose last game finished without advancing, for
+    example if the process died in between.
+    """
+
+    running = database.sql_exec(database.DATABASE_FILE,
+                                'SELECT id FROM tournaments WHERE status = ?',
+                                [Status.RUNNING])
+
+    return {'advanced': sum(advance(row['id']) for row in running)}
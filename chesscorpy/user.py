@@ -1,7 +1,7 @@
 from flask import session
 from werkzeug.security import generate_password_hash
 
-from . import database
+from . import database, digests
 
 
 USERNAME_MAX_LEN = 15
@@ -13,6 +13,9 @@ MAX_RATING = 3000
 PUBLIC_USER_ID = 0
 DRAW_USER_ID = 0
 USER_SESSION = 'user_id'
+DIGEST_MODES = (digests.IMMEDIATE, digests.HOURLY, digests.DAILY)
+SEARCH_MAX_RESULTS = 10
+SEARCH_MIN_TRIGRAM_LEN = 3
 
 
 def get_data_by_id(userid, fields='*'):
@@ -24,13 +27,31 @@ def get_data_by_id(userid, fields='*'):
     return database.sql_exec(database.DATABASE_FILE, query, query_args, False)
 
 
+def get_data_by_ids(userids, fields=('*',)):
+    """Retrieves the data of several users at once, keyed by id.
+
+    fields must include id.
+    """
+
+    userids = list(set(userids))
+    if not userids:
+        return {}
+
+    query = (f'SELECT {",".join(fields)} FROM users WHERE id IN '
+             f'({",".join("?" * len(userids))})')
+
+    return {row['id']: row for row in
+            database.sql_exec(database.DATABASE_FILE, query, userids)}
+
+
 def get_data_by_name(username, fields=('*',), case_sensitive=False):
     """Retrieves the data of a user with the given name."""
 
+    # COLLATE NOCASE lets the lookup use the username index.
     if not case_sensitive:
         query = (f'SELECT {",".join(fields)} FROM users WHERE '
-                 'LOWER(username) = ? LIMIT 1')
-        query_args = [username.lower()]
+                 'username = ? COLLATE NOCASE LIMIT 1')
+        query_args = [username]
     else:
         query = (f'SELECT {",".join(fields)} FROM users WHERE '
                  'username = ? LIMIT 1')
@@ -53,14 +74,67 @@ def create(username, password, email, rating, notifications):
     query_args = [username, generate_password_hash(password), email, rating,
                   notifications]
 
-    database.sql_exec(database.DATABASE_FILE, query, query_args, False)
+    # Keep the search index in the same transaction as the new user.
+    search_query = ('INSERT INTO users_search (rowid, username) '
+                    'VALUES(last_insert_rowid(), ?)')
+
+    database.sql_exec_batch(database.DATABASE_FILE, [
+        (query, [query_args]),
+        (search_query, [[username]])
+    ])
+
+
+def _escape_like(text):
+    return (text.replace('\\', '\\\\').replace('%', '\\%')
+            .replace('_', '\\_'))
+
+
+def search(text, limit=SEARCH_MAX_RESULTS):
+    """Searches for users whose name contains the given text.
+
+    Names starting with the text are ranked first, then closer matches.
+    """
+
+    text = text.strip()
+    limit = max(1, min(limit, SEARCH_MAX_RESULTS))
+
+    if not text:
+        return []
+
+    prefix = _escape_like(text) + '%'
+
+    # The trigram index can't match fewer than three characters,
+    # so short input falls back to a prefix scan of the username index.
+    if len(text) < SEARCH_MIN_TRIGRAM_LEN:
+        query = ('SELECT id, username, rating FROM users WHERE username '
+                 "LIKE ? ESCAPE '\\' ORDER BY username COLLATE NOCASE "
+                 'LIMIT ?')
+        query_args = [prefix, limit]
+    else:
+        query = ('SELECT users.id, users.username, users.rating FROM '
+                 'users_search JOIN users ON users.id = users_search.rowid '
+                 'WHERE users_search MATCH ? ORDER BY '
+                 "users.username LIKE ? ESCAPE '\\' DESC, rank, "
+                 'length(users.username) LIMIT ?')
+        query_args = ['"' + text.replace('"', '""') + '"', prefix, limit]
+
+    return database.rows_to_list(
+        database.sql_exec(database.DATABASE_FILE, query, query_args))
+
+
+def rebuild_search():
+    """Rebuilds the username search index from the users table."""
+
+    database.sql_exec(database.DATABASE_FILE,
+                      "INSERT INTO users_search (users_search) "
+                      "VALUES('rebuild')")
 
 
-def update_settings(user_id, notify):
+def update_settings(user_id, notify, digest):
     """Updates a user's settings."""
 
-    query = 'UPDATE users SET notifications = ? WHERE id = ?'
-    query_args = [notify, user_id]
+    query = 'UPDATE users SET notifications = ?, digest = ? WHERE id = ?'
+    query_args = [notify, digest, user_id]
 
     database.sql_exec(database.DATABASE_FILE, query, query_args, False)
 
@@ -0,0 +1,36 @@
+import signal
+import time
+
+from . import jobs
+from .app import create_app
+
+
+def main():
+    """Runs the scheduled jobs in a dedicated process.
+
+    Start one or more with ``python -m chesscorpy.worker``; only the
+    one holding the leader lease runs jobs at a time.
+    """
+
+    app = create_app({'RUN_JOBS': False})
+    runner = jobs.Runner(app.app_context)
+    running = True
+
+    def stop(signum, frame):
+        nonlocal running
+        running = False
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    app.logger.info('Job worker %s started.', runner.holder)
+
+    while running:
+        runner.tick()
+        time.sleep(jobs.TICK_SECONDS)
+
+    runner.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+
+from . import database
+
+
+# Most writes queued at once are committed together, up to this many.
+MAX_GROUP = 200
+
+# Queued to tell a writer to finish.
+_STOP = None
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+class Writer:
+    """A thread that owns all writes to one database file.
+
+    Writes queued while a transaction is committing are run together in
+    the next one, so many of them share a single commit and fsync, and
+    writers in this process never wait on each other's locks.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._failed = 0
+        self._groups = 0
+        self._largest_group = 0
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name='chesscorpy-writer')
+        self._thread.start()
+
+    def submit(self, statements):
+        """Queues (query, list of query args) statements to run together.
+
+        Returns a future for the id of the last row inserted, resolved
+        once the transaction they're part of has committed.
+        """
+
+        future = Future()
+        self._queue.put((statements, future))
+
+        return future
+
+    def stop(self):
+        """Commits the writes already queued, then ends the thread."""
+
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _take_group(self):
+        group = [self._queue.get()]
+
+        while len(group) < MAX_GROUP and group[-1] is not _STOP:
+            try:
+                group.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return group
+
+    def _run_group(self, db, group):
+        results = []
+        db.execute('BEGIN IMMEDIATE')
+
+        # Each write gets a savepoint so one failing doesn't undo the rest.
+        for statements, future in group:
+            db.execute('SAVEPOINT write')
+            try:
+                for query, query_args_list in statements:
+                    db.executemany(query, query_args_list)
+            except Exception as exception:
+                db.execute('ROLLBACK TO write')
+                db.execute('RELEASE write')
+                results.append((future, None, exception))
+                continue
+
+            db.execute('RELEASE write')
+            results.append((future, db.execute(
+                'SELECT last_insert_rowid()').fetchone()[0], None))
+
+        db.execute('COMMIT')
+
+        return results
+
+    def _run(self):
+        db = sqlite3.connect(self.db, check_same_thread=False,
+                             isolation_level=None, uri=True)
+        database.apply_profile(db)
+
+        while True:
+            group = self._take_group()
+            stopping = group[-1] is _STOP
+            if stopping:
+                group.pop()
+                if not group:
+                    break
+
+            try:
+                results = self._run_group(db, group)
+            except Exception as exception:
+                if db.in_transaction:
+                    db.execute('ROLLBACK')
+                results = [(future, None, exception) for _, future in group]
+
+            with self._lock:
+                self._groups += 1
+                self._largest_group = max(self._largest_group, len(group))
+                for _, _, exception in results:
+                    if exception is None:
+                        self._writes += 1
+                    else:
+                        self._failed += 1
+
+            for future, last_row_id, exception in results:
+                if exception is None:
+                    future.set_result(last_row_id)
+                else:
+                    future.set_exception(exception)
+
+            if stopping:
+                break
+
+        db.close()
+
+    def stats(self):
+        """Returns how many writes have been committed and in how many
+        transactions.
+        """
+
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'writes': self._writes,
+                'failed': self._failed,
+                'transactions': self._groups,
+                'largest_group': self._largest_group
+            }
+
+
+def get(db):
+    """Returns the writer for a database file, starting it on first use."""
+
+    with _writers_lock:
+        if db not in _writers:
+            _writers[db] = Writer(db)
+
+        return _writers[db]
+
+
+def stop(db):
+    """Stops the writer for a database file, if one was started."""
+
+    with _writers_lock:
+        writer = _writers.pop(db, None)
+
+    if writer:
+        writer.stop()
+
+
+def stats():
+    """Returns the stats of every writer started so far."""
+
+    with _writers_lock:
+        writers = list(_writers.values())
+
+    return {writer.db: writer.stats() for writer in writers}
@@ -0,0 +1,47 @@
+import shutil
+
+import pytest
+
+from chesscorpy import create_app, database, storage
+
+
+@pytest.fixture
+def memory_app():
+    """An app on a copy of chesscorpy.db in memory, in its app context."""
+
+    saved = database.GROUP_COMMIT, database.PROFILE
+    app = create_app({'STORAGE': storage.MEMORY, 'RUN_JOBS': False})
+
+    try:
+        with app.app_context():
+            yield app
+    finally:
+        app.extensions['storage'].close()
+        database.GROUP_COMMIT, database.PROFILE = saved
+
+
+@pytest.fixture
+def disk_app(tmp_path, monkeypatch):
+    """An app on a copy of chesscorpy.db in tmp_path, in its app context.
+
+    For work done in other processes, which can't see a memory storage.
+    """
+
+    for name in database.DEFAULT_FILES:
+        monkeypatch.setitem(database.DEFAULT_FILES, name,
+                            str(tmp_path / f'{name.lower()}.db'))
+    shutil.copy('chesscorpy.db', database.DEFAULT_FILES['DATABASE_FILE'])
+
+    saved = database.GROUP_COMMIT, database.PROFILE
+    app = create_app({'RUN_JOBS': False})
+
+    try:
+        with app.app_context():
+            yield app
+    finally:
+        app.extensions['storage'].close()
+        for db_file in app.extensions['storage'].files():
+            held = database._held_open.pop(db_file, None)
+            if held:
+                held.close()
+        database.GROUP_COMMIT, database.PROFILE = saved
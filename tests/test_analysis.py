@@ -0,0 +1,68 @@
+from chesscorpy.analysis import win_percent, move_accuracy, classify
+
+
+def test_win_percent():
+    assert win_percent(0) == 50
+    assert win_percent(300) > 50
+    assert win_percent(-300) < 50
+    assert round(win_percent(300) + win_percent(-300)) == 100
+
+
+def test_move_accuracy():
+    assert round(move_accuracy(60, 60)) == 100
+    assert move_accuracy(60, 40) < move_accuracy(60, 55)
+    assert move_accuracy(100, 0) == 0
+
+
+def test_classify():
+    assert classify(60, 60) is None
+    assert classify(60, 45) == 'inaccuracy'
+    assert classify(60, 35) == 'mistake'
+    assert classify(60, 20) == 'blunder'
+
+
+def test_history_shows_missing_accuracy_as_dash(memory_app):
+    from flask import render_template
+
+    game = {'id': 1, 'player_white_id': 1, 'player_black_id': 2,
+            'player_white_name': 'alice', 'player_black_name': 'bob',
+            'status': 'timeout', 'result': 'alice wins', 'move_start_time': 0,
+            'white_accuracy': 91.4, 'black_accuracy': None,
+            'white_blunders': 0, 'black_blunders': 0}
+
+    with memory_app.test_request_context():
+        page = render_template('history.html', games=[game], username='bob')
+
+    assert ' '.join(page.split()).count('<td>91% / -</td>') == 1
+
+
+def test_run_pending_analyses_queued_games(disk_app):
+    from chesscorpy import analysis, database, games
+
+    def finish_game(pgn):
+        game_id = database.sql_exec(
+            database.DATABASE_FILE, 'INSERT INTO games (player_white_id, '
+            'player_black_id, to_move, status, winner, pgn) VALUES(1, 2, 2, '
+            '?, 1, ?)', [games.Status.CHECKMATE, pgn], get_last_row=True)
+        analysis.enqueue(game_id)
+        return game_id
+
+    game_id = finish_game('1. e4 e5 2. Qh5 Nc6 3. Bc4 Nf6 4. Qxf7# 1-0')
+    assert analysis.run_pending(analysis.STUB_ENGINE, 1, 0.01) == 1
+
+    # The worker processes are kept for the next run.
+    pool = analysis._pool
+    finish_game('1. f3 e5 2. g4 Qh4# 0-1')
+    assert analysis.run_pending(analysis.STUB_ENGINE, 1, 0.01) == 1
+    assert analysis._pool is pool
+
+    result = database.sql_exec(database.DATABASE_FILE,
+                               'SELECT * FROM game_analysis WHERE '
+                               'game_id = ?', [game_id], False)
+    assert result['state'] == analysis.State.DONE
+    assert 0 <= result['white_accuracy'] <= 100
+    assert result['black_accuracy'] < result['white_accuracy']
+    # 3...Nf6 allows mate in one.
+    assert (result['white_blunders'], result['black_blunders']) == (0, 1)
+    assert [move['move'] for move in analysis.get_moves(game_id)] == [
+        'e4', 'e5', 'Qh5', 'Nc6', 'Bc4', 'Nf6', 'Qxf7#']
@@ -0,0 +1,67 @@
+import os
+import shutil
+import time
+
+from chesscorpy import (archive, create_app, database, games, helpers, user,
+                        writer)
+
+
+def test_create_app_leaves_archive_until_first_use(tmp_path, monkeypatch):
+    db_file = str(tmp_path / 'chesscorpy.db')
+    archive_file = str(tmp_path / 'archive.db')
+    shutil.copy('chesscorpy.db', db_file)
+    monkeypatch.setitem(database.DEFAULT_FILES, 'DATABASE_FILE', db_file)
+    monkeypatch.setitem(database.DEFAULT_FILES, 'ARCHIVE_FILE', archive_file)
+    monkeypatch.setattr(database, 'GROUP_COMMIT', database.GROUP_COMMIT)
+    monkeypatch.setattr(database, 'PROFILE', database.PROFILE)
+
+    app = create_app({'RUN_JOBS': False, 'GROUP_COMMIT': True})
+
+    assert not os.path.exists(archive_file)
+    assert archive_file not in writer.stats()
+
+    app.extensions['storage'].close()
+    database._held_open.pop(db_file).close()
+
+
+def _finish_game(white, black, age_days):
+    return database.sql_exec(
+        database.DATABASE_FILE, 'INSERT INTO games (player_white_id, '
+        'player_black_id, to_move, move_start_time, status, winner, pgn) '
+        'VALUES(?, ?, ?, ?, ?, ?, ?)',
+        [white, black, white,
+         int(time.time()) - age_days * helpers.DAY_SECONDS,
+         games.Status.CHECKMATE, white, '1. f3 e5 2. g4 Qh4# 0-1'],
+        get_last_row=True)
+
+
+def test_archive_games_moves_old_games_and_history_reads_both(memory_app):
+    user.create('alice', 'pw', 'a@example.com', 1200, 0)
+    user.create('bob', 'pw', 'b@example.com', 1200, 0)
+    alice = user.get_data_by_name('alice', ['id'])['id']
+    bob = user.get_data_by_name('bob', ['id'])['id']
+
+    old = _finish_game(alice, bob, 40)
+    left_behind = _finish_game(bob, alice, 40)
+    recent = _finish_game(alice, bob, 1)
+
+    # As if a crash came between copying a game and deleting it.
+    database.sql_exec_batch(archive.attach()[0][0], [
+        ('INSERT INTO games SELECT * FROM live.games WHERE id = ?',
+         [[left_behind]])
+    ], [(database.DATABASE_FILE, 'live')])
+
+    assert archive.archive_games(30) == {'archived': 2}
+
+    def ids(db_file):
+        return [row['id'] for row in database.sql_exec(
+            db_file, 'SELECT id FROM games ORDER BY id')]
+
+    assert set(ids(archive.attach()[0][0])) == {old, left_behind}
+    assert recent in ids(database.DATABASE_FILE)
+    assert old not in ids(database.DATABASE_FILE)
+    assert left_behind not in ids(database.DATABASE_FILE)
+
+    history = list(games.get_game_history_if_authed(alice, alice))
+    assert [game['id'] for game in history] == [old, left_behind, recent]
+    assert games.get_game_data_if_authed(old, bob)['winner'] == alice
@@ -0,0 +1,83 @@
+import asyncio
+import json
+import time
+
+from chesscorpy import asgi, games, user
+
+
+def _get(path, query=b'', headers=()):
+    """Runs a GET request through the ASGI app and returns what it sent."""
+
+    scope = {'type': 'http', 'method': 'GET', 'path': path,
+             'query_string': query, 'headers': list(headers),
+             'scheme': 'http', 'http_version': '1.1', 'root_path': '',
+             'server': ('localhost', 80), 'client': ('127.0.0.1', 1234)}
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        sent.append(message)
+
+    async def call():
+        await asgi.application(scope, receive, send)
+
+    return call, sent
+
+
+def _status(sent):
+    return sent[0]['status']
+
+
+def _headers(sent):
+    return dict(sent[0]['headers'])
+
+
+def test_flask_routes_run_at_once(memory_app, monkeypatch):
+    monkeypatch.setattr(asgi, '_flask_app', memory_app)
+    memory_app.add_url_rule('/sleep', 'sleep',
+                            lambda: time.sleep(0.3) or 'slept')
+    requests = [_get('/sleep') for _ in range(4)]
+
+    async def run():
+        await asyncio.gather(*(call() for call, _ in requests))
+
+    started = time.perf_counter()
+    asyncio.run(run())
+
+    assert time.perf_counter() - started < 0.9
+    assert all(_status(sent) == 200 for _, sent in requests)
+
+
+def test_game_state_route_is_async_and_honours_etags(memory_app,
+                                                     monkeypatch):
+    monkeypatch.setattr(asgi, '_flask_app', memory_app)
+    user.create('alice', 'pw', 'a@example.com', 1200, 0)
+    user.create('bob', 'pw', 'b@example.com', 1200, 0)
+    alice = user.get_data_by_name('alice', ['id'])['id']
+    bob = user.get_data_by_name('bob', ['id'])['id']
+    game_id = games.create_game(alice, bob, 1, 1)
+
+    call, sent = _get(f'/game/{game_id}/state')
+    asyncio.run(call())
+    assert _status(sent) == 302
+
+    monkeypatch.setattr(asgi, '_session_user_id', lambda scope: bob)
+    # Falling back to Flask would fail from here on.
+    monkeypatch.setattr(asgi, '_PooledWsgiInstance', None)
+
+    call, sent = _get(f'/game/{game_id}/state')
+    asyncio.run(call())
+    assert _status(sent) == 200
+    assert json.loads(sent[1]['body'])['to_move'] == alice
+    etag = _headers(sent)[b'etag']
+
+    call, sent = _get(f'/game/{game_id}/state',
+                      headers=[(b'if-none-match', etag)])
+    asyncio.run(call())
+    assert _status(sent) == 304
+
+    call, sent = _get('/explorer', b'fen=nonsense')
+    asyncio.run(call())
+    assert json.loads(sent[1]['body']) == {'successful': False}
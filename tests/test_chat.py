@@ -0,0 +1,99 @@
+import time
+import zlib
+
+from chesscorpy import chat, counters, database, games, helpers, user
+
+
+def _players():
+    user.create('alice', 'pw', 'a@example.com', 1200, 0)
+    user.create('bob', 'pw', 'b@example.com', 1200, 0)
+    return (user.get_data_by_name('alice', ['id'])['id'],
+            user.get_data_by_name('bob', ['id'])['id'])
+
+
+def _unread(user_id, game_id):
+    row = database.sql_exec(database.DATABASE_FILE,
+                            'SELECT count FROM chat_unread WHERE user_id = ? '
+                            'AND game_id = ?', [user_id, game_id], False)
+    return row['count'] if row else 0
+
+
+def test_unread_chats_are_counted_and_marked_read(memory_app):
+    alice, bob = _players()
+    game_id = games.create_game(alice, bob, 1, 1)
+
+    chat.new_chat(game_id, alice, 'hi')
+    chat.new_chat(game_id, alice, 'good luck')
+
+    assert _unread(bob, game_id) == 2
+    assert counters.get(bob)['unread_chats'] == 2
+    assert _unread(alice, game_id) == 0
+
+    chat.mark_read(game_id, bob)
+
+    assert _unread(bob, game_id) == 0
+    assert counters.get(bob)['unread_chats'] == 0
+
+
+def test_maintain_compacts_finished_and_capped_chats(memory_app):
+    alice, bob = _players()
+    finished = games.create_game(alice, bob, 1, 1)
+    active = games.create_game(alice, bob, 1, 1)
+    database.sql_exec(database.DATABASE_FILE,
+                      'UPDATE games SET status = ?, move_start_time = ? '
+                      'WHERE id = ?',
+                      [games.Status.CHECKMATE,
+                       int(time.time()) - 10 * helpers.DAY_SECONDS, finished])
+
+    for message in ('one', 'two', 'three'):
+        chat.new_chat(finished, alice, message)
+    for message in ('a', 'b', 'c', 'd', 'e'):
+        chat.new_chat(active, alice, message)
+    assert counters.get(bob)['unread_chats'] == 8
+
+    report = chat.maintain(7, None, 2)
+
+    assert report['compacted_messages'] == 3
+    assert report['capped_messages'] == 3
+    assert report['live_messages_after'] == report[
+        'live_messages_before'] - 6
+
+    # Messages read back the same from the archive.
+    assert [message['contents'] for message in chat.get_chats(finished)] == [
+        'one', 'two', 'three']
+    assert [message['contents'] for message in chat.get_chats(active, 2)] == [
+        'd', 'e']
+    assert [message['contents'] for message in chat.get_chats(active)] == [
+        'a', 'b', 'c', 'd', 'e']
+
+    # Only what's left live can still be unread.
+    assert _unread(bob, finished) == 0
+    assert _unread(bob, active) == 2
+    assert counters.get(bob)['unread_chats'] == 2
+
+
+def test_archived_chats_are_only_decompressed_when_changed(memory_app,
+                                                          monkeypatch):
+    alice, bob = _players()
+    game_id = games.create_game(alice, bob, 1, 1)
+    for message in ('a', 'b', 'c'):
+        chat.new_chat(game_id, alice, message)
+    chat.maintain(7, None, 1)
+
+    decompressed = []
+    decompress = zlib.decompress
+    monkeypatch.setattr(zlib, 'decompress',
+                        lambda data: decompressed.append(1)
+                        or decompress(data))
+
+    for _ in range(3):
+        assert len(chat.get_chats(game_id)) == 3
+    assert len(decompressed) == 1
+
+    chat.new_chat(game_id, alice, 'd')
+    chat.maintain(7, None, 1)
+
+    # Compacting reused the cached messages; the new blob is read once.
+    assert [message['contents'] for message in chat.get_chats(game_id)] == [
+        'a', 'b', 'c', 'd']
+    assert len(decompressed) == 2
@@ -0,0 +1,55 @@
+import pytest
+
+from chesscorpy import database
+
+
+@pytest.fixture
+def tuned_profile():
+    saved = database.PROFILE
+    database.PROFILE = database.TUNED_PROFILE
+
+    yield
+
+    database.PROFILE = saved
+
+
+def test_check_profile_applies_tuned_profile(tuned_profile, tmp_path):
+    db_file = str(tmp_path / 'tuned.db')
+
+    assert database.check_profile(db_file) == {}
+    assert database.sql_exec(db_file, 'PRAGMA journal_mode')[0][0] == 'wal'
+    assert database.sql_exec(db_file, 'PRAGMA busy_timeout')[0][0] == 5000
+
+    database._held_open.pop(db_file).close()
+
+
+def test_check_profile_reports_pragmas_that_did_not_take(tuned_profile):
+    mismatches = database.check_profile('file:/profile-test?vfs=memdb')
+
+    assert mismatches['journal_mode'] == ('wal', 'memory')
+
+
+def test_sql_iter_reads_in_batches_without_holding_the_wal(tuned_profile,
+                                                           tmp_path):
+    db_file = str(tmp_path / 'iter.db')
+    database.check_profile(db_file)
+    database.sql_exec_batch(db_file, [
+        ('CREATE TABLE items (id INTEGER PRIMARY KEY, rank INTEGER)', [()]),
+        ('INSERT INTO items (id, rank) VALUES(?, ?)',
+         [[item_id, item_id % 3] for item_id in range(1, 8)])
+    ])
+
+    rows = database.sql_iter(db_file, 'SELECT * FROM items',
+                             key=('rank', 'id'), batch_size=2)
+    first = [next(rows)['id'] for _ in range(3)]
+
+    # Between batches nothing is reading, so a checkpoint gets the lot.
+    # Rows added behind where the batches have got to aren't seen.
+    database.sql_exec(db_file, 'INSERT INTO items (rank) VALUES(0)')
+    busy, _, _ = database.sql_exec(db_file,
+                                   'PRAGMA wal_checkpoint(TRUNCATE)')[0]
+    assert busy == 0
+
+    assert first + [row['id'] for row in rows] == [3, 6, 1, 4, 7, 2, 5]
+
+    database._held_open.pop(db_file).close()
@@ -0,0 +1,83 @@
+import contextlib
+import json
+import time
+
+from chesscorpy import database, digests, jobs, user
+
+
+class FakeMail:
+    """Records the messages sent and the connections they went over."""
+
+    def __init__(self, on_send=None):
+        self.connections = []
+        self.on_send = on_send
+
+    @contextlib.contextmanager
+    def connect(self):
+        self.connections.append([])
+        yield self
+
+    def send(self, msg):
+        self.connections[-1].append(msg)
+        if self.on_send:
+            self.on_send(msg)
+
+
+def _create_user(name, digest):
+    user.create(name, 'pw', f'{name}@example.com', 1200, 1)
+    user_id = user.get_data_by_name(name, ['id'])['id']
+    user.update_settings(user_id, 1, digest)
+    return user_id
+
+
+def _queue(user_id, event, age):
+    database.sql_exec(database.DATABASE_FILE,
+                      'INSERT INTO notifications (user_id, event, created) '
+                      'VALUES(?, ?, ?)', [user_id, event, time.time() - age])
+
+
+def test_send_digests_batches_due_events(memory_app, monkeypatch):
+    monkeypatch.setattr(database, 'GROUP_COMMIT', False)
+    hour = digests.WINDOWS[digests.HOURLY]
+    alice = _create_user('alice', digests.HOURLY)
+    bob = _create_user('bob', digests.HOURLY)
+    carol = _create_user('carol', digests.DAILY)
+    dave = _create_user('dave', digests.HOURLY)
+
+    # Due once the oldest event has waited a full window, taking newer
+    # ones along.
+    _queue(alice, 'alice moved', hour + 60)
+    _queue(alice, 'alice resigned', 10)
+    _queue(bob, 'bob moved', hour + 60)
+    # Not due: within a daily window, and within an hourly one.
+    _queue(carol, 'carol moved', hour + 60)
+    _queue(dave, 'dave moved', 10)
+
+    def queue_during_send(msg):
+        # Arrives after the digest was read, so it waits for the next.
+        if msg.recipients == ['alice@example.com']:
+            _queue(alice, 'alice won', 0)
+
+    mail = FakeMail(queue_during_send)
+    monkeypatch.setattr(jobs, 'JOBS', {
+        'send_digests': (300, lambda: digests.send_digests(mail))})
+    jobs.Runner(memory_app.app_context).tick()
+
+    # Every digest goes out over one connection, one email per user.
+    assert len(mail.connections) == 1
+    bodies = {msg.recipients[0]: msg.body for msg in mail.connections[0]}
+    assert set(bodies) == {'alice@example.com', 'bob@example.com'}
+    assert '- alice moved\n- alice resigned\n' in bodies['alice@example.com']
+    assert 'alice won' not in bodies['alice@example.com']
+
+    run = database.sql_exec(database.DATABASE_FILE,
+                            'SELECT result, error FROM job_runs WHERE job = '
+                            "'send_digests'", (), False)
+    assert run['error'] is None
+    assert json.loads(run['result']) == {'sent': 2, 'queued': 3}
+
+    left = database.sql_exec(database.DATABASE_FILE,
+                             'SELECT user_id, event FROM notifications '
+                             'ORDER BY id')
+    assert [tuple(row) for row in left] == [
+        (carol, 'carol moved'), (dave, 'dave moved'), (alice, 'alice won')]
@@ -0,0 +1,74 @@
+import chess
+
+from chesscorpy import database, explorer, games, user
+from chesscorpy.explorer import position_key
+
+
+def test_position_key():
+    board = chess.Board()
+    assert -(1 << 63) <= position_key(board) < (1 << 63)
+
+    # Transpositions share a key.
+    board.push_san('Nf3')
+    board.push_san('Nf6')
+    board.push_san('d4')
+    other = chess.Board()
+    other.push_san('d4')
+    other.push_san('Nf6')
+    other.push_san('Nf3')
+    assert position_key(board) == position_key(other)
+    assert position_key(board) != position_key(chess.Board())
+
+
+def _play(sans):
+    """Adds each move as handle_move does and returns the board."""
+
+    board = chess.Board()
+    for san in sans:
+        key = position_key(board)
+        board.push_san(san)
+        explorer.add_move(key, board.peek().uci())
+
+    return board
+
+
+def _index():
+    return database.rows_to_list(database.sql_exec(
+        database.DATABASE_FILE, 'SELECT * FROM explorer ORDER BY position, '
+        'move'))
+
+
+def test_explorer_counts_moves_and_results(memory_app):
+    won = _play(['e4', 'e5', 'Nf3'])
+    explorer.add_result(won.move_stack, chess.WHITE)
+    _play(['e4', 'c5'])
+    explorer.add_result_from_pgn('1. e4 c5 1/2-1/2', None)
+    _play(['d4'])
+
+    first = {move['san']: move for move in
+             explorer.get_moves(chess.STARTING_FEN)}
+    assert first['e4'] == {'move': 'e2e4', 'san': 'e4', 'games': 2,
+                           'white_wins': 1, 'draws': 1, 'black_wins': 0}
+    assert first['d4']['games'] == 1
+    assert list(first) == ['e4', 'd4']
+
+    board = chess.Board()
+    board.push_san('e4')
+    replies = {move['san']: (move['games'], move['white_wins'],
+                             move['draws'])
+               for move in explorer.get_moves(board.fen())}
+    assert replies == {'e5': (1, 1, 0), 'c5': (1, 0, 1)}
+    assert explorer.get_moves('not a fen') is None
+
+    # The same games in the games table rebuild the same index.
+    database.sql_exec_batch(database.DATABASE_FILE, [(
+        'INSERT INTO games (player_white_id, player_black_id, to_move, '
+        'status, winner, pgn) VALUES(1, 2, 1, ?, ?, ?)',
+        [[games.Status.CHECKMATE, 1, '1. e4 e5 2. Nf3 *'],
+         [games.Status.DRAW, user.DRAW_USER_ID, '1. e4 c5 *'],
+         [games.Status.IN_PROGRESS, None, '1. d4 *']]
+    )])
+    before = _index()
+
+    assert explorer.rebuild() == len(before)
+    assert _index() == before
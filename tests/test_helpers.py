@@ -10,3 +10,24 @@ def test_determine_player_colors():
     # TODO: Test 'random' color
     assert determine_player_colors('white', 1, 2) == (1, 2)
     assert determine_player_colors('black', 1, 2) == (2, 1)
+
+
+def test_admin_required():
+    from flask import Flask
+
+    from chesscorpy.helpers import admin_required
+
+    app = Flask(__name__)
+    app.config['ADMIN_TOKEN'] = 's3cret'
+    app.route('/status')(admin_required(lambda: 'ok'))
+    client = app.test_client()
+
+    assert client.get('/status').status_code == 404
+    assert client.get('/status',
+                      headers={'X-Admin-Token': 'wrong'}).status_code == 404
+    assert client.get('/status',
+                      headers={'X-Admin-Token': 's3cret'}).data == b'ok'
+
+    app.config['ADMIN_TOKEN'] = None
+    response = client.get('/status', headers={'X-Admin-Token': ''})
+    assert response.status_code == 404
@@ -0,0 +1,24 @@
+import threading
+import time
+
+from chesscorpy import database, jobs
+
+
+def test_lease_is_kept_while_a_long_job_runs(memory_app, monkeypatch):
+    monkeypatch.setattr(database, 'GROUP_COMMIT', False)
+    monkeypatch.setattr(jobs, 'LEASE_SECONDS', 0.2)
+    monkeypatch.setattr(jobs, 'HEARTBEAT_SECONDS', 0.05)
+    monkeypatch.setattr(jobs, 'JOBS', {
+        'long_job': (60, lambda: time.sleep(0.6))})
+
+    leader = jobs.Runner(memory_app.app_context)
+    other = jobs.Runner(memory_app.app_context)
+    # Ticks well after the lease would have run out without renewal.
+    other_tick = threading.Timer(0.4, other.tick)
+    other_tick.start()
+
+    leader.tick()
+    other_tick.join()
+
+    assert leader.is_leader
+    assert not other.is_leader
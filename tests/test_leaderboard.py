@@ -0,0 +1,27 @@
+from chesscorpy import leaderboard, user
+
+
+def _create_user(name, rating):
+    user.create(name, 'pw', f'{name}@example.com', rating, 0)
+    return user.get_data_by_name(name, ['id'])['id']
+
+
+def test_get_rank_places_users_who_joined_since_the_snapshot(memory_app):
+    for name, rating in (('a', 1500), ('b', 1400), ('c', 1400),
+                         ('d', 1200)):
+        _create_user(name, rating)
+    assert leaderboard.refresh()['ranked'] == 4
+
+    c_id = user.get_data_by_name('c', ['id'])['id']
+    assert leaderboard.get_rank(c_id) == {'rank': 2, 'position': 3,
+                                          'page': 1}
+
+    # Placed at the first ranked player rated no higher.
+    assert leaderboard.get_rank(_create_user('e', 1450)) == {
+        'rank': 2, 'position': 2, 'page': 1}
+    assert leaderboard.get_rank(_create_user('f', 1400)) == {
+        'rank': 2, 'position': 2, 'page': 1}
+    # Rated below everyone ranked, so after the last of them.
+    assert leaderboard.get_rank(_create_user('g', 1000)) == {
+        'rank': 5, 'position': 5, 'page': 1}
+    assert leaderboard.get_rank(-1) is None
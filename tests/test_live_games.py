@@ -0,0 +1,12 @@
+from chesscorpy import live_games
+
+
+def test_page_cache_stays_bounded(monkeypatch):
+    monkeypatch.setattr(live_games, 'MAX_CACHED_PAGES', 3)
+    monkeypatch.setattr(live_games, '_cache', {})
+
+    for page in range(1, 11):
+        live_games._cache_page((page, live_games.PAGE_SIZE), [])
+
+    assert list(live_games._cache) == [(page, live_games.PAGE_SIZE)
+                                       for page in (8, 9, 10)]
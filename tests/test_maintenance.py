@@ -0,0 +1,51 @@
+import sqlite3
+
+import pytest
+
+from chesscorpy import maintenance
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    db_file = str(tmp_path / 'main.db')
+    db = sqlite3.connect(db_file)
+    db.execute('CREATE TABLE chats (id INTEGER PRIMARY KEY, contents TEXT)')
+    db.execute('CREATE INDEX chats_contents ON chats (contents)')
+    db.executemany('INSERT INTO chats (contents) VALUES(?)',
+                   [['x' * 500]] * 1000)
+    db.commit()
+    db.close()
+
+    return db_file
+
+
+def test_backup_copies_database_in_steps(db_file, tmp_path):
+    destination = str(tmp_path / 'backup.db')
+    result = maintenance.backup(db_file, destination, pages=10, duty=1)
+
+    assert result['steps'] > 1
+    db = sqlite3.connect(destination)
+    assert db.execute('SELECT COUNT(*) FROM chats').fetchone()[0] == 1000
+    db.close()
+
+
+def test_vacuum_frees_pages_once_enabled(db_file):
+    assert maintenance.vacuum(db_file, duty=1) is None
+
+    maintenance.enable_incremental_vacuum(db_file)
+    db = sqlite3.connect(db_file)
+    db.execute('DELETE FROM chats')
+    db.commit()
+    db.close()
+
+    assert maintenance.vacuum(db_file, pages=5, duty=1) > 0
+    assert maintenance.vacuum(db_file, duty=1) == 0
+
+
+def test_check_and_sizes(db_file):
+    assert maintenance.check(db_file, duty=1) == []
+
+    sizes = maintenance.sizes(db_file, duty=1)
+    assert {name: table for name, table, _ in sizes} == {
+        'chats': 'chats', 'chats_contents': 'chats'}
+    assert sizes[0][2] >= sizes[1][2] > 500 * 1000
@@ -0,0 +1,80 @@
+import sqlite3
+
+import pytest
+
+from chesscorpy import migrations
+
+
+def test_to_epoch_times_keeps_autoincrement_sequence(tmp_path):
+    db_file = str(tmp_path / 'old.db')
+    db = sqlite3.connect(db_file)
+    db.execute('CREATE TABLE "chats" (\n\t"id"\tINTEGER NOT NULL UNIQUE,\n'
+               '\t"contents"\tTEXT NOT NULL,\n\t"timestamp"\tTEXT NOT NULL '
+               "DEFAULT (datetime(CURRENT_TIMESTAMP, 'localtime')),\n"
+               '\tPRIMARY KEY("id" AUTOINCREMENT)\n)')
+    db.executemany('INSERT INTO chats (contents, timestamp) VALUES(?, ?)',
+                   [['hi', '2021-06-01 12:00:00']] * 5)
+    db.execute('DELETE FROM chats WHERE id > 2')
+    db.commit()
+    db.close()
+
+    assert migrations.to_epoch_times(db_file, {'chats': ('timestamp',)}) == [
+        'chats']
+
+    db = sqlite3.connect(db_file)
+    assert db.execute("SELECT seq FROM sqlite_sequence WHERE name = "
+                      "'chats'").fetchone() == (5,)
+    db.execute("INSERT INTO chats (contents) VALUES('new')")
+    assert db.execute('SELECT MAX(id) FROM chats').fetchone() == (6,)
+    assert isinstance(db.execute('SELECT timestamp FROM chats').fetchone()[0],
+                      int)
+    db.close()
+
+
+def test_upgrade_schema_applies_each_file_once(tmp_path):
+    schema_dir = tmp_path / 'schema'
+    schema_dir.mkdir()
+    (schema_dir / '001_notes.sql').write_text(
+        '-- After: flask rebuild-notes\n'
+        'CREATE TABLE IF NOT EXISTS "notes" ("id" INTEGER PRIMARY KEY);\n'
+        'ALTER TABLE "users" ADD COLUMN "note_id" INTEGER;\n')
+    db_file = str(tmp_path / 'old.db')
+    db = sqlite3.connect(db_file)
+    # As if the column had been added by hand before the upgrade.
+    db.execute('CREATE TABLE users (id INTEGER PRIMARY KEY, note_id INTEGER)')
+    db.close()
+
+    assert migrations.upgrade_schema(db_file, str(schema_dir)) == [
+        ('001_notes', 'flask rebuild-notes')]
+    assert migrations.upgrade_schema(db_file, str(schema_dir)) == []
+
+    db = sqlite3.connect(db_file)
+    assert db.execute("SELECT name FROM sqlite_master WHERE name = "
+                      "'notes'").fetchone()
+    db.close()
+
+
+def test_to_epoch_times_rolls_back_a_failed_rebuild(tmp_path):
+    db_file = str(tmp_path / 'old.db')
+    db = sqlite3.connect(db_file)
+    db.execute('CREATE TABLE "chats" (\n\t"id"\tINTEGER NOT NULL UNIQUE,\n'
+               '\t"timestamp"\tTEXT NOT NULL '
+               "DEFAULT (datetime(CURRENT_TIMESTAMP, 'localtime')),\n"
+               '\tPRIMARY KEY("id")\n)')
+    # Doesn't convert, so the copy breaks the NOT NULL constraint.
+    db.execute("INSERT INTO chats (timestamp) VALUES('not a time')")
+    db.commit()
+    db.close()
+
+    with pytest.raises(sqlite3.IntegrityError):
+        migrations.to_epoch_times(db_file, {'chats': ('timestamp',)})
+
+    db = sqlite3.connect(db_file)
+    assert db.execute("SELECT name FROM sqlite_master WHERE type = "
+                      "'table'").fetchall() == [('chats',)]
+    db.execute("UPDATE chats SET timestamp = '2021-06-01 12:00:00'")
+    db.commit()
+    db.close()
+
+    assert migrations.to_epoch_times(db_file, {'chats': ('timestamp',)}) == [
+        'chats']
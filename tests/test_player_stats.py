@@ -0,0 +1,37 @@
+import sqlite3
+
+from chesscorpy import player_stats, user
+
+
+def _apply(db, white_id, black_id, winner):
+    query, query_args_list = player_stats.record(white_id, black_id, winner)
+    db.executemany(query, query_args_list)
+
+
+def _stats(db, user_id):
+    row = db.execute(f'SELECT {", ".join(player_stats.FIELDS)} FROM '
+                     'user_stats WHERE user_id = ?', [user_id]).fetchone()
+
+    return dict(zip(player_stats.FIELDS, row))
+
+
+def test_record_counts_results_and_streaks():
+    schema = sqlite3.connect('chesscorpy.db').execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'user_stats'").fetchone()
+    db = sqlite3.connect(':memory:')
+    db.execute(schema[0])
+
+    _apply(db, 1, 2, 1)
+    _apply(db, 2, 1, 1)
+    _apply(db, 1, 2, user.DRAW_USER_ID)
+    _apply(db, 2, 1, 2)
+    _apply(db, 1, 2, 2)
+
+    first = _stats(db, 1)
+    assert (first['wins'], first['losses'], first['draws']) == (2, 2, 1)
+    assert (first['white_wins'], first['black_wins']) == (1, 1)
+    assert (first['streak'], first['best_streak']) == (-2, 2)
+
+    second = _stats(db, 2)
+    assert (second['wins'], second['losses'], second['draws']) == (2, 2, 1)
+    assert (second['streak'], second['best_streak']) == (2, 2)
@@ -0,0 +1,39 @@
+import threading
+
+import pytest
+
+from chesscorpy.pools import Pool, PoolBusy
+
+
+def test_pool_runs_calls():
+    pool = Pool('test', 2, 10)
+    assert pool.submit(sum, [1, 2, 3]).result() == 6
+    assert pool.stats()['completed'] == 1
+    assert pool.stats()['queued'] == 0
+
+
+def test_pool_rejects_when_full():
+    pool = Pool('test', 1, 1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait()
+
+    first = pool.submit(block)
+    started.wait()
+    second = pool.submit(block)
+
+    with pytest.raises(PoolBusy):
+        pool.submit(block)
+
+    stats = pool.stats()
+    assert stats['running'] == 1
+    assert stats['queued'] == 1
+    assert stats['rejected'] == 1
+
+    release.set()
+    first.result()
+    second.result()
+    assert pool.stats()['completed'] == 2
@@ -0,0 +1,32 @@
+import os
+import threading
+import time
+from collections import Counter
+
+from chesscorpy import profiling
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        time.sleep(0.001)
+
+
+def test_sampler_records_collapsed_stacks():
+    sampler = profiling.Sampler(threading.get_ident(), 0.001)
+    sampler.start()
+    _busy(0.05)
+    stacks = sampler.stop()
+
+    assert any(stack.split(';')[-1].startswith('_busy (test_profiling.py')
+               for stack in stacks)
+
+
+def test_write_keeps_newest_profiles_under_cap(tmp_path):
+    stacks = Counter({'main (app.py:1);' + 'x' * 600: 3})
+    paths = [profiling.write(stacks, 'GET /history?id=1', 'views.history',
+                             str(tmp_path), 0.001) for _ in range(3)]
+
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(paths[-1])]
+    with open(paths[-1]) as file:
+        assert file.read().startswith('GET /history?id=1;main (app.py:1);')
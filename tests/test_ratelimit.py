@@ -0,0 +1,45 @@
+import time
+
+import pytest
+
+from chesscorpy import ratelimit, user
+
+
+@pytest.mark.parametrize('store', [ratelimit.MemoryStore,
+                                   ratelimit.SQLiteStore])
+def test_store_rejects_empty_bucket_until_refilled(memory_app, store):
+    store = store()
+
+    assert store.take('move:user:1', 2, 0.5, 1000) == 0
+    assert store.take('move:user:1', 2, 0.5, 1000) == 0
+    assert store.take('move:user:1', 2, 0.5, 1000) == pytest.approx(2)
+    # Other keys have buckets of their own.
+    assert store.take('move:user:2', 2, 0.5, 1000) == 0
+
+    assert store.take('move:user:1', 2, 0.5, 1001) == pytest.approx(1)
+    assert store.take('move:user:1', 2, 0.5, 1002) == 0
+    assert store.take('move:user:1', 2, 0.5, 1002) == pytest.approx(2)
+
+    store.refund('move:user:1', 2)
+    assert store.take('move:user:1', 2, 0.5, 1002) == 0
+
+
+def test_rejected_request_keeps_its_user_token(memory_app):
+    memory_app.config['RATE_LIMITS'] = {
+        'chat': {'user': (2, 1), 'ip': (1, 1)}}
+    user.create('alice', 'pw', 'a@example.com', 1200, 0)
+    alice = user.get_data_by_name('alice', ['id'])['id']
+    client = memory_app.test_client()
+    with client.session_transaction() as session:
+        session[user.USER_SESSION] = alice
+
+    assert client.post('/chat').status_code == 200
+    response = client.post('/chat')
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '60'
+    assert response.json == {'successful': False,
+                             'error': 'Too many requests.'}
+
+    # The IP limit rejected it, so the user's bucket still has a token.
+    store = ratelimit._get_store(memory_app)
+    assert store.take(f'chat:user:{alice}', 2, 1 / 60, time.time()) == 0
@@ -0,0 +1,50 @@
+import os
+import sqlite3
+
+from chesscorpy import (create_app, chat, database, games, storage, user,
+                        writer)
+
+
+def test_memory_storage_keeps_data_off_disk(memory_app):
+    before = os.path.getmtime('chesscorpy.db')
+
+    user.create('alice', 'pw', 'a@example.com', 1200, 0)
+    user.create('bob', 'pw', 'b@example.com', 1200, 0)
+    alice = user.get_data_by_name('ALICE', ['id'])['id']
+    bob = user.get_data_by_name('bob', ['id'])['id']
+
+    games.create_request(alice, bob, 1, 1, 3000, 'white', 1)
+    request_id = database.sql_exec(database.DATABASE_FILE,
+                                   'SELECT id FROM game_requests', (),
+                                   False)['id']
+    assert games.get_request_data_if_authed(request_id, bob)
+    game_id = games.create_game(alice, bob, 1, 1)
+    games.delete_request(request_id)
+    chat.new_chat(game_id, alice, 'hello')
+
+    assert games.get_game_data_if_authed(game_id, bob)['to_move'] == alice
+    assert [row['contents'] for row in chat.get_chats(game_id)] == ['hello']
+    assert os.path.getmtime('chesscorpy.db') == before
+    assert not database.DATABASE_FILE.endswith('chesscorpy.db')
+
+
+def test_apps_keep_their_own_storage(memory_app):
+    user.create('alice', 'pw', 'a@example.com', 1200, 0)
+    other = create_app({'STORAGE': storage.MEMORY, 'RUN_JOBS': False})
+
+    with other.app_context():
+        assert database.DATABASE_FILE == other.extensions[
+            'storage'].database_file
+        assert not user.get_data_by_name('alice', ['id'])
+
+    assert user.get_data_by_name('alice', ['id'])
+
+    # Closing stops the writer, which would otherwise keep the in-memory
+    # database alive.
+    memory_file = other.extensions['storage'].database_file
+    writer.get(memory_file)
+    other.extensions['storage'].close()
+    assert memory_file not in writer.stats()
+    freed = sqlite3.connect(memory_file, uri=True)
+    assert not freed.execute('SELECT * FROM sqlite_master').fetchall()
+    freed.close()
@@ -0,0 +1,44 @@
+import itertools
+
+from chesscorpy.tournaments import round_robin_pairings, swiss_pairings
+
+
+def test_round_robin_pairs_everyone_once():
+    for player_count in (2, 5, 8):
+        players = list(range(1, player_count + 1))
+        rounds = player_count - 1 + player_count % 2
+
+        met = []
+        for round_number in range(1, rounds + 1):
+            pairings = round_robin_pairings(players, round_number)
+            seated = [player for pairing in pairings for player in pairing
+                      if player is not None]
+            assert sorted(seated) == players
+            met += [frozenset(pairing) for pairing in pairings
+                    if None not in pairing]
+
+        assert sorted(met, key=sorted) == sorted(
+            (frozenset(pair) for pair in itertools.combinations(players, 2)),
+            key=sorted)
+
+
+def test_round_robin_bye_has_no_black():
+    for white, black in round_robin_pairings([1, 2, 3], 1):
+        assert white is not None
+
+
+def test_swiss_avoids_rematches():
+    pairings = swiss_pairings([1, 2, 3, 4], {1: {2}, 2: {1}, 3: {4}, 4: {3}},
+                              {1: 1, 3: 1}, set())
+    assert sorted(map(frozenset, pairings), key=sorted) == [
+        frozenset((1, 3)), frozenset((2, 4))]
+
+
+def test_swiss_bye_goes_to_lowest_without_one():
+    pairings = swiss_pairings([1, 2, 3, 4, 5], {}, {}, {5})
+    assert (4, None) in pairings
+    assert len(pairings) == 3
+
+
+def test_swiss_balances_colors():
+    assert swiss_pairings([1, 2], {}, {1: 2, 2: 0}, set()) == [(2, 1)]
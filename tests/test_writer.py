@@ -0,0 +1,27 @@
+import sqlite3
+
+import pytest
+
+from chesscorpy.writer import Writer
+
+
+def test_writer_commits_and_isolates_failures(tmp_path):
+    db = str(tmp_path / 'test.db')
+    sqlite3.connect(db).execute('CREATE TABLE t (id INTEGER PRIMARY KEY, '
+                                'value TEXT NOT NULL)')
+
+    writer = Writer(db)
+    good = writer.submit([('INSERT INTO t (value) VALUES(?)', [['a']])])
+    bad = writer.submit([('INSERT INTO t (value) VALUES(?)', [['b']]),
+                         ('INSERT INTO t (value) VALUES(NULL)', [()])])
+    last = writer.submit([('INSERT INTO t (value) VALUES(?)', [['c'], ['d']])])
+
+    assert good.result() == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        bad.result()
+    assert last.result() == 3
+
+    rows = sqlite3.connect(db).execute('SELECT value FROM t').fetchall()
+    assert rows == [('a',), ('c',), ('d',)]
+    assert writer.stats()['writes'] == 2
+    assert writer.stats()['failed'] == 1